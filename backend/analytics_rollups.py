@@ -0,0 +1,152 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+EPOCH_YEAR = 1970
+
+def timestamp_years(timestamps):
+    """Calendar year (UTC) of each epoch-seconds timestamp"""
+    seconds = np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]')
+    return seconds.astype('datetime64[Y]').astype(np.int64) + EPOCH_YEAR
+
+def _grow(array, size):
+    """array zero-padded to at least size, doubling so repeated growth stays amortized O(1)"""
+    if size <= len(array):
+        return array
+    size = max(size, 2 * len(array))
+    return np.concatenate([array, np.zeros(size - len(array), dtype=array.dtype)])
+
+class AnalyticsRollups:
+    """
+    Running aggregates behind the /api/analytics endpoints.
+
+    Ratings are folded in with add(), so appends cost O(new rows) and the
+    endpoints read prebuilt totals: per-year counts and rating sums (dense
+    arrays indexed by year - 1970), the rating histogram, per-user counts
+    indexed by userId with the number of distinct users, and a min-heap of
+    the top_k most active users keyed (count, -userId) so ties go to the
+    lower id, as nlargest over a userId-sorted groupby does.
+    """
+
+    def __init__(self, ratings=None, top_k=10):
+        self.top_k = top_k
+        self.total_ratings = 0
+        self.year_counts = np.zeros(0, dtype=np.int64)
+        self.year_sums = np.zeros(0)
+        self.histogram = {}
+        self.user_counts = np.zeros(0, dtype=np.int64)
+        self.distinct_users = 0
+        self._top_heap = []
+        self._top_users = set()
+        if ratings is not None:
+            self.add(ratings)
+
+    def add(self, ratings):
+        """Fold a frame of ratings (userId, rating and optionally timestamp) into the rollups"""
+        if len(ratings) == 0:
+            return
+        values = ratings['rating'].to_numpy(dtype=np.float64)
+        user_ids = ratings['userId'].to_numpy(dtype=np.int64)
+        self.total_ratings += len(values)
+
+        if 'timestamp' in ratings:
+            offsets = timestamp_years(ratings['timestamp'].to_numpy()) - EPOCH_YEAR
+            size = int(offsets.max()) + 1
+            self.year_counts = _grow(self.year_counts, size)
+            self.year_sums = _grow(self.year_sums, size)
+            np.add.at(self.year_counts, offsets, 1)
+            np.add.at(self.year_sums, offsets, values)
+
+        for value, count in zip(*np.unique(values, return_counts=True)):
+            self.histogram[float(value)] = self.histogram.get(float(value), 0) + int(count)
+
+        batch_users, batch_counts = np.unique(user_ids, return_counts=True)
+        self.user_counts = _grow(self.user_counts, int(batch_users.max()) + 1)
+        self.distinct_users += int(np.count_nonzero(self.user_counts[batch_users] == 0))
+        self.user_counts[batch_users] += batch_counts
+
+        if len(batch_users) > 4 * self.top_k:
+            self._rebuild_top()
+        else:
+            self._update_top(batch_users.tolist())
+
+    def _rebuild_top(self):
+        active = np.flatnonzero(self.user_counts)
+        if len(active) > self.top_k:
+            # lexsort's last key is primary: count descending, then userId ascending
+            order = np.lexsort((active, -self.user_counts[active]))
+            active = active[order[:self.top_k]]
+        self._top_heap = [(int(self.user_counts[u]), -int(u)) for u in active]
+        heapq.heapify(self._top_heap)
+        self._top_users = set(int(u) for u in active)
+
+    def _update_top(self, user_ids):
+        if any(user_id in self._top_users for user_id in user_ids):
+            # Members' counts grew; refresh their keys before any newcomer is
+            # compared against the heap minimum, or a stale minimum is evicted
+            self._top_heap = [(int(self.user_counts[u]), -u) for u in self._top_users]
+            heapq.heapify(self._top_heap)
+        for user_id in user_ids:
+            if user_id in self._top_users:
+                continue
+            entry = (int(self.user_counts[user_id]), -user_id)
+            if len(self._top_heap) < self.top_k:
+                heapq.heappush(self._top_heap, entry)
+                self._top_users.add(user_id)
+            elif entry > self._top_heap[0]:
+                _, evicted = heapq.heapreplace(self._top_heap, entry)
+                self._top_users.discard(-evicted)
+                self._top_users.add(user_id)
+
+    def rating_distribution(self):
+        return {value: self.histogram[value] for value in sorted(self.histogram)}
+
+    def yearly_trends(self):
+        years = np.flatnonzero(self.year_counts)
+        counts = self.year_counts[years]
+        averages = self.year_sums[years] / counts
+        return [
+            {'year': int(year) + EPOCH_YEAR, 'avg_rating': float(avg), 'count': int(count)}
+            for year, avg, count in zip(years, averages, counts)
+        ]
+
+    def most_active_users(self):
+        return [{'userId': -neg_user, 'rating_count': count} for count, neg_user in sorted(self._top_heap, reverse=True)]
+
+    def user_activity(self):
+        return {
+            'total_users': self.distinct_users,
+            'total_ratings': self.total_ratings,
+            'avg_ratings_per_user': self.total_ratings / self.distinct_users if self.distinct_users > 0 else 0.0,
+            'most_active_users': self.most_active_users()
+        }
+
+    def consistency_report(self, ratings):
+        """
+        Compare every rollup with a full pandas recompute over ratings;
+        returns the names of the rollups that disagree (empty when consistent).
+        """
+        mismatches = []
+
+        distribution = ratings['rating'].astype(np.float64).value_counts().sort_index()
+        if self.rating_distribution() != {float(k): int(v) for k, v in distribution.items()}:
+            mismatches.append('rating_distribution')
+
+        if 'timestamp' in ratings:
+            years = pd.Series(timestamp_years(ratings['timestamp'].to_numpy()), name='year')
+            yearly = ratings['rating'].astype(np.float64).groupby(years.to_numpy()).agg(['mean', 'count'])
+            trends = self.yearly_trends()
+            if ([t['year'] for t in trends] != yearly.index.tolist()
+                    or [t['count'] for t in trends] != yearly['count'].tolist()
+                    or not np.allclose([t['avg_rating'] for t in trends], yearly['mean'])):
+                mismatches.append('yearly_trends')
+
+        activity = ratings.groupby('userId').size().reset_index(name='rating_count')
+        expected_top = activity.nlargest(self.top_k, 'rating_count')
+        if ratings['userId'].nunique() != self.distinct_users or len(ratings) != self.total_ratings:
+            mismatches.append('user_totals')
+        if self.most_active_users() != [
+                {'userId': int(u), 'rating_count': int(c)} for u, c in zip(expected_top['userId'], expected_top['rating_count'])]:
+            mismatches.append('most_active_users')
+
+        return mismatches
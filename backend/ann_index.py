@@ -0,0 +1,169 @@
+import threading
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+class RandomProjectionLSH:
+    """
+    Approximate cosine nearest-neighbor index using random-hyperplane LSH.
+
+    Vectors are L2-normalized and hashed into n_tables tables of n_bits sign
+    bits each. A query collects the keys sharing a bucket with it in any table,
+    keeps the max_candidates seen in the most tables and reranks those by exact
+    cosine, so query cost is bounded by the candidate cap rather than the
+    number of indexed vectors. New keys can be added at any time.
+
+    Sparse rating vectors are noisy in their raw space, so the hyperplanes can
+    be drawn inside a low-rank basis (see build); hashing stays a single
+    projection either way. Saved planes passed to the constructor are used
+    as given, so reloading an index draws nothing.
+    """
+
+    def __init__(self, dim, n_tables=32, n_bits=8, max_candidates=1000, seed=42, basis=None, planes=None):
+        rng = np.random.default_rng(seed)
+        self.dim = dim
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.max_candidates = max_candidates
+        if planes is not None:
+            self.planes = planes
+        elif basis is None:
+            self.planes = rng.standard_normal((dim, n_tables * n_bits)).astype(np.float32)
+        else:
+            gaussian = rng.standard_normal((basis.shape[0], n_tables * n_bits))
+            self.planes = (basis.T @ gaussian).astype(np.float32)
+        self._bit_weights = 1 << np.arange(n_bits)
+        self.tables = [{} for _ in range(n_tables)]
+        self.keys = []
+        self.key_to_slot = {}
+        self._vectors = sparse.csr_matrix((0, dim), dtype=np.float32)
+        self._pending = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, keys, vectors, n_components=64, n_bits=None, bucket_size=64, **kwargs):
+        """
+        Index vectors with hyperplanes drawn in their top n_components SVD
+        subspace. n_bits of None sizes buckets to about bucket_size keys so
+        candidate counts stay flat as the index grows.
+        """
+        vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32), norm='l2', axis=1)
+        basis = None
+        if min(vectors.shape) > n_components:
+            basis = TruncatedSVD(n_components, random_state=kwargs.get('seed', 42)).fit(vectors).components_
+
+        if n_bits is None:
+            n_bits = int(np.clip(np.round(np.log2(max(len(keys), 1) / bucket_size)), 4, 16))
+
+        index = cls(vectors.shape[1], n_bits=n_bits, basis=basis, **kwargs)
+        index.add(keys, vectors)
+        return index
+
+    def state(self):
+        """Arrays that reconstruct the index through from_state"""
+        self._merge_pending()
+        return {
+            'planes': self.planes,
+            'keys': np.asarray(self.keys),
+            'codes': self._hash(self._vectors).astype(np.int64),
+            'config': np.array([self.dim, self.n_tables, self.n_bits, self.max_candidates])
+        }
+
+    @classmethod
+    def from_state(cls, planes, keys, codes, config, vectors):
+        """
+        Rebuild an index from state() arrays. vectors are the indexed rows
+        (already L2-normalized) and are used as given, so memory-mapped inputs
+        stay shared.
+        """
+        dim, n_tables, n_bits, max_candidates = (int(v) for v in config)
+        index = cls(dim, n_tables=n_tables, n_bits=n_bits, max_candidates=max_candidates, planes=planes)
+        index.keys = keys.tolist()
+        index.key_to_slot = {key: slot for slot, key in enumerate(index.keys)}
+        index._vectors = vectors
+
+        for table, table_codes in zip(index.tables, np.asarray(codes).T):
+            order = np.argsort(table_codes, kind='stable')
+            bucket_codes, starts = np.unique(table_codes[order], return_index=True)
+            for code, slots in zip(bucket_codes.tolist(), np.split(order, starts[1:])):
+                table[code] = slots.tolist()
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.key_to_slot
+
+    def _hash(self, vectors):
+        projected = np.asarray(vectors @ self.planes)
+        bits = (projected > 0).reshape(-1, self.n_tables, self.n_bits)
+        return bits @ self._bit_weights
+
+    def add(self, keys, vectors):
+        """Index a batch of vectors (rows of a dense or sparse matrix) under keys"""
+        vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32), norm='l2', axis=1)
+        codes = self._hash(vectors)
+
+        with self._lock:
+            duplicates = [key for key in keys if key in self.key_to_slot]
+            if duplicates:
+                raise ValueError(f"Keys already indexed: {duplicates[:5]}")
+
+            # Vectors are stored before their slots become reachable from the tables
+            self._pending.append(vectors)
+            for row, key in enumerate(keys):
+                slot = len(self.keys)
+                self.keys.append(key)
+                self.key_to_slot[key] = slot
+                for table, code in zip(self.tables, codes[row]):
+                    table.setdefault(int(code), []).append(slot)
+
+            # Merge small inserts in batches so each insert stays cheap
+            if sum(v.shape[0] for v in self._pending) >= max(1024, self._vectors.shape[0] // 8):
+                self._merge_pending()
+
+    def _merge_pending(self):
+        with self._lock:
+            if self._pending:
+                self._vectors = sparse.vstack([self._vectors] + self._pending, format='csr')
+                self._pending = []
+
+    def vector(self, key):
+        slot = self.key_to_slot[key]
+        if slot >= self._vectors.shape[0]:
+            self._merge_pending()
+        return self._vectors[slot]
+
+    def _candidates(self, codes, exclude_slot=None):
+        buckets = [table.get(int(code), ()) for table, code in zip(self.tables, codes)]
+        slots = np.concatenate([np.asarray(b, dtype=np.int64) for b in buckets]) if buckets else np.empty(0, dtype=np.int64)
+        slots, counts = np.unique(slots, return_counts=True)
+
+        if exclude_slot is not None:
+            keep = slots != exclude_slot
+            slots, counts = slots[keep], counts[keep]
+
+        if len(slots) > self.max_candidates:
+            best = np.argpartition(-counts, self.max_candidates - 1)[:self.max_candidates]
+            slots = np.sort(slots[best])
+        return slots
+
+    def query(self, vector, n=5, exclude_key=None):
+        """Keys of the (approximately) n most cosine-similar vectors, best first"""
+        vector = normalize(sparse.csr_matrix(vector, dtype=np.float32), norm='l2', axis=1)
+        exclude_slot = self.key_to_slot.get(exclude_key)
+        slots = self._candidates(self._hash(vector)[0], exclude_slot)
+
+        if len(slots) == 0:
+            return []
+        if slots.max() >= self._vectors.shape[0]:
+            self._merge_pending()
+
+        similarities = (self._vectors[slots] @ vector.T).toarray().ravel()
+        order = np.lexsort((slots, -similarities))[:n]
+        return [self.keys[slot] for slot in slots[order]]
+
+    def query_key(self, key, n=5):
+        return self.query(self.vector(key), n, exclude_key=key)
@@ -1,11 +1,16 @@
-from flask import Flask, request, jsonify, send_file, session
+import time
+BOOT_TIME = time.time()
+
+from flask import Flask, request, jsonify, send_file, session, Response, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
 from datetime import datetime
 import pandas as pd
 from io import BytesIO
+import json
 from data_processor import DataProcessor
 from ml_engine import RecommendationEngine
+from recommendation_store import RecommendationStore
 from config import Config
 from cache_manager import cache, cached
 from watchlist import WatchlistManager
@@ -14,61 +19,139 @@ from user_manager import UserManager
 from auth import AuthManager
 from reviews_manager import ReviewsManager
 from user_auth import UserAuth
+from warmup import WarmupTracker
+from ratings_follower import RatingsFollower
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = Config.JWT_SECRET_KEY
 CORS(app, supports_credentials=True, origins=Config.CORS_ORIGINS)
 
 print("Initializing application...")
-data_processor = DataProcessor(use_mongodb=True)
-ml_engine = RecommendationEngine(data_processor)
-try:
-    import ssl
-    import certifi
-    mongo_client = MongoClient(
-        Config.MONGO_URI,
-        serverSelectionTimeoutMS=5000,
-        tls=True,
-        tlsCAFile=certifi.where()
-    )
-    mongo_client.server_info()
-    db = mongo_client[Config.DB_NAME]
-    user_ratings_collection = db['user_ratings']
-    user_history_collection = db['user_history']
-    watchlist_manager = WatchlistManager(db)
-    user_manager = UserManager(db)
-    reviews_manager = ReviewsManager(db)
-    user_auth = UserAuth(db)
-    print("✅ MongoDB connected successfully!")
-except Exception as e:
-    print(f"⚠️  MongoDB not available: {e}")
+# Heavy components are built by the warm-up steps below (in a background
+# thread unless ASYNC_STARTUP is off); routes that need one answer 503 until
+# it is ready. The app runs without the optional ones if their step fails.
+startup = WarmupTracker(
+    ['mongodb', 'data', 'engine', 'ml_model', 'scheduler'],
+    boot_time=BOOT_TIME,
+    optional=['mongodb', 'ml_model', 'scheduler']
+)
+
+data_processor = None
+ml_engine = None
+ratings_follower = None
+db = None
+user_ratings_collection = None
+user_history_collection = None
+watchlist_manager = WatchlistManager(None)
+user_manager = UserManager(None)
+reviews_manager = None
+user_auth = None
+
+def connect_mongodb():
+    global db, user_ratings_collection, user_history_collection
+    global watchlist_manager, user_manager, reviews_manager, user_auth
     try:
-        import ssl as _ssl
-        print('SSL library version:', getattr(_ssl, 'OPENSSL_VERSION', 'unknown'))
-    except Exception:
-        pass
-    watchlist_manager = WatchlistManager(None)
-    user_manager = UserManager(None)
-    reviews_manager = None
-    user_auth = None
-    data_processor = DataProcessor(use_mongodb=False)
-
-ml_engine = RecommendationEngine(data_processor)
+        import ssl
+        import certifi
+        mongo_client = MongoClient(
+            Config.MONGO_URI,
+            serverSelectionTimeoutMS=5000,
+            tls=True,
+            tlsCAFile=certifi.where()
+        )
+        mongo_client.server_info()
+        db = mongo_client[Config.DB_NAME]
+        user_ratings_collection = db['user_ratings']
+        user_history_collection = db['user_history']
+        watchlist_manager = WatchlistManager(db)
+        user_manager = UserManager(db)
+        reviews_manager = ReviewsManager(db)
+        user_auth = UserAuth(db)
+        print("✅ MongoDB connected successfully!")
+    except Exception as e:
+        print(f"⚠️  MongoDB not available: {e}")
+        try:
+            import ssl as _ssl
+            print('SSL library version:', getattr(_ssl, 'OPENSSL_VERSION', 'unknown'))
+        except Exception:
+            pass
+        # Reported as failed by the readiness check; the app runs on CSV data
+        raise
+
+def load_data():
+    global data_processor
+    data_processor = DataProcessor(use_mongodb=db is not None)
+
+def build_recommendation_engine():
+    global ml_engine, ratings_follower
+    ml_engine = RecommendationEngine(data_processor)
+    # Lists saved from this engine's data are reused; anything else is recomputed
+    hybrid_store.attach(ml_engine.fingerprint)
+    
+    # Live ratings reach every worker through the follower, which feeds the
+    # engine's popularity stats via the append listener
+    data_processor.add_append_listener(on_ratings_appended)
+    if db is not None and Config.RATINGS_FOLLOW:
+        ratings_follower = RatingsFollower(
+            user_ratings_collection,
+            data_processor,
+            poll_interval=Config.RATINGS_POLL_SECONDS,
+            compact_rows=Config.RATINGS_COMPACT_ROWS,
+            compact_interval=Config.RATINGS_COMPACT_SECONDS
+        )
+        ratings_follower.start()
+
+def on_ratings_appended(new_ratings, version):
+    for movie_id, rating in zip(new_ratings['movieId'].tolist(), new_ratings['rating'].tolist()):
+        ml_engine.record_rating(movie_id, rating)
+    for user_id in new_ratings['userId'].unique().tolist():
+        # Users outside the trained matrix join the similar-users index on
+        # their first ratings; everyone else is picked up by the next rebuild
+        user_ratings = data_processor.user_ratings(user_id)
+        ml_engine.index_user(user_id, user_ratings.movie_ids, user_ratings.ratings)
+        hybrid_store.mark_stale(user_id)
+        ml_store.mark_stale(user_id)
 
 @app.route('/api/health', methods=['GET'])
+@app.route('/api/health/live', methods=['GET'])
 def health_check():
+    """Liveness: the process is up and serving requests"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: which startup components are warm, 503 until all are or if a required one failed"""
+    status = startup.status()
+    status['timestamp'] = datetime.now().isoformat()
+    if status['failed']:
+        return jsonify(status), 503
+    if not status['ready']:
+        return jsonify(status), 503, {'Retry-After': str(startup.retry_after)}
+    return jsonify(status)
+
+def genre_filter_args():
+    """
+    (genres, match) from ?genre=Action,Comedy&match=any|all; genres is empty
+    when no genre filter was given.
+    """
+    genre = request.args.get('genre', '')
+    genres = [g.strip() for g in genre.split(',') if g.strip()]
+    match = request.args.get('match', 'any').lower()
+    return genres, match
+
 @app.route('/api/movies', methods=['GET'])
+@startup.requires('data')
 def get_movies():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', Config.ITEMS_PER_PAGE))
-    genre = request.args.get('genre', None)
+    genres, match = genre_filter_args()
+    if match not in ('any', 'all'):
+        return jsonify({'error': "match must be 'any' or 'all'"}), 400
     
     movies_df = data_processor.get_movie_stats()
     
-    if genre:
-        movies_df = movies_df[movies_df['genres'].str.contains(genre, case=False, na=False)]
+    if genres:
+        movies_df = movies_df[data_processor.genre_mask(genres, match)]
     
     movies_df = movies_df.sort_values(['rating_count', 'avg_rating'], ascending=False)
     
@@ -86,17 +169,14 @@ def get_movies():
     })
 
 @app.route('/api/movies/<int:movie_id>', methods=['GET'])
+@startup.requires('data', 'engine')
 def get_movie(movie_id):
-    movie = data_processor.movies[data_processor.movies['movieId'] == movie_id]
+    movie_data = data_processor.get_movie(movie_id, with_stats=True)
     
-    if movie.empty:
+    if movie_data is None:
         return jsonify({'error': 'Movie not found'}), 404
     
-    movie_data = movie.iloc[0].to_dict()
-    
-    ratings = data_processor.ratings[data_processor.ratings['movieId'] == movie_id]
-    movie_data['avg_rating'] = float(ratings['rating'].mean()) if len(ratings) > 0 else 0
-    movie_data['rating_count'] = len(ratings)
+    movie_data['rating_count'] = int(movie_data['rating_count'])
     
     similar_movies = ml_engine.get_content_based_recommendations(movie_id, n=6)
     movie_data['similar_movies'] = similar_movies
@@ -104,10 +184,15 @@ def get_movie(movie_id):
     return jsonify(movie_data)
 
 @app.route('/api/recommendations/<int:user_id>', methods=['GET'])
+@startup.requires('data', 'engine')
 def get_recommendations(user_id):
     n = int(request.args.get('n', Config.N_RECOMMENDATIONS))
     
-    recommended_ids = ml_engine.get_hybrid_recommendations(user_id, n)
+    # A stored list is served even while the user is stale (new ratings not
+    # yet refreshed in); /api/recommendations/<user_id>/staleness reports it
+    recommended_ids = hybrid_store.get(user_id, n)
+    if recommended_ids is None:
+        recommended_ids = ml_engine.get_hybrid_recommendations(user_id, n)
     
     recommended_movies = data_processor.movies[
         data_processor.movies['movieId'].isin(recommended_ids)
@@ -125,7 +210,39 @@ def get_recommendations(user_id):
         'recommendations': result.to_dict('records')
     })
 
+@app.route('/api/recommendations/batch', methods=['POST'])
+@startup.requires('engine')
+def get_batch_recommendations():
+    data = request.json or {}
+    user_ids = data.get('user_ids') or []
+    n = int(data.get('n', Config.N_RECOMMENDATIONS))
+    
+    if not user_ids:
+        return jsonify({'error': 'user_ids required'}), 400
+    if len(user_ids) > Config.MAX_BATCH_USERS:
+        return jsonify({'error': f'At most {Config.MAX_BATCH_USERS} user_ids per request'}), 400
+    
+    def generate():
+        for user_id, movie_ids in ml_engine.get_hybrid_recommendations_batch(user_ids, n):
+            yield json.dumps({'user_id': user_id, 'recommendations': movie_ids}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/ratings/follower', methods=['GET'])
+def get_ratings_follower_status():
+    if ratings_follower is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **ratings_follower.status()})
+
+@app.route('/api/recommendations/<int:user_id>/staleness', methods=['GET'])
+def get_recommendation_staleness(user_id):
+    return jsonify({
+        'user_id': user_id,
+        'stores': [hybrid_store.staleness(user_id), ml_store.staleness(user_id)]
+    })
+
 @app.route('/api/search', methods=['GET'])
+@startup.requires('data')
 def search_movies():
     query = request.args.get('q', '')
     limit = int(request.args.get('limit', Config.MAX_SEARCH_RESULTS))
@@ -137,6 +254,7 @@ def search_movies():
     return jsonify({'results': results, 'count': len(results)})
 
 @app.route('/api/analytics/top-rated', methods=['GET'])
+@startup.requires('data')
 def get_top_rated():
     min_ratings = int(request.args.get('min_ratings', 50))
     limit = int(request.args.get('limit', 20))
@@ -145,33 +263,27 @@ def get_top_rated():
     return jsonify({'top_rated': top_movies})
 
 @app.route('/api/analytics/genre-distribution', methods=['GET'])
+@startup.requires('data')
 def get_genre_distribution():
     distribution = data_processor.get_genre_distribution()
     return jsonify({'distribution': distribution})
 
 @app.route('/api/analytics/rating-distribution', methods=['GET'])
+@startup.requires('data')
 def get_rating_distribution():
-    rating_counts = data_processor.ratings['rating'].value_counts().sort_index()
     return jsonify({
-        'distribution': rating_counts.to_dict()
+        'distribution': data_processor.get_rating_distribution()
     })
 
 @app.route('/api/analytics/trends', methods=['GET'])
+@startup.requires('data')
 def get_trends():
-    ratings_df = data_processor.ratings.copy()
-    ratings_df['date'] = pd.to_datetime(ratings_df['timestamp'], unit='s')
-    ratings_df['year'] = ratings_df['date'].dt.year
-    
-    yearly_stats = ratings_df.groupby('year').agg({
-        'rating': ['mean', 'count']
-    }).reset_index()
-    yearly_stats.columns = ['year', 'avg_rating', 'count']
-    
     return jsonify({
-        'yearly_trends': yearly_stats.to_dict('records')
+        'yearly_trends': data_processor.get_yearly_trends()
     })
 
 @app.route('/api/rate', methods=['POST'])
+@startup.requires('mongodb', 'engine')
 def rate_movie():
     data = request.json
     user_id = data.get('userId')
@@ -186,7 +298,9 @@ def rate_movie():
             'userId': user_id,
             'movieId': movie_id,
             'rating': rating,
-            'timestamp': datetime.now()
+            # Naive UTC, the form pymongo reads datetimes back in and the
+            # ratings follower converts to epoch seconds
+            'timestamp': datetime.utcnow()
         }
         user_ratings_collection.insert_one(rating_doc)
     
@@ -196,9 +310,18 @@ def rate_movie():
         except Exception as e:
             print(f"Real-time learning error: {e}")
     
+    # Popularity stats pick the rating up when the follower merges it
+    if ratings_follower is None:
+        ml_engine.record_rating(movie_id, float(rating))
+    # The real-time learner has just moved this user's embedding. Hybrid lists
+    # only change once the rating reaches the engine's data, and the
+    # follower's append listener marks them stale then.
+    ml_store.mark_stale(user_id)
+    
     return jsonify({'success': True, 'message': 'Rating submitted'})
 
 @app.route('/api/user/<int:user_id>/stats', methods=['GET'])
+@startup.requires('mongodb', 'data')
 def get_user_stats(user_id):
     # Try MongoDB first for real-time data
     if db is not None:
@@ -235,15 +358,12 @@ def get_user_stats(user_id):
     return jsonify(stats)
 
 @app.route('/api/genres', methods=['GET'])
+@startup.requires('data')
 def get_genres():
-    all_genres = set()
-    for genres_list in data_processor.movies['genres_list']:
-        if isinstance(genres_list, list):
-            all_genres.update(genres_list)
-    
-    return jsonify({'genres': sorted(list(all_genres))})
+    return jsonify({'genres': data_processor.genre_index().genres})
 
 @app.route('/api/watchlist/<int:user_id>', methods=['GET'])
+@startup.requires('mongodb', 'data')
 def get_watchlist(user_id):
     watchlist = watchlist_manager.get_watchlist(user_id)
     
@@ -259,6 +379,7 @@ def get_watchlist(user_id):
     return jsonify({'watchlist': result.to_dict('records')})
 
 @app.route('/api/watchlist/<int:user_id>/<int:movie_id>', methods=['POST'])
+@startup.requires('mongodb')
 def add_to_watchlist(user_id, movie_id):
     success = watchlist_manager.add_to_watchlist(user_id, movie_id)
     if success:
@@ -266,6 +387,7 @@ def add_to_watchlist(user_id, movie_id):
     return jsonify({'success': False, 'message': 'Already in watchlist'}), 400
 
 @app.route('/api/watchlist/<int:user_id>/<int:movie_id>', methods=['DELETE'])
+@startup.requires('mongodb')
 def remove_from_watchlist(user_id, movie_id):
     success = watchlist_manager.remove_from_watchlist(user_id, movie_id)
     if success:
@@ -273,6 +395,7 @@ def remove_from_watchlist(user_id, movie_id):
     return jsonify({'success': False, 'message': 'Not found in watchlist'}), 404
 
 @app.route('/api/watchlist/<int:user_id>/<int:movie_id>/watched', methods=['PUT'])
+@startup.requires('mongodb')
 def mark_watched(user_id, movie_id):
     success = watchlist_manager.mark_as_watched(user_id, movie_id)
     if success:
@@ -280,6 +403,7 @@ def mark_watched(user_id, movie_id):
     return jsonify({'success': False, 'message': 'Failed to update'}), 400
 
 @app.route('/api/export/user/<int:user_id>', methods=['GET'])
+@startup.requires('mongodb', 'data')
 def export_user_data(user_id):
     format_type = request.args.get('format', 'json')
     user_data = ExportService.export_user_data(user_id, data_processor, db)
@@ -294,6 +418,7 @@ def export_user_data(user_id):
     return jsonify(user_data)
 
 @app.route('/api/export/recommendations/<int:user_id>', methods=['GET'])
+@startup.requires('data', 'engine')
 def export_recommendations(user_id):
     n = int(request.args.get('n', Config.N_RECOMMENDATIONS))
     recommended_ids = ml_engine.get_hybrid_recommendations(user_id, n)
@@ -302,13 +427,15 @@ def export_recommendations(user_id):
     return jsonify(report)
 
 @app.route('/api/similar-users/<int:user_id>', methods=['GET'])
+@startup.requires('data', 'engine')
 def get_similar_users(user_id):
     n = int(request.args.get('n', 5))
     similar_users = ml_engine.get_similar_users(user_id, n)
     
+    stats_by_user = data_processor.get_users_rating_stats(similar_users)
     users_stats = []
     for uid in similar_users:
-        stats = data_processor.get_user_rating_stats(uid)
+        stats = stats_by_user.get(uid)
         if stats:
             stats['userId'] = uid
             users_stats.append(stats)
@@ -316,14 +443,17 @@ def get_similar_users(user_id):
     return jsonify({'similar_users': users_stats})
 
 @app.route('/api/movies/random', methods=['GET'])
+@startup.requires('data')
 def get_random_movies():
     n = int(request.args.get('n', 10))
-    genre = request.args.get('genre', None)
+    genres, match = genre_filter_args()
+    if match not in ('any', 'all'):
+        return jsonify({'error': "match must be 'any' or 'all'"}), 400
     
     movies_df = data_processor.get_movie_stats()
     
-    if genre:
-        movies_df = movies_df[movies_df['genres'].str.contains(genre, case=False, na=False)]
+    if genres:
+        movies_df = movies_df[data_processor.genre_mask(genres, match)]
     
     movies_df = movies_df[movies_df['rating_count'] >= 10]
     
@@ -336,20 +466,9 @@ def clear_cache():
     return jsonify({'success': True, 'message': 'Cache cleared'})
 
 @app.route('/api/analytics/user-activity', methods=['GET'])
+@startup.requires('data')
 def get_user_activity():
-    total_users = data_processor.ratings['userId'].nunique()
-    total_ratings = len(data_processor.ratings)
-    avg_ratings_per_user = total_ratings / total_users if total_users > 0 else 0
-    
-    user_activity = data_processor.ratings.groupby('userId').size().reset_index(name='rating_count')
-    top_users = user_activity.nlargest(10, 'rating_count')
-    
-    return jsonify({
-        'total_users': int(total_users),
-        'total_ratings': int(total_ratings),
-        'avg_ratings_per_user': float(avg_ratings_per_user),
-        'most_active_users': top_users.to_dict('records')
-    })
+    return jsonify(data_processor.get_user_activity())
 
     
     return jsonify({
@@ -363,6 +482,7 @@ def logout():
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
 @app.route('/api/preferences/setup', methods=['POST'])
+@startup.requires('mongodb')
 def setup_preferences():
     data = request.json
     user_id = data.get('user_id')
@@ -378,6 +498,7 @@ def setup_preferences():
     return jsonify({'error': 'Failed to save preferences'}), 500
 
 @app.route('/api/preferences/<user_id>', methods=['GET'])
+@startup.requires('mongodb')
 def get_user_preferences(user_id):
     preferences = user_manager.get_preferences(user_id)
     if preferences:
@@ -388,6 +509,7 @@ def get_user_preferences(user_id):
     return jsonify({'preferred_genres': [], 'favorite_tags': []})
 
 @app.route('/api/tags', methods=['GET'])
+@startup.requires('data')
 def get_all_tags():
     if data_processor.tags is not None and not data_processor.tags.empty:
         all_tags = data_processor.tags['tag'].unique().tolist()
@@ -397,6 +519,7 @@ def get_all_tags():
     return jsonify({'tags': []})
 
 @app.route('/api/favorites/<user_id>', methods=['GET'])
+@startup.requires('mongodb', 'data')
 def get_favorites(user_id):
     favorites = user_manager.get_favorites(user_id)
     
@@ -414,6 +537,7 @@ def get_favorites(user_id):
     return jsonify({'favorites': []})
 
 @app.route('/api/favorites/<user_id>/<int:movie_id>', methods=['POST'])
+@startup.requires('mongodb')
 def add_to_favorites(user_id, movie_id):
     success = user_manager.add_favorite(user_id, movie_id)
     if success:
@@ -421,6 +545,7 @@ def add_to_favorites(user_id, movie_id):
     return jsonify({'success': False, 'message': 'Already in favorites'}), 400
 
 @app.route('/api/favorites/<user_id>/<int:movie_id>', methods=['DELETE'])
+@startup.requires('mongodb')
 def remove_from_favorites(user_id, movie_id):
     success = user_manager.remove_favorite(user_id, movie_id)
     if success:
@@ -428,11 +553,13 @@ def remove_from_favorites(user_id, movie_id):
     return jsonify({'success': False, 'message': 'Not in favorites'}), 404
 
 @app.route('/api/favorites/<user_id>/<int:movie_id>/check', methods=['GET'])
+@startup.requires('mongodb')
 def check_favorite(user_id, movie_id):
     is_fav = user_manager.is_favorite(user_id, movie_id)
     return jsonify({'is_favorite': is_fav})
 
 @app.route('/api/recommendations/personalized/<user_id>', methods=['GET'])
+@startup.requires('mongodb', 'data')
 def get_personalized_recommendations(user_id):
     n = int(request.args.get('n', 20))
     
@@ -442,11 +569,7 @@ def get_personalized_recommendations(user_id):
         preferred_genres = preferences['preferred_genres']
         movies_df = data_processor.get_movie_stats()
         
-        filtered_movies = movies_df[
-            movies_df['genres'].apply(
-                lambda x: any(genre in x for genre in preferred_genres)
-            )
-        ]
+        filtered_movies = movies_df[data_processor.genre_mask(preferred_genres)]
         
         filtered_movies = filtered_movies.sort_values(
             ['avg_rating', 'rating_count'], 
@@ -463,6 +586,7 @@ def get_personalized_recommendations(user_id):
     return get_recommendations(user_id)
 
 @app.route('/api/reviews/<int:movie_id>', methods=['GET'])
+@startup.requires('mongodb')
 def get_movie_reviews(movie_id):
     if not reviews_manager:
         return jsonify({'reviews': []})
@@ -471,6 +595,7 @@ def get_movie_reviews(movie_id):
     return jsonify({'reviews': reviews})
 
 @app.route('/api/reviews', methods=['POST'])
+@startup.requires('mongodb')
 def add_review():
     if not reviews_manager:
         return jsonify({'error': 'Reviews not available'}), 503
@@ -488,6 +613,7 @@ def add_review():
     return jsonify(result)
 
 @app.route('/api/reviews/user/<int:user_id>', methods=['GET'])
+@startup.requires('mongodb')
 def get_user_reviews(user_id):
     if not reviews_manager:
         return jsonify({'reviews': []})
@@ -496,6 +622,7 @@ def get_user_reviews(user_id):
     return jsonify({'reviews': reviews})
 
 @app.route('/api/reviews/<int:movie_id>', methods=['DELETE'])
+@startup.requires('mongodb')
 def delete_review(movie_id):
     if not reviews_manager:
         return jsonify({'error': 'Reviews not available'}), 503
@@ -508,6 +635,7 @@ def delete_review(movie_id):
     return jsonify(result)
 
 @app.route('/api/analytics/trending-genres', methods=['GET'])
+@startup.requires('data')
 def get_trending_genres():
     limit = int(request.args.get('limit', 10))
     
@@ -519,6 +647,7 @@ def get_trending_genres():
     return jsonify({'trending_genres': trending})
 
 @app.route('/api/auth/register', methods=['POST'])
+@startup.requires('mongodb')
 def register():
     if not user_auth:
         return jsonify({'error': 'Authentication service not available'}), 503
@@ -546,6 +675,7 @@ def register():
         }), 400
 
 @app.route('/api/auth/login', methods=['POST'])
+@startup.requires('mongodb')
 def login():
     if not user_auth:
         return jsonify({'error': 'Authentication service not available'}), 503
@@ -573,6 +703,7 @@ def login():
         }), 401
 
 @app.route('/api/auth/profile/<int:user_id>', methods=['GET'])
+@startup.requires('mongodb')
 def get_profile(user_id):
     if not user_auth:
         return jsonify({'error': 'Authentication service not available'}), 503
@@ -591,6 +722,7 @@ def get_profile(user_id):
         }), 404
 
 @app.route('/api/user/preferences', methods=['POST'])
+@startup.requires('mongodb')
 def save_user_preferences():
     if not user_auth:
         return jsonify({'error': 'Authentication service not available'}), 503
@@ -674,6 +806,7 @@ def validate_hyperparameters():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/hyperparameters/tune', methods=['POST'])
+@startup.requires('mongodb', 'data')
 def tune_hyperparameters():
     """Run grid search to find optimal hyperparameters"""
     try:
@@ -758,12 +891,19 @@ realtime_learner = None
 explainer_service = None
 training_scheduler = None
 
+def ml_store_source(version):
+    """Source key for ml_store: the model version plus the data it excludes rated movies from"""
+    fingerprint = getattr(ml_engine, 'fingerprint', None)
+    return f'{version}:{fingerprint}' if version and fingerprint else None
+
 def load_ml_model():
     global ml_model, realtime_learner, explainer_service
-    ml_model = ml_model_manager.load_model('matrix_factorization', 'latest')
+    version = ml_model_manager.resolve_version('matrix_factorization', 'latest')
+    ml_model = ml_model_manager.load_model('matrix_factorization', version) if version else None
     if ml_model:
         realtime_learner = RealtimeLearner(ml_model)
         explainer_service = ExplainerService(ml_model, data_processor)
+        ml_store.attach(ml_store_source(version))
         print("✅ ML model loaded successfully!")
     else:
         print("⚠️  No ML model found. Train a model first.")
@@ -775,16 +915,50 @@ def initialize_training_scheduler():
         data_processor, 
         ml_model_manager,
         evaluation_service,
-        ml_logger
+        ml_logger,
+        on_training_complete=lambda results: load_ml_model()
     )
     training_scheduler.schedule_weekly_training(day_of_week=6, hour=2, minute=0)
     training_scheduler.start()
     print("✅ Training scheduler initialized")
 
-load_ml_model()
-initialize_training_scheduler()
+def _hybrid_store_compute(user_ids):
+    if user_ids is None:
+        user_ids = [int(uid) for uid in ml_engine.user_ids]
+        yield from ml_engine.get_hybrid_recommendations_batch(user_ids, Config.MATERIALIZED_TOP_N)
+        return
+    
+    # Users refreshed after new ratings are scored from their current ratings,
+    # which include rows appended since the engine's matrix was built
+    for user_id in user_ids:
+        user_ratings = data_processor.user_ratings(user_id)
+        yield user_id, ml_engine.get_hybrid_recommendations_from_ratings(
+            user_ratings.movie_ids, user_ratings.ratings, Config.MATERIALIZED_TOP_N
+        )
+
+def _ml_store_compute(user_ids):
+    model = ml_model
+    if model is None:
+        return iter(())
+    if user_ids is None:
+        user_ids = [int(uid) for uid in model.user_id_map]
+    
+    rated_movies = {uid: data_processor.user_ratings(uid).movie_ids for uid in user_ids}
+    return model.recommend_batch(user_ids, Config.MATERIALIZED_TOP_N, rated_movies)
+
+hybrid_store = RecommendationStore('hybrid', _hybrid_store_compute, Config.MATERIALIZED_TOP_N, Config.RECOMMENDATION_STORE_PATH)
+ml_store = RecommendationStore('ml', _ml_store_compute, Config.MATERIALIZED_TOP_N, Config.RECOMMENDATION_STORE_PATH)
+
+startup.run([
+    ('mongodb', connect_mongodb),
+    ('data', load_data),
+    ('engine', build_recommendation_engine),
+    ('ml_model', load_ml_model),
+    ('scheduler', initialize_training_scheduler)
+], background=Config.ASYNC_STARTUP)
 
 @app.route('/api/ml/train', methods=['POST'])
+@startup.requires('data')
 def train_ml_model():
     try:
         data = request.json or {}
@@ -823,6 +997,7 @@ def train_ml_model():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/retrain', methods=['POST'])
+@startup.requires('data')
 def retrain_ml_models():
     try:
         ratings_df = data_processor.ratings
@@ -838,6 +1013,7 @@ def retrain_ml_models():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/training-status', methods=['GET'])
+@startup.requires('scheduler')
 def get_training_status():
     versions = ml_model_manager.list_versions('matrix_factorization')
     
@@ -853,6 +1029,7 @@ def get_training_status():
     })
 
 @app.route('/api/ml/train/trigger', methods=['POST'])
+@startup.requires('scheduler')
 def trigger_manual_training():
     """Manually trigger a training session."""
     if not training_scheduler:
@@ -866,6 +1043,7 @@ def trigger_manual_training():
         return jsonify(result), 409  # 409 Conflict - training already in progress
 
 @app.route('/api/ml/training/history', methods=['GET'])
+@startup.requires('scheduler')
 def get_training_history():
     """Get training history with before/after metrics."""
     if not training_scheduler:
@@ -880,6 +1058,7 @@ def get_training_history():
     })
 
 @app.route('/api/ml/training/statistics', methods=['GET'])
+@startup.requires('scheduler')
 def get_training_statistics():
     """Get training statistics."""
     if not training_scheduler:
@@ -890,6 +1069,7 @@ def get_training_statistics():
     return jsonify(stats)
 
 @app.route('/api/ml/recommendations/<int:user_id>', methods=['GET'])
+@startup.requires('data', 'ml_model')
 def get_ml_recommendations(user_id):
     if not ml_model:
         return jsonify({'error': 'ML model not loaded'}), 503
@@ -897,10 +1077,11 @@ def get_ml_recommendations(user_id):
     try:
         n = int(request.args.get('n', 10))
         
-        user_ratings = data_processor.ratings[data_processor.ratings['userId'] == user_id]
-        rated_movies = user_ratings['movieId'].tolist()
-        
-        recommended_ids = ml_model.recommend(user_id, n=n, exclude_rated=True, rated_movies=rated_movies)
+        # Stale stored lists are still served until their refresh lands
+        recommended_ids = ml_store.get(user_id, n)
+        if recommended_ids is None:
+            rated_movies = set(data_processor.user_ratings(user_id).movie_ids.tolist())
+            recommended_ids = ml_model.recommend(user_id, n=n, exclude_rated=True, rated_movies=rated_movies)
         
         recommended_movies = data_processor.movies[
             data_processor.movies['movieId'].isin(recommended_ids)
@@ -922,6 +1103,7 @@ def get_ml_recommendations(user_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/predict', methods=['POST'])
+@startup.requires('ml_model')
 def predict_rating():
     if not ml_model:
         return jsonify({'error': 'ML model not loaded'}), 503
@@ -945,6 +1127,7 @@ def predict_rating():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/explain/<int:user_id>/<int:movie_id>', methods=['GET'])
+@startup.requires('data', 'ml_model')
 def explain_recommendation(user_id, movie_id):
     if not explainer_service:
         return jsonify({'error': 'Explainer service not available'}), 503
@@ -990,6 +1173,7 @@ def list_ml_models():
     return jsonify({'models': versions})
 
 @app.route('/api/ml/models/activate/<version>', methods=['POST'])
+@startup.requires('data', 'ml_model')
 def activate_model(version):
     try:
         model = ml_model_manager.load_model('matrix_factorization', version)
@@ -1000,6 +1184,7 @@ def activate_model(version):
         ml_model = model
         realtime_learner = RealtimeLearner(ml_model)
         explainer_service = ExplainerService(ml_model, data_processor)
+        ml_store.attach(ml_store_source(version))
         
         return jsonify({
             'success': True,
@@ -1022,6 +1207,7 @@ def delete_model(version):
 # Personalized Training Endpoints
 
 @app.route('/api/user/<int:user_id>/training-preferences', methods=['GET'])
+@startup.requires('mongodb')
 def get_training_preferences(user_id):
     """Get user's training preferences"""
     if db is None:
@@ -1037,6 +1223,7 @@ def get_training_preferences(user_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/user/<int:user_id>/training-preferences', methods=['POST'])
+@startup.requires('mongodb')
 def save_training_preferences(user_id):
     """Save user's training preferences"""
     if db is None:
@@ -1057,6 +1244,7 @@ def save_training_preferences(user_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/train-personal', methods=['POST'])
+@startup.requires('mongodb', 'data')
 def train_personal_model():
     """Train a personalized model for a specific user"""
     try:
@@ -1069,13 +1257,11 @@ def train_personal_model():
         
         # Get user's ratings
         if db is not None:
-            user_ratings = list(user_ratings_collection.find({'userId': user_id}))
-            if len(user_ratings) < 5:
-                return jsonify({'error': 'Please rate at least 5 movies before training a personal model'}), 400
+            n_user_ratings = user_ratings_collection.count_documents({'userId': user_id})
         else:
-            user_ratings_df = data_processor.ratings[data_processor.ratings['userId'] == user_id]
-            if len(user_ratings_df) < 5:
-                return jsonify({'error': 'Please rate at least 5 movies before training a personal model'}), 400
+            n_user_ratings = len(data_processor.user_ratings(user_id).ratings)
+        if n_user_ratings < 5:
+            return jsonify({'error': 'Please rate at least 5 movies before training a personal model'}), 400
         
         # Get all ratings for training
         ratings_df = data_processor.ratings.copy()
@@ -1099,7 +1285,7 @@ def train_personal_model():
                 'n_users': len(train_df['userId'].unique()),
                 'n_movies': len(train_df['movieId'].unique()),
                 'n_ratings': len(train_df),
-                'user_ratings': len(user_ratings) if db is not None else len(user_ratings_df)
+                'user_ratings': n_user_ratings
             }
         }
         
@@ -1128,6 +1314,7 @@ def train_personal_model():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ml/recommendations/personal/<int:user_id>', methods=['GET'])
+@startup.requires('mongodb', 'data', 'ml_model')
 def get_personal_recommendations(user_id):
     """Get recommendations from user's personal model"""
     try:
@@ -1141,8 +1328,7 @@ def get_personal_recommendations(user_id):
             return get_ml_recommendations(user_id)
         
         # Get user's rated movies
-        user_ratings = data_processor.ratings[data_processor.ratings['userId'] == user_id]
-        rated_movies = user_ratings['movieId'].tolist()
+        rated_movies = set(data_processor.user_ratings(user_id).movie_ids.tolist())
         
         # Get recommendations
         recommended_ids = personal_model.recommend(user_id, n=n*2, exclude_rated=True, rated_movies=rated_movies)
@@ -1155,18 +1341,13 @@ def get_personal_recommendations(user_id):
                 preferences = prefs_doc.get('preferences', {})
         
         # Filter by preferences
-        recommended_movies = data_processor.movies[
-            data_processor.movies['movieId'].isin(recommended_ids)
-        ]
+        recommended = data_processor.movies['movieId'].isin(recommended_ids).to_numpy()
         
         # Apply genre filter if specified
         favorite_genres = preferences.get('favoriteGenres', [])
         if favorite_genres:
-            recommended_movies = recommended_movies[
-                recommended_movies['genres_list'].apply(
-                    lambda x: any(g in x for g in favorite_genres) if isinstance(x, list) else False
-                )
-            ]
+            recommended &= data_processor.genre_mask(favorite_genres)
+        recommended_movies = data_processor.movies[recommended]
         
         # Apply minimum rating filter
         min_rating = preferences.get('minRating', 0)
@@ -1193,9 +1374,12 @@ def get_personal_recommendations(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+startup.mark_booted()
+
 if __name__ == '__main__':
     print("Starting Flask server...")
-    print(f"Loaded {len(data_processor.movies)} movies")
-    print(f"Loaded {len(data_processor.ratings)} ratings")
+    if data_processor is not None:
+        print(f"Loaded {len(data_processor.movies)} movies")
+        print(f"Loaded {len(data_processor.ratings)} ratings")
     app.run(debug=True, port=5000)
 
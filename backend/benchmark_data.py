@@ -0,0 +1,187 @@
+"""
+Benchmark script for the DataProcessor lookup paths.
+
+Run from the backend directory:
+    python benchmark_data.py [n_movies] [n_ratings]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmark_recommendations import make_synthetic_data, time_calls
+from unittest.mock import patch
+from config import Config
+from data_processor import DataProcessor
+from analytics_rollups import AnalyticsRollups
+from csv_loader import RATINGS_DTYPES, frame_memory, read_csv_typed
+
+WORDS = [
+    'the', 'last', 'night', 'love', 'story', 'dark', 'city', 'man', 'woman', 'king',
+    'return', 'lost', 'house', 'war', 'dead', 'summer', 'blood', 'star', 'girl', 'river',
+    'secret', 'life', 'dream', 'shadow', 'fire', 'ghost', 'road', 'heart', 'game', 'world',
+    'amélie', 'café', 'señor', 'île', 'über', 'bête', 'noël', 'mañana', 'zoë', 'déjà'
+]
+
+def make_processor(movies, ratings):
+    """DataProcessor over in-memory frames instead of MongoDB/CSV"""
+    with patch.object(DataProcessor, 'load_data'):
+        dp = DataProcessor(use_mongodb=False, snapshot_dir='')
+    dp.movies = movies
+    dp.ratings = ratings
+    return dp
+
+def make_titles(n_movies, seed=7):
+    """MovieLens-shaped titles: 1-5 words, a trailing year and some 'X, The' forms"""
+    rng = np.random.default_rng(seed)
+    titles = []
+    for i in range(n_movies):
+        words = [str(w).capitalize() for w in rng.choice(WORDS, rng.integers(1, 6))]
+        title = ' '.join(words)
+        if words[0] == 'The' and len(words) > 1:
+            title = ' '.join(words[1:]) + ', The'
+        if rng.random() < 0.3:
+            title += f' {i}'
+        titles.append(f'{title} ({1920 + i % 100})')
+    return titles
+
+def make_queries(titles, n_queries=200, seed=11):
+    """What a search box sees: typed prefixes, single words and short fragments"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n_queries):
+        kind = rng.integers(0, 3)
+        if kind == 0:
+            title = titles[rng.integers(len(titles))]
+            queries.append(title[:rng.integers(3, min(len(title), 20))])
+        elif kind == 1:
+            queries.append(str(rng.choice(WORDS)))
+        else:
+            word = str(rng.choice(WORDS))
+            queries.append(word[:2])
+    return queries
+
+def legacy_search_movies(dp, query, limit=50):
+    """The original lowercase + str.contains scan (a regex, so '(' raises)"""
+    query = query.lower()
+    results = dp.movies[dp.movies['title'].str.lower().str.contains(query, na=False)]
+    return results.head(limit).to_dict('records')
+
+def benchmark_search(dp, queries, limit=50):
+    print(f"Title search: str.contains scan vs trigram index ({len(dp.movies)} titles)")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    dp._title_search_index()
+    dp._movie_rating_counts()
+    built = time.perf_counter() - start
+
+    plain = [q for q in queries if '(' not in q and ')' not in q]
+    legacy = time_calls(lambda q: legacy_search_movies(dp, q, limit), plain[:50])
+    indexed = time_calls(lambda q: dp.search_movies(q, limit), queries)
+
+    index = dp._title_search_index()
+    print(f"  index build:       {built:9.2f} s ({index.nbytes / 1e6:.1f} MB)")
+    print(f"  str.contains scan: {1 / legacy:9.0f} queries/s")
+    print(f"  trigram index:     {1 / indexed:9.0f} queries/s\n")
+
+def benchmark_csv_load(ratings):
+    print(f"Ratings CSV load: default dtypes vs typed chunks ({len(ratings)} rows)")
+    print("-" * 50)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, 'ratings.csv')
+        ratings.to_csv(path, index=False)
+
+        start = time.perf_counter()
+        default = pd.read_csv(path)
+        default_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        typed = read_csv_typed(path, RATINGS_DTYPES)
+        typed_seconds = time.perf_counter() - start
+
+    print(f"  default dtypes: {default_seconds:6.2f} s, {frame_memory(default) / 1e6:8.1f} MB")
+    print(f"  typed chunks:   {typed_seconds:6.2f} s, {frame_memory(typed) / 1e6:8.1f} MB\n")
+
+def benchmark_cold_start(movies, ratings):
+    print("DataProcessor cold start: CSV parse vs memory-mapped snapshot")
+    print("-" * 50)
+
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as snapshot_dir:
+        movies.drop(columns=['genres_list']).to_csv(os.path.join(data_dir, 'movies.csv'), index=False)
+        ratings.to_csv(os.path.join(data_dir, 'ratings.csv'), index=False)
+
+        timings = []
+        with patch.multiple(Config, DATA_DIR=data_dir, MOVIES_FILE='movies.csv', RATINGS_FILE='ratings.csv'):
+            for _ in range(2):
+                start = time.perf_counter()
+                DataProcessor(use_mongodb=False, snapshot_dir=snapshot_dir)
+                timings.append(time.perf_counter() - start)
+
+    print(f"  CSV parse + save: {timings[0]:6.2f} s")
+    print(f"  snapshot load:    {timings[1]:6.2f} s\n")
+
+def legacy_analytics(ratings):
+    """The original per-request pandas recompute behind the three analytics endpoints"""
+    ratings['rating'].value_counts().sort_index().to_dict()
+    frame = ratings.copy()
+    frame['year'] = pd.to_datetime(frame['timestamp'], unit='s').dt.year
+    frame.groupby('year').agg({'rating': ['mean', 'count']}).reset_index().to_dict('records')
+    ratings['userId'].nunique()
+    ratings.groupby('userId').size().reset_index(name='rating_count').nlargest(10, 'rating_count').to_dict('records')
+
+def rollup_analytics(dp):
+    dp.get_rating_distribution()
+    dp.get_yearly_trends()
+    dp.get_user_activity()
+
+def benchmark_analytics(dp, n_appends=200):
+    print(f"Analytics endpoints: pandas recompute vs incremental rollups ({len(dp.ratings)} ratings)")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    dp.analytics_rollups()
+    built = time.perf_counter() - start
+
+    legacy = time_calls(lambda _: legacy_analytics(dp.ratings), range(3))
+    rollups = time_calls(lambda _: rollup_analytics(dp), range(1000))
+
+    rng = np.random.default_rng(3)
+    new_ratings = [
+        pd.DataFrame({
+            'userId': rng.integers(1, 5001, 1), 'movieId': rng.integers(1, len(dp.movies) + 1, 1),
+            'rating': [4.0], 'timestamp': rng.integers(1700000000, 1750000000, 1)
+        })
+        for _ in range(n_appends)
+    ]
+    rollup = AnalyticsRollups(dp.ratings)
+    start = time.perf_counter()
+    for frame in new_ratings:
+        rollup.add(frame)
+    added = (time.perf_counter() - start) / n_appends
+
+    print(f"  rollup build:      {built * 1e3:9.1f} ms")
+    print(f"  pandas recompute:  {legacy * 1e3:9.1f} ms per request set")
+    print(f"  rollups:           {rollups * 1e6:9.1f} µs per request set")
+    print(f"  fold one rating:   {added * 1e6:9.1f} µs\n")
+
+if __name__ == '__main__':
+    sizes = [60000, 200000]
+    args = [int(a) for a in sys.argv[1:3]]
+    sizes[:len(args)] = args
+    n_movies, n_ratings = sizes
+
+    print("=" * 50)
+    print(f"Data benchmark: {n_movies} movies, {n_ratings} ratings")
+    print("=" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=5000, n_movies=n_movies, n_ratings=n_ratings)
+    movies['title'] = make_titles(n_movies)
+    dp = make_processor(movies, ratings)
+
+    benchmark_search(dp, make_queries(movies['title'].tolist()))
+    benchmark_csv_load(ratings)
+    benchmark_cold_start(movies, ratings)
+    benchmark_analytics(dp)
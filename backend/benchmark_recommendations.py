@@ -0,0 +1,265 @@
+"""
+Benchmark script for the recommendation engine scoring paths.
+
+Run from the backend directory:
+    python benchmark_recommendations.py [n_users] [n_movies] [n_ratings]
+"""
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from ml_engine import RecommendationEngine
+
+DENSE_CELL_LIMIT = 50_000_000
+
+def make_synthetic_data(n_users=500, n_movies=2000, n_ratings=50000, seed=42):
+    """Create MovieLens-shaped movies/ratings frames with a popularity skew"""
+    rng = np.random.default_rng(seed)
+
+    genres = ['Action', 'Adventure', 'Comedy', 'Drama', 'Horror', 'Romance', 'Sci-Fi', 'Thriller']
+    movie_genres = ['|'.join(sorted(set(rng.choice(genres, rng.integers(1, 4))))) for _ in range(n_movies)]
+    movies = pd.DataFrame({
+        'movieId': np.arange(1, n_movies + 1),
+        'title': [f'Movie {i} ({1980 + i % 40})' for i in range(1, n_movies + 1)],
+        'genres': movie_genres
+    })
+    movies['genres_list'] = movies['genres'].str.split('|')
+
+    # Users belong to taste clusters and draw most ratings from their cluster's movies
+    n_clusters = 20
+    movie_cluster = rng.integers(0, n_clusters, n_movies)
+    cluster_movies = np.argsort(movie_cluster, kind='stable')
+    cluster_offsets = np.concatenate([[0], np.cumsum(np.bincount(movie_cluster, minlength=n_clusters))])
+
+    popularity = 1.0 / np.arange(1, n_movies + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    user_ids = rng.integers(1, n_users + 1, n_ratings)
+    user_cluster = rng.integers(0, n_clusters, n_users + 1)[user_ids]
+    in_cluster = (rng.random(n_ratings) < 0.7) & (np.diff(cluster_offsets)[user_cluster] > 0)
+
+    movie_rows = rng.choice(n_movies, n_ratings, p=popularity)
+    sizes = np.diff(cluster_offsets)[user_cluster[in_cluster]]
+    picks = (rng.random(in_cluster.sum()) ** 2 * sizes).astype(int)
+    movie_rows[in_cluster] = cluster_movies[cluster_offsets[user_cluster[in_cluster]] + picks]
+
+    base_rating = np.where(in_cluster, 8, 5)
+    ratings = pd.DataFrame({
+        'userId': user_ids,
+        'movieId': movies['movieId'].values[movie_rows],
+        'rating': np.clip(base_rating + rng.integers(-3, 3, n_ratings), 1, 10) / 2.0,
+        'timestamp': rng.integers(946684800, 1700000000, n_ratings)
+    })
+    ratings = ratings.drop_duplicates(subset=['userId', 'movieId']).reset_index(drop=True)
+
+    return movies, ratings
+
+def build_engine(movies, ratings, **engine_kwargs):
+    engine_kwargs.setdefault('snapshot_dir', '')
+    return RecommendationEngine(SimpleNamespace(movies=movies, ratings=ratings), **engine_kwargs)
+
+def matrix_nbytes(matrix):
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return np.asarray(matrix).nbytes
+
+def legacy_collaborative_predictions(engine, user_id):
+    """The original per-element double loop, kept as the reference scoring"""
+    if user_id not in engine.user_item_matrix.index:
+        return {}
+
+    user_ratings = engine.user_item_matrix.loc[user_id]
+    rated_movies = user_ratings[user_ratings > 0].index.tolist()
+
+    if len(rated_movies) == 0:
+        return {}
+
+    predictions = {}
+    movie_ids = engine.user_item_matrix.columns.tolist()
+    movie_id_to_idx = {mid: idx for idx, mid in enumerate(movie_ids)}
+
+    for movie_id in movie_ids:
+        if movie_id not in rated_movies:
+            movie_idx = movie_id_to_idx[movie_id]
+            similar_movies = []
+
+            for rated_movie in rated_movies:
+                if rated_movie in movie_id_to_idx:
+                    rated_idx = movie_id_to_idx[rated_movie]
+                    similarity = engine.movie_similarity_matrix[movie_idx][rated_idx]
+                    rating = user_ratings[rated_movie]
+                    similar_movies.append((similarity, rating))
+
+            if similar_movies:
+                total_sim = sum(sim for sim, _ in similar_movies)
+                if total_sim > 0:
+                    predicted_rating = sum(sim * rating for sim, rating in similar_movies) / total_sim
+                    predictions[movie_id] = predicted_rating
+
+    return predictions
+
+def legacy_collaborative_recommendations(engine, user_id, n=10):
+    predictions = legacy_collaborative_predictions(engine, user_id)
+    top_movies = sorted(predictions.items(), key=lambda x: x[1], reverse=True)[:n]
+    return [int(movie_id) for movie_id, _ in top_movies]
+
+def time_calls(func, user_ids, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for user_id in user_ids:
+            func(user_id)
+    return (time.perf_counter() - start) / (repeat * len(user_ids))
+
+def benchmark_collaborative(dense_engine, sparse_engine, user_ids, n=10):
+    print("Collaborative scoring: legacy loop vs vectorized")
+    print("-" * 50)
+
+    if dense_engine is None:
+        vectorized_sparse = time_calls(lambda uid: sparse_engine.get_collaborative_recommendations(uid, n), user_ids, repeat=10)
+        print(f"  vectorized (CSR):   {vectorized_sparse * 1000:9.2f} ms/request")
+        print("  (dense and legacy paths skipped at this size)\n")
+        return
+
+    legacy = time_calls(lambda uid: legacy_collaborative_recommendations(dense_engine, uid, n), user_ids)
+    vectorized = time_calls(lambda uid: dense_engine.get_collaborative_recommendations(uid, n), user_ids, repeat=10)
+    vectorized_sparse = time_calls(lambda uid: sparse_engine.get_collaborative_recommendations(uid, n), user_ids, repeat=10)
+
+    mismatches = sum(
+        legacy_collaborative_recommendations(dense_engine, uid, n) != dense_engine.get_collaborative_recommendations(uid, n)
+        for uid in user_ids
+    )
+
+    print(f"  legacy loop:        {legacy * 1000:9.2f} ms/request")
+    print(f"  vectorized (dense): {vectorized * 1000:9.2f} ms/request")
+    print(f"  vectorized (CSR):   {vectorized_sparse * 1000:9.2f} ms/request")
+    print(f"  speedup:            {legacy / vectorized:9.1f}x")
+    print(f"  ranking mismatches: {mismatches}/{len(user_ids)}\n")
+
+def report_memory(dense_engine, sparse_engine):
+    print("Collaborative model memory: dense vs CSR")
+    print("-" * 50)
+    if dense_engine is None:
+        print(f"  user-item matrix    CSR {matrix_nbytes(sparse_engine.user_item_matrix) / 1e6:9.1f} MB")
+        print(f"  item similarity     top-{sparse_engine.n_neighbors} {sparse_engine.item_neighbors.nbytes / 1e6:9.1f} MB\n")
+        return
+
+    dense_mb = matrix_nbytes(dense_engine.user_item_matrix) / 1e6
+    sparse_mb = matrix_nbytes(sparse_engine.user_item_matrix) / 1e6
+    print(f"  user-item matrix    dense {dense_mb:9.1f} MB   CSR {sparse_mb:9.1f} MB")
+
+    dense_mb = matrix_nbytes(dense_engine.movie_similarity_matrix) / 1e6
+    sparse_mb = sparse_engine.item_neighbors.nbytes / 1e6
+    print(f"  item similarity     dense {dense_mb:9.1f} MB   top-{sparse_engine.n_neighbors} {sparse_mb:9.1f} MB\n")
+
+def benchmark_similar_users(engine, user_ids, n=5):
+    print("Similar users: exact vs LSH index")
+    print("-" * 50)
+
+    exact = time_calls(lambda uid: engine.get_similar_users(uid, n, exact=True), user_ids, repeat=3)
+    approximate = time_calls(lambda uid: engine.get_similar_users(uid, n), user_ids, repeat=3)
+
+    hits = sum(
+        len(set(engine.get_similar_users(uid, n)) & set(engine.get_similar_users(uid, n, exact=True)))
+        for uid in user_ids
+    )
+
+    print(f"  exact:        {exact * 1000:9.2f} ms/request")
+    print(f"  LSH index:    {approximate * 1000:9.2f} ms/request")
+    print(f"  recall@{n}:     {hits / (n * len(user_ids)):9.3f}\n")
+
+def benchmark_batch(engine, user_ids, n=10, label='CSR'):
+    print(f"Batch recommendations ({label}): per-user calls vs batch API")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    for user_id in user_ids:
+        engine.get_collaborative_recommendations(user_id, n)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in engine.get_collaborative_recommendations_batch(user_ids, n):
+        pass
+    batch = time.perf_counter() - start
+
+    print(f"  per-user calls: {len(user_ids) / single:9.0f} users/s")
+    print(f"  batch API:      {len(user_ids) / batch:9.0f} users/s\n")
+
+def legacy_popular_movies(engine, n=10):
+    """The original per-call groupby over all ratings"""
+    movie_stats = engine.dp.ratings.groupby('movieId').agg({'rating': ['mean', 'count']}).reset_index()
+    movie_stats.columns = ['movieId', 'avg_rating', 'count']
+    return movie_stats[movie_stats['count'] >= 50].nlargest(n, 'avg_rating')['movieId'].tolist()
+
+def benchmark_popular(engine, n=10, repeat=200):
+    print("Cold-start popular movies: groupby per call vs incremental stats")
+    print("-" * 50)
+    
+    legacy = time_calls(lambda _: legacy_popular_movies(engine, n), [None], repeat=20)
+    cached = time_calls(lambda _: engine._get_popular_movies(n), [None], repeat=repeat)
+    
+    # A new rating invalidates the ranking, so the next call pays one rebuild
+    def after_rating(_):
+        engine.record_rating(int(engine.popularity_movie_ids[0]), 4.0)
+        engine._get_popular_movies(n)
+    rebuilt = time_calls(after_rating, [None], repeat=20)
+    
+    print(f"  groupby per call: {legacy * 1000:9.3f} ms/request")
+    print(f"  cached ranking:   {cached * 1000:9.3f} ms/request")
+    print(f"  rating + rebuild: {rebuilt * 1000:9.3f} ms/request\n")
+
+def benchmark_snapshot(movies, ratings):
+    print("Engine startup: full build vs memory-mapped snapshot")
+    print("-" * 50)
+    
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        start = time.perf_counter()
+        build_engine(movies, ratings, snapshot_dir=snapshot_dir)
+        built = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        build_engine(movies, ratings, snapshot_dir=snapshot_dir)
+        loaded = time.perf_counter() - start
+    
+    print(f"  build + save:   {built:9.2f} s")
+    print(f"  snapshot load:  {loaded:9.2f} s\n")
+
+if __name__ == '__main__':
+    sizes = [500, 2000, 50000]
+    args = [int(a) for a in sys.argv[1:4]]
+    sizes[:len(args)] = args
+    n_users, n_movies, n_ratings = sizes
+
+    print("=" * 50)
+    print(f"Recommendation benchmark: {n_users} users, {n_movies} movies, {n_ratings} ratings")
+    print("=" * 50)
+
+    movies, ratings = make_synthetic_data(n_users, n_movies, n_ratings)
+
+    dense_engine = None
+    # The dense pivot table and similarity matrix need users x movies and movies^2 cells
+    if n_users * n_movies + n_movies ** 2 <= DENSE_CELL_LIMIT:
+        start = time.perf_counter()
+        dense_engine = build_engine(movies, ratings, sparse_matrix=False)
+        print(f"Engine build (dense): {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    sparse_engine = build_engine(movies, ratings, sparse_matrix=True)
+    print(f"Engine build (CSR):   {time.perf_counter() - start:.2f}s\n")
+
+    report_memory(dense_engine, sparse_engine)
+
+    sample_users = ratings['userId'].drop_duplicates().sample(10, random_state=0).tolist()
+    benchmark_collaborative(dense_engine, sparse_engine, sample_users)
+
+    sample_users = ratings['userId'].drop_duplicates().sample(min(200, n_users), random_state=1).tolist()
+    benchmark_similar_users(sparse_engine, sample_users)
+
+    batch_users = ratings['userId'].drop_duplicates().head(2000).tolist()
+    benchmark_batch(sparse_engine, batch_users)
+    if dense_engine is not None:
+        benchmark_batch(dense_engine, batch_users, label='dense')
+    
+    benchmark_popular(sparse_engine)
+    benchmark_snapshot(movies, ratings)
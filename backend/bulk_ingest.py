@@ -0,0 +1,210 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+def estimate_rows(path, sample_bytes=1 << 20):
+    """
+    Data rows in a CSV with a header line: counted exactly when the file fits
+    in sample_bytes, otherwise extrapolated from the sample's mean line length.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    lines = sample.count(b'\n')
+    if len(sample) == size:
+        return max(lines - 1 + (1 if sample and not sample.endswith(b'\n') else 0), 0)
+    if lines < 2:
+        return None
+    header = sample.index(b'\n') + 1
+    line_bytes = (sample.rindex(b'\n') + 1 - header) / (lines - 1)
+    return int((size - header) / line_bytes)
+
+def frame_documents(frame):
+    """
+    One dict per row of frame, built from whole-column lists rather than
+    to_dict('records'); missing values become None.
+    """
+    names = [str(name) for name in frame.columns]
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        if series.hasnans:
+            columns.append(series.astype(object).where(series.notna(), None).tolist())
+        else:
+            columns.append(series.tolist())
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+def _bson_field(series):
+    """(BSON type byte, numpy dtype) for a numeric column, or None if it has no fixed-width encoding"""
+    if not isinstance(series.dtype, np.dtype) or series.hasnans:
+        return None
+    kind = series.dtype.kind
+    if kind == 'b':
+        return b'\x08', np.dtype('u1')
+    if kind == 'f':
+        return b'\x01', np.dtype('<f8')
+    if kind in 'iu':
+        if len(series) and (series.min() < -2**63 or series.max() >= 2**63):
+            return None
+        if not len(series) or (series.min() >= -2**31 and series.max() < 2**31):
+            return b'\x10', np.dtype('<i4')
+        return b'\x12', np.dtype('<i8')
+    return None
+
+def raw_bson_documents(frame):
+    """
+    The rows of an all-numeric frame as RawBSONDocuments, or None if any
+    column is non-numeric or has missing values.
+
+    Every row has the same fixed-width layout, so the whole frame is written
+    into one numpy structured array (document length, then a type byte, name
+    and value per field) and sliced into documents, skipping per-row dicts
+    and BSON encoding. An _id column (import_csv adds the file row number)
+    is written like any other field; without one the server assigns _id.
+    """
+    fields = [(str(name), _bson_field(frame[name])) for name in frame.columns]
+    if any(field is None for _, field in fields):
+        return None
+
+    layout = [('length', '<i4')]
+    for i, (name, (type_byte, dtype)) in enumerate(fields):
+        layout += [(f'key{i}', f'S{len(name.encode("utf-8")) + 2}'), (f'value{i}', dtype)]
+    layout.append(('end', 'u1'))
+
+    rows = np.zeros(len(frame), dtype=np.dtype(layout))
+    rows['length'] = rows.dtype.itemsize
+    for i, (name, (type_byte, dtype)) in enumerate(fields):
+        # numpy strips trailing NULs from S values, so the key's terminator comes from the zeroed buffer
+        rows[f'key{i}'] = type_byte + name.encode('utf-8')
+        rows[f'value{i}'] = frame[name].to_numpy().astype(dtype)
+
+    data = rows.tobytes()
+    size = rows.dtype.itemsize
+    return [RawBSONDocument(data[start:start + size]) for start in range(0, len(data), size)]
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f'{seconds // 3600}h {seconds % 3600 // 60:02d}m'
+    if seconds >= 60:
+        return f'{seconds // 60}m {seconds % 60:02d}s'
+    return f'{seconds}s'
+
+class BulkIngest:
+    """
+    Inserts a stream of DataFrame chunks into a collection.
+
+    The calling thread converts each chunk to documents (raw BSON when
+    raw_bson is set and the chunk is all-numeric) and puts it on a queue of
+    at most queue_batches batches, which bounds memory while n_writers
+    threads drain it with unordered insert_many calls. Progress (rows/s and
+    an ETA against total_rows) is printed every report_interval seconds.
+    The first insert error stops the import and is re-raised from run().
+
+    Chunks are numbered from 0 in order. Batches whose number is in skip
+    are neither converted nor inserted, and on_batch(number, rows) is
+    called from the writer thread once a batch is in. Duplicate key errors
+    are taken as rows an interrupted earlier attempt already wrote, so a
+    batch with deterministic _ids can be inserted again safely.
+    """
+
+    def __init__(self, collection, n_writers=4, queue_batches=8, raw_bson=True, report_interval=5.0):
+        self.collection = collection
+        self.n_writers = max(int(n_writers), 1)
+        self.queue_batches = max(int(queue_batches), 1)
+        self.raw_bson = raw_bson
+        self.report_interval = report_interval
+
+        self.inserted = 0
+        self.skipped = 0
+        self._error = None
+        self._lock = threading.Lock()
+
+    def documents(self, frame):
+        documents = raw_bson_documents(frame) if self.raw_bson else None
+        return documents if documents is not None else frame_documents(frame)
+
+    def _insert(self, documents):
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if not errors or any(error.get('code') != DUPLICATE_KEY for error in errors):
+                raise
+
+    def _write(self, batches, on_batch):
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Keep draining so the reader never blocks on a full queue
+                continue
+            number, documents = item
+            try:
+                self._insert(documents)
+                if on_batch is not None:
+                    on_batch(number, len(documents))
+                with self._lock:
+                    self.inserted += len(documents)
+            except Exception as e:
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+
+    def _report(self, label, start, total_rows, final=False):
+        seconds = time.perf_counter() - start
+        rate = self.inserted / seconds if seconds > 0 else 0.0
+        line = f"  {label}: {self.inserted:,}"
+        if total_rows and not final:
+            line += f" / ~{total_rows - self.skipped:,}"
+        line += f" rows ({rate:,.0f} rows/s"
+        if final:
+            line += f", {format_duration(seconds)})"
+        elif total_rows and rate > 0:
+            line += f", ETA {format_duration(max(total_rows - self.skipped - self.inserted, 0) / rate)})"
+        else:
+            line += ")"
+        if self.skipped:
+            line += f", {self.skipped:,} already imported"
+        print(line)
+
+    def run(self, frames, total_rows=None, label=None, skip=(), on_batch=None):
+        """Insert every chunk in frames not numbered in skip; returns the number of rows inserted"""
+        label = label or self.collection.name
+        batches = queue.Queue(maxsize=self.queue_batches)
+        writers = [
+            threading.Thread(target=self._write, args=(batches, on_batch), name=f'ingest-{label}-{i}', daemon=True)
+            for i in range(self.n_writers)
+        ]
+        for writer in writers:
+            writer.start()
+
+        start = last_report = time.perf_counter()
+        try:
+            for number, frame in enumerate(frames):
+                if self._error is not None:
+                    break
+                if number in skip:
+                    self.skipped += len(frame)
+                elif len(frame):
+                    batches.put((number, self.documents(frame)))
+                if time.perf_counter() - last_report >= self.report_interval:
+                    self._report(label, start, total_rows)
+                    last_report = time.perf_counter()
+        finally:
+            for _ in writers:
+                batches.put(None)
+            for writer in writers:
+                writer.join()
+
+        if self._error is not None:
+            raise self._error
+        self._report(label, start, total_rows, final=True)
+        return self.inserted
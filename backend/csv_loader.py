@@ -0,0 +1,46 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Compact dtypes for the MovieLens files: int32 ids and timestamps (seconds
+# fit until 2038), float32 ratings and categorical genre strings
+MOVIES_DTYPES = {'movieId': 'int32', 'title': 'object', 'genres': 'category'}
+RATINGS_DTYPES = {'userId': 'int32', 'movieId': 'int32', 'rating': 'float32', 'timestamp': 'int32'}
+TAGS_DTYPES = {'userId': 'int32', 'movieId': 'int32', 'tag': 'object', 'timestamp': 'int32'}
+LINKS_DTYPES = {'movieId': 'int32', 'imdbId': 'int32', 'tmdbId': 'Int32'}
+
+def iter_csv_chunks(path, dtypes, chunk_rows=1_000_000, limit=None):
+    """
+    Read path in typed DataFrame chunks of at most chunk_rows rows, stopping
+    after limit rows in total (None reads the whole file).
+    """
+    reader = pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows, nrows=limit)
+    with reader:
+        yield from reader
+
+def concat_chunks(chunks):
+    """
+    Concatenate typed chunks. Each chunk has its own categories, so
+    categorical columns are unioned rather than falling back to object.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+
+    categorical = [c for c in chunks[0].columns if isinstance(chunks[0][c].dtype, pd.CategoricalDtype)]
+    combined = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for column in categorical:
+        combined[column] = pd.Series(union_categoricals([chunk[column] for chunk in chunks]))
+    return combined[chunks[0].columns]
+
+def read_csv_typed(path, dtypes, chunk_rows=1_000_000, limit=None):
+    """The whole file (or its first limit rows) as one compactly typed DataFrame"""
+    return concat_chunks(iter_csv_chunks(path, dtypes, chunk_rows, limit))
+
+def frame_memory(df):
+    """Bytes held by df, including the Python strings in object columns"""
+    return int(df.memory_usage(deep=True).sum())
+
+def report_memory(name, df):
+    print(f"  {name}: {len(df):,} rows, {frame_memory(df) / 1e6:,.1f} MB")
@@ -1,9 +1,30 @@
-import pandas as pd
-from pymongo import MongoClient
+import numpy as np
+from pymongo import IndexModel, MongoClient
 from config import Config
+from csv_loader import MOVIES_DTYPES, RATINGS_DTYPES, TAGS_DTYPES, LINKS_DTYPES, iter_csv_chunks
+from bulk_ingest import BulkIngest, estimate_rows
+from data_snapshot import csv_fingerprint
 import os
 import certifi
 
+# Imports write to <collection>_staging and record their progress in
+# import_checkpoints until the staged collection is swapped into place
+STAGING_SUFFIX = '_staging'
+CHECKPOINTS = 'import_checkpoints'
+
+INDEXES = {
+    'movies': [IndexModel('movieId')],
+    # timestamp lets DataProcessor fingerprint ratings by its newest rating without a scan
+    'ratings': [
+        IndexModel('userId'),
+        IndexModel('movieId'),
+        IndexModel([('userId', 1), ('movieId', 1)]),
+        IndexModel('timestamp')
+    ],
+    'tags': [IndexModel('movieId')],
+    'links': [IndexModel('movieId')]
+}
+
 class DataLoader:
     
     def __init__(self):
@@ -18,39 +39,88 @@ class DataLoader:
     def load_csv_to_mongodb(self):
         print("Starting data import to MongoDB...")
         
-        if os.path.exists(f'{Config.DATA_DIR}/{Config.MOVIES_FILE}'):
-            movies_df = pd.read_csv(f'{Config.DATA_DIR}/{Config.MOVIES_FILE}', nrows=20000)
-            movies_df['genres_list'] = movies_df['genres'].str.split('|')
-            movies_collection = self.db['movies']
-            movies_collection.delete_many({})
-            movies_collection.insert_many(movies_df.to_dict('records'))
-            print(f"✓ Loaded {len(movies_df)} movies")
-        
-        if os.path.exists(f'{Config.DATA_DIR}/{Config.RATINGS_FILE}'):
-            ratings_df = pd.read_csv(f'{Config.DATA_DIR}/{Config.RATINGS_FILE}', nrows=20000)
-            ratings_collection = self.db['ratings']
-            ratings_collection.delete_many({})
-            
-            batch_size = 10000
-            for i in range(0, len(ratings_df), batch_size):
-                batch = ratings_df.iloc[i:i+batch_size]
-                ratings_collection.insert_many(batch.to_dict('records'))
-                print(f"  Loaded {min(i+batch_size, len(ratings_df))}/{len(ratings_df)} ratings")
-            print(f"✓ Loaded {len(ratings_df)} ratings")
-        
-        print("⚠️  Skipping tags and links (not essential for core features)")
-        
-        self.create_indexes()
+        self.import_csv('movies', Config.MOVIES_FILE, MOVIES_DTYPES, prepare=self._with_genres_list)
+        self.import_csv('ratings', Config.RATINGS_FILE, RATINGS_DTYPES)
+        self.import_csv('tags', Config.TAGS_FILE, TAGS_DTYPES)
+        self.import_csv('links', Config.LINKS_FILE, LINKS_DTYPES)
         
         print("\n✅ Data import completed successfully!")
     
+    @staticmethod
+    def _with_genres_list(chunk):
+        chunk['genres_list'] = chunk['genres'].astype(str).str.split('|')
+        return chunk
+    
+    def import_csv(self, name, filename, dtypes, prepare=None):
+        """
+        Replace the name collection with the rows of filename; returns the
+        number of rows in the new collection (0 if the file is missing).
+        
+        Rows are streamed in typed chunks through a BulkIngest into
+        <name>_staging, each with its row number in the file as _id, and
+        every batch that lands is recorded in the import_checkpoints
+        document for name. A rerun after a crash skips the recorded batches
+        and re-inserts the rest, where rows a half-written batch already put
+        in staging are rejected as duplicate keys. Once staging holds every
+        row it is indexed and renamed over the live collection with
+        renameCollection, so readers see either the old or the new data.
+        A changed file or batch size discards the staged rows.
+        """
+        path = f'{Config.DATA_DIR}/{filename}'
+        if not os.path.exists(path):
+            print(f"⚠️  Skipping {name}: {path} not found")
+            return 0
+        
+        staging = self.db[f'{name}{STAGING_SUFFIX}']
+        checkpoints = self.db[CHECKPOINTS]
+        fingerprint = csv_fingerprint([path], {'batch_rows': Config.INGEST_BATCH_ROWS, 'row_limit': Config.CSV_ROW_LIMIT})
+        
+        checkpoint = checkpoints.find_one({'_id': name})
+        if checkpoint is None or checkpoint.get('fingerprint') != fingerprint:
+            staging.drop()
+            checkpoint = {'_id': name, 'fingerprint': fingerprint, 'batches': {}}
+            checkpoints.replace_one({'_id': name}, checkpoint, upsert=True)
+        committed = {int(number): rows for number, rows in checkpoint.get('batches', {}).items()}
+        
+        total_rows = estimate_rows(path)
+        if Config.CSV_ROW_LIMIT and total_rows is not None:
+            total_rows = min(total_rows, Config.CSV_ROW_LIMIT)
+        resumed = f", resuming after {len(committed)} batches" if committed else ""
+        print(f"Importing {name} (~{total_rows:,} rows{resumed})" if total_rows is not None else f"Importing {name}{resumed}")
+        
+        def with_row_ids(chunk):
+            if prepare is not None:
+                chunk = prepare(chunk)
+            # The reader's index continues across chunks, so it is the row number in the file
+            chunk.insert(0, '_id', chunk.index.to_numpy(dtype=np.int64))
+            return chunk
+        
+        def record_batch(number, rows):
+            checkpoints.update_one({'_id': name}, {'$set': {f'batches.{number}': rows}})
+            committed[number] = rows
+        
+        chunks = map(with_row_ids, iter_csv_chunks(path, dtypes, Config.INGEST_BATCH_ROWS, Config.CSV_ROW_LIMIT))
+        ingest = BulkIngest(staging, Config.INGEST_WRITERS, Config.INGEST_QUEUE_BATCHES, Config.INGEST_RAW_BSON)
+        ingest.run(chunks, total_rows, name, skip=set(committed), on_batch=record_batch)
+        
+        loaded = sum(committed.values())
+        staged = staging.count_documents({})
+        if staged != loaded:
+            raise RuntimeError(f"{staging.name} holds {staged} documents but {loaded} rows were imported")
+        
+        if INDEXES.get(name):
+            staging.create_indexes(INDEXES[name])
+        staging.rename(name, dropTarget=True)
+        checkpoints.delete_one({'_id': name})
+        print(f"✓ Loaded {loaded:,} {name}")
+        return loaded
+    
     def create_indexes(self):
         print("\nCreating indexes...")
         
-        self.db['movies'].create_index('movieId')
-        self.db['ratings'].create_index('userId')
-        self.db['ratings'].create_index('movieId')
-        self.db['ratings'].create_index([('userId', 1), ('movieId', 1)])
+        # One create_indexes call per collection builds its indexes in a single pass
+        for name, indexes in INDEXES.items():
+            self.db[name].create_indexes(indexes)
         
         print("✓ Indexes created")
     
@@ -1,17 +1,48 @@
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from config import Config
 from pymongo import MongoClient
 import os
+import threading
+import time
+from ratings_index import RatingsIndex
+from csv_loader import MOVIES_DTYPES, RATINGS_DTYPES, read_csv_typed, report_memory
+from mongo_loader import read_collection_columns
+from title_index import TitleSearchIndex
+from genre_index import GenreIndex, MAX_GENRES
+from analytics_rollups import AnalyticsRollups
+from engine_snapshot import EngineSnapshot
+from data_snapshot import csv_fingerprint, mongo_fingerprint, frame_arrays, frame_from_arrays
 
 class DataProcessor:
-    def __init__(self, use_mongodb=True):
+    def __init__(self, use_mongodb=True, snapshot_dir=None):
         self.movies = None
         self.ratings = None
         self.tags = None
         self.links = None
         self.use_mongodb = use_mongodb
         self.db = None
+        # Per-movie rating sums/counts indexed by movieId; stats_version changes
+        # whenever they do and keys the memoized get_movie_stats frame
+        self.stats_version = 0
+        self._rating_sums = np.zeros(0)
+        self._rating_counts = np.zeros(0, dtype=np.int64)
+        self._stats_source = None
+        self._movie_stats_cache = None
+        self._stats_lock = threading.RLock()
+        self._append_listeners = []
+        self._movie_index = None
+        self._ratings_indexes = {}
+        self._title_index = None
+        self._title_popularity = None
+        self._genre_index = None
+        # (ratings frame, AnalyticsRollups) kept current by append_ratings
+        self._analytics = None
+        # Columnar copies of the loaded frames, keyed by a source fingerprint
+        snapshot_dir = Config.DATA_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir
+        self.snapshot = EngineSnapshot(snapshot_dir) if snapshot_dir else None
+        self.fingerprint = None
         
         if use_mongodb:
             try:
@@ -27,61 +58,300 @@ class DataProcessor:
     
     def load_data(self):
         try:
-            if self.use_mongodb and self.db is not None:
-                self._load_from_mongodb()
+            start = time.perf_counter()
+            if self.snapshot is not None and self._source_fingerprint():
+                if not self._load_snapshot():
+                    with self.snapshot.build_lock(self.fingerprint):
+                        if not self._load_snapshot():
+                            self._load_from_source()
+                            self._save_snapshot()
             else:
-                self._load_from_csv()
+                self._load_from_source()
+            print(f"✓ Frames ready in {time.perf_counter() - start:.2f}s")
             
             if 'genres_list' not in self.movies.columns:
                 self.movies['genres_list'] = self.movies['genres'].str.split('|')
             
+            self._build_rating_stats()
+            self._title_search_index()
+            self.genre_index()
+            self.analytics_rollups()
+            
             print(f"Loaded {len(self.movies)} movies, {len(self.ratings)} ratings")
         except Exception as e:
             print(f"Error loading data: {e}")
             raise
     
+    def _load_from_source(self):
+        if self.use_mongodb and self.db is not None:
+            self._load_from_mongodb()
+        else:
+            self._load_from_csv()
+    
+    def _source_fingerprint(self):
+        """
+        Fingerprint of the data source (MongoDB collection counts and newest
+        rating, or CSV file sizes and mtimes), or None if it cannot be read.
+        """
+        try:
+            if self.use_mongodb and self.db is not None:
+                self.fingerprint = mongo_fingerprint(self.db)
+            else:
+                paths = [f'{Config.DATA_DIR}/{Config.MOVIES_FILE}', f'{Config.DATA_DIR}/{Config.RATINGS_FILE}']
+                self.fingerprint = csv_fingerprint(paths, {'row_limit': Config.CSV_ROW_LIMIT})
+        except Exception as e:
+            print(f"⚠️  Could not fingerprint the data source: {e}")
+            self.fingerprint = None
+        return self.fingerprint
+    
+    def _save_snapshot(self):
+        try:
+            movie_arrays, movie_meta = frame_arrays('movies', self.movies, skip=('genres_list',))
+            rating_arrays, rating_meta = frame_arrays('ratings', self.ratings)
+            meta = {'movies': movie_meta, 'ratings': rating_meta}
+            self.snapshot.save(self.fingerprint, {**movie_arrays, **rating_arrays}, meta)
+            print(f"Saved data snapshot {self.fingerprint}")
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not save data snapshot: {e}")
+    
+    def _load_snapshot(self):
+        loaded = self.snapshot.load(self.fingerprint)
+        if loaded is None:
+            return False
+        arrays, meta = loaded
+        
+        self.movies = frame_from_arrays('movies', arrays, meta['movies'])
+        self.ratings = frame_from_arrays('ratings', arrays, meta['ratings'])
+        self.tags = pd.DataFrame()
+        self.links = pd.DataFrame()
+        print(f"✓ Data loaded from snapshot {self.fingerprint}")
+        return True
+    
     def _load_from_mongodb(self):
         print("Loading data from MongoDB...")
         
-        movies_data = list(self.db['movies'].find({}, {'_id': 0}))
-        ratings_data = list(self.db['ratings'].find({}, {'_id': 0}))
-        
-        self.movies = pd.DataFrame(movies_data)
-        self.ratings = pd.DataFrame(ratings_data)
+        self.movies = read_collection_columns(self.db['movies'], MOVIES_DTYPES, batch_size=Config.MONGO_BATCH_SIZE)
+        self.ratings = read_collection_columns(self.db['ratings'], RATINGS_DTYPES, batch_size=Config.MONGO_BATCH_SIZE)
         self.tags = pd.DataFrame()
         self.links = pd.DataFrame()
         
+        report_memory('movies', self.movies)
+        report_memory('ratings', self.ratings)
         print("✓ Data loaded from MongoDB (movies and ratings only)")
     
     def _load_from_csv(self):
         print("Loading data from CSV files...")
         
-        self.movies = pd.read_csv(f'{Config.DATA_DIR}/{Config.MOVIES_FILE}', nrows=20000)
-        self.ratings = pd.read_csv(f'{Config.DATA_DIR}/{Config.RATINGS_FILE}', nrows=20000)
+        self.movies = read_csv_typed(f'{Config.DATA_DIR}/{Config.MOVIES_FILE}', MOVIES_DTYPES,
+                                     Config.CSV_CHUNK_ROWS, Config.CSV_ROW_LIMIT)
+        self.ratings = read_csv_typed(f'{Config.DATA_DIR}/{Config.RATINGS_FILE}', RATINGS_DTYPES,
+                                      Config.CSV_CHUNK_ROWS, Config.CSV_ROW_LIMIT)
         self.tags = pd.DataFrame()
         self.links = pd.DataFrame()
         
+        report_memory('movies', self.movies)
+        report_memory('ratings', self.ratings)
         print("✓ Data loaded from CSV (movies and ratings only)")
     
-    def get_movie_stats(self):
-        stats = self.ratings.groupby('movieId').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
-        stats.columns = ['movieId', 'avg_rating', 'rating_count']
+    def _build_rating_stats(self):
+        with self._stats_lock:
+            self._rating_sums = np.zeros(0)
+            self._rating_counts = np.zeros(0, dtype=np.int64)
+            self._add_to_rating_stats(self.ratings['movieId'].to_numpy(), self.ratings['rating'].to_numpy())
+            self._stats_source = (self.movies, self.ratings)
+            self.stats_version += 1
+    
+    def _add_to_rating_stats(self, movie_ids, ratings):
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if len(movie_ids) == 0:
+            return
         
-        movies_with_stats = self.movies.merge(stats, on='movieId', how='left')
-        movies_with_stats['avg_rating'] = movies_with_stats['avg_rating'].fillna(0)
-        movies_with_stats['rating_count'] = movies_with_stats['rating_count'].fillna(0)
+        size = int(movie_ids.max()) + 1
+        if size > len(self._rating_counts):
+            # Grow geometrically so a stream of new movieIds stays amortized O(1)
+            size = max(size, 2 * len(self._rating_counts))
+            self._rating_sums = np.concatenate([self._rating_sums, np.zeros(size - len(self._rating_sums))])
+            self._rating_counts = np.concatenate([self._rating_counts, np.zeros(size - len(self._rating_counts), dtype=np.int64)])
         
-        return movies_with_stats
+        np.add.at(self._rating_sums, movie_ids, np.asarray(ratings, dtype=np.float64))
+        np.add.at(self._rating_counts, movie_ids, 1)
     
-    def get_genre_distribution(self):
-        genres = []
-        for genre_list in self.movies['genres_list']:
-            if isinstance(genre_list, list):
-                genres.extend(genre_list)
+    def append_ratings(self, new_ratings):
+        """
+        Append rating rows (a DataFrame with at least userId, movieId, rating)
+        and fold them into the movie stats without recomputing the rest.
+        """
+        if len(new_ratings) == 0:
+            return
+        
+        with self._stats_lock:
+            self._ensure_rating_stats()
+            previous = self.ratings
+            self.ratings = pd.concat([self.ratings, new_ratings], ignore_index=True)
+            self._add_to_rating_stats(new_ratings['movieId'].to_numpy(), new_ratings['rating'].to_numpy())
+            self._stats_source = (self.movies, self.ratings)
+            if self._analytics is not None and self._analytics[0] is previous:
+                self._analytics[1].add(new_ratings)
+                self._analytics = (self.ratings, self._analytics[1])
+            # Extend the lookup indexes here, on the appending thread, so
+            # request threads never find them stale and re-sort all ratings
+            for key, index in list(self._ratings_indexes.items()):
+                if index.ratings is previous:
+                    self._ratings_indexes[key] = index.extended(self.ratings, new_ratings)
+            self.stats_version += 1
+            version = self.stats_version
         
-        genre_counts = pd.Series(genres).value_counts()
+        for listener in self._append_listeners:
+            try:
+                listener(new_ratings, version)
+            except Exception as e:
+                print(f"⚠️  Ratings append listener failed: {e}")
+    
+    def add_append_listener(self, listener):
+        """Call listener(new_ratings, stats_version) after every append_ratings"""
+        self._append_listeners.append(listener)
+    
+    def _ensure_rating_stats(self):
+        source = self._stats_source
+        if source is None or source[0] is not self.movies or source[1] is not self.ratings:
+            # movies or ratings were replaced wholesale rather than appended to
+            self._build_rating_stats()
+    
+    def get_movie_stats(self):
+        """
+        Movies with avg_rating and rating_count columns (0 for unrated movies).
+        
+        The frame is memoized until the stats version changes, so callers
+        share it and must not modify it in place.
+        """
+        with self._stats_lock:
+            self._ensure_rating_stats()
+            
+            cache = self._movie_stats_cache
+            if cache is not None and cache[0] == self.stats_version:
+                return cache[1]
+            
+            movie_ids = self.movies['movieId'].to_numpy(dtype=np.int64)
+            known = movie_ids < len(self._rating_counts)
+            sums = np.zeros(len(movie_ids))
+            counts = np.zeros(len(movie_ids))
+            sums[known] = self._rating_sums[movie_ids[known]]
+            counts[known] = self._rating_counts[movie_ids[known]]
+            
+            movies_with_stats = self.movies.copy()
+            movies_with_stats['avg_rating'] = np.divide(sums, counts, out=np.zeros(len(movie_ids)), where=counts > 0)
+            movies_with_stats['rating_count'] = counts
+            
+            self._movie_stats_cache = (self.stats_version, movies_with_stats)
+            return movies_with_stats
+    
+    def _movie_row_index(self):
+        """Dense movieId -> row position array (-1 for unknown ids), rebuilt when movies is replaced"""
+        index = self._movie_index
+        if index is None or index[0] is not self.movies:
+            movie_ids = self.movies['movieId'].to_numpy(dtype=np.int64)
+            row_index = np.full(int(movie_ids.max()) + 1 if len(movie_ids) else 0, -1, dtype=np.int32)
+            # Assigned in reverse so the first row wins for a duplicated movieId
+            row_index[movie_ids[::-1]] = np.arange(len(movie_ids), dtype=np.int32)[::-1]
+            index = (self.movies, row_index)
+            self._movie_index = index
+        return index[1]
+    
+    def movie_rows(self, movie_ids):
+        """Row positions of movie_ids in self.movies, in the given order; unknown ids are dropped"""
+        row_index = self._movie_row_index()
+        movie_ids = np.asarray(movie_ids, dtype=np.int64).ravel()
+        in_range = (movie_ids >= 0) & (movie_ids < len(row_index))
+        rows = np.full(len(movie_ids), -1, dtype=np.int64)
+        rows[in_range] = row_index[movie_ids[in_range]]
+        return rows[rows >= 0]
+    
+    def get_movies(self, movie_ids, with_stats=False):
+        """
+        Movies for movie_ids as a DataFrame in the requested order, with
+        avg_rating and rating_count columns when with_stats is set.
+        """
+        frame = self.get_movie_stats() if with_stats else self.movies
+        return frame.iloc[self.movie_rows(movie_ids)]
+    
+    def get_movie(self, movie_id, with_stats=False):
+        """One movie as a dict, or None if the id is unknown"""
+        movies = self.get_movies([movie_id], with_stats)
+        return movies.to_dict('records')[0] if len(movies) else None
+    
+    def _ratings_index(self, key):
+        """
+        RatingsIndex over key, extended by append_ratings and rebuilt only
+        when ratings is replaced wholesale
+        """
+        index = self._ratings_indexes.get(key)
+        if index is not None and index.ratings is self.ratings:
+            return index
+        with self._stats_lock:
+            # Re-checked under the lock so concurrent requests share one rebuild
+            index = self._ratings_indexes.get(key)
+            if index is None or index.ratings is not self.ratings:
+                index = RatingsIndex(self.ratings, key)
+                self._ratings_indexes[key] = index
+            return index
+    
+    def user_ratings(self, user_id):
+        """UserRatings(movie_ids, ratings, timestamps, rows) as views, in frame order"""
+        return self._ratings_index('userId').group(user_id)
+    
+    def movie_ratings(self, movie_id):
+        """MovieRatings(user_ids, ratings, timestamps, rows) as views, in frame order"""
+        return self._ratings_index('movieId').group(movie_id)
+    
+    def user_ratings_frame(self, user_id):
+        """The user's rows of the ratings frame"""
+        index = self._ratings_index('userId')
+        return index.ratings.iloc[index.group(user_id).rows]
+    
+    def genre_index(self):
+        """GenreIndex (per-movie bitmasks and per-genre postings), rebuilt when movies is replaced"""
+        index = self._genre_index
+        if index is None or index.movies is not self.movies:
+            index = GenreIndex(self.movies)
+            self._genre_index = index
+        return index
+    
+    def analytics_rollups(self):
+        """
+        AnalyticsRollups over the ratings, folded forward by append_ratings
+        and rebuilt only when ratings is replaced wholesale.
+        """
+        with self._stats_lock:
+            analytics = self._analytics
+            if analytics is None or analytics[0] is not self.ratings:
+                analytics = (self.ratings, AnalyticsRollups(self.ratings))
+                self._analytics = analytics
+            return analytics[1]
+    
+    def get_rating_distribution(self):
+        """Rating value -> count, ascending by value"""
+        with self._stats_lock:
+            return self.analytics_rollups().rating_distribution()
+    
+    def get_yearly_trends(self):
+        """[{year, avg_rating, count}] for each year with ratings, ascending"""
+        with self._stats_lock:
+            return self.analytics_rollups().yearly_trends()
+    
+    def get_user_activity(self):
+        """total_users, total_ratings, avg_ratings_per_user and the ten most_active_users"""
+        with self._stats_lock:
+            return self.analytics_rollups().user_activity()
+    
+    def genre_mask(self, genres, match='any'):
+        """
+        Boolean mask over the rows of self.movies (and of get_movie_stats())
+        for movies with any, or all, of the named genres.
+        """
+        return self.genre_index().select(genres, match)
+    
+    def get_genre_distribution(self):
+        genre_counts = pd.Series(self.genre_index().counts()).sort_values(ascending=False, kind='stable')
         return genre_counts.to_dict()
     
     def get_top_rated_movies(self, min_ratings=50, limit=20):
@@ -89,40 +359,143 @@ class DataProcessor:
         top_movies = stats[stats['rating_count'] >= min_ratings].nlargest(limit, 'avg_rating')
         return top_movies.to_dict('records')
     
+    def _title_search_index(self):
+        """TitleSearchIndex over movie titles, rebuilt when movies is replaced"""
+        index = self._title_index
+        if index is None or index[0] is not self.movies:
+            index = (self.movies, TitleSearchIndex(self.movies['title'].fillna('').tolist()))
+            self._title_index = index
+        return index[1]
+    
+    def _movie_rating_counts(self):
+        """Rating count per row of self.movies, cached per stats version"""
+        with self._stats_lock:
+            self._ensure_rating_stats()
+            cache = self._title_popularity
+            if cache is None or cache[0] != self.stats_version or cache[1] is not self.movies:
+                movie_ids = self.movies['movieId'].to_numpy(dtype=np.int64)
+                known = movie_ids < len(self._rating_counts)
+                counts = np.zeros(len(movie_ids), dtype=np.int64)
+                counts[known] = self._rating_counts[movie_ids[known]]
+                cache = (self.stats_version, self.movies, counts)
+                self._title_popularity = cache
+            return cache[2]
+    
     def search_movies(self, query, limit=50):
-        query = query.lower()
-        results = self.movies[self.movies['title'].str.lower().str.contains(query, na=False)]
-        return results.head(limit).to_dict('records')
+        """
+        Movies whose title contains query (case- and accent-insensitive),
+        best matches first: whole title, title prefix, word prefix, then
+        anywhere, ties broken by rating count.
+        """
+        rows = self._title_search_index().search(query, limit, popularity=self._movie_rating_counts())
+        return self.movies.iloc[rows].to_dict('records')
     
-    def get_movies_by_genre(self, genre, limit=50):
-        results = self.movies[self.movies['genres'].str.contains(genre, case=False, na=False)]
-        return results.head(limit).to_dict('records')
+    def get_movies_by_genre(self, genre, limit=50, match='any'):
+        """Movies in a genre (or a list of genres, matching any or all), by movieId"""
+        genres = [genre] if isinstance(genre, str) else genre
+        movie_ids = self.genre_index().movie_ids(genres, match)
+        return self.get_movies(movie_ids[:limit]).to_dict('records')
     
     def get_user_rating_stats(self, user_id):
-        user_ratings = self.ratings[self.ratings['userId'] == user_id]
-        
-        if len(user_ratings) == 0:
-            return None
+        return self.get_users_rating_stats([user_id]).get(user_id)
+    
+    def get_users_rating_stats(self, user_ids, top_n=5):
+        """get_user_rating_stats for many users at once, keyed by userId; users without ratings are left out"""
+        index = self._ratings_index('userId')
+        genre_sums, genre_counts, first_seen = self._user_genre_totals(user_ids, with_first_seen=True)
         
-        return {
-            'total_ratings': len(user_ratings),
-            'avg_rating': float(user_ratings['rating'].mean()),
-            'favorite_genres': self._get_user_favorite_genres(user_id)
-        }
+        stats = {}
+        for i, user_id in enumerate(user_ids):
+            start, end = index.bounds(user_id)
+            if end == start:
+                continue
+            stats[user_id] = {
+                'total_ratings': int(end - start),
+                'avg_rating': float(index.values[start:end].mean(dtype=np.float64)),
+                'favorite_genres': self._top_genres(genre_sums[i], genre_counts[i], first_seen[i], top_n)
+            }
+        return stats
     
-    def _get_user_favorite_genres(self, user_id, top_n=5):
-        user_ratings = self.ratings[self.ratings['userId'] == user_id]
-        rated_movies = self.movies[self.movies['movieId'].isin(user_ratings['movieId'])]
+    def _user_genre_totals(self, user_ids, with_first_seen=False):
+        """
+        Per-genre rating sums and rated-movie counts (users x genres) from one
+        sparse matmul of the user x movie rating matrix with the movie x genre
+        indicator matrix.
+        A movie rated twice by a user counts once, with its first rating.
+        
+        with_first_seen adds a third (users x genres) array ranking where each
+        genre first appears among the user's rated movies, walked in catalog
+        row order and then genres_list order; _top_genres breaks ties by it.
+        """
+        index = self._ratings_index('userId')
+        genre_index = self.genre_index()
+        row_index = self._movie_row_index()
         
-        genre_ratings = {}
-        for _, row in rated_movies.iterrows():
-            rating = user_ratings[user_ratings['movieId'] == row['movieId']]['rating'].values[0]
-            for genre in row['genres_list']:
-                if genre not in genre_ratings:
-                    genre_ratings[genre] = []
-                genre_ratings[genre].append(rating)
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        valid = (user_ids >= 0) & (user_ids < len(index.offsets) - 1)
+        starts = np.zeros(len(user_ids), dtype=np.int64)
+        ends = np.zeros(len(user_ids), dtype=np.int64)
+        starts[valid] = index.offsets[user_ids[valid]]
+        ends[valid] = index.offsets[user_ids[valid] + 1]
+        lengths = ends - starts
         
-        avg_genre_ratings = {genre: np.mean(ratings) for genre, ratings in genre_ratings.items()}
-        sorted_genres = sorted(avg_genre_ratings.items(), key=lambda x: x[1], reverse=True)
+        # Sorted-column positions of every user's ratings, user by user
+        user_pos = np.repeat(np.arange(len(user_ids)), lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        movie_ids = index.other_ids[positions].astype(np.int64)
+        ratings = index.values[positions].astype(np.float64)
         
-        return [genre for genre, _ in sorted_genres[:top_n]]
+        # First rating per (user, movie), for movies in the catalog
+        _, first = np.unique(user_pos * (int(movie_ids.max(initial=0)) + 1) + movie_ids, return_index=True)
+        user_pos, movie_ids, ratings = user_pos[first], movie_ids[first], ratings[first]
+        rows = np.full(len(movie_ids), -1, dtype=np.int64)
+        in_range = movie_ids < len(row_index)
+        rows[in_range] = row_index[movie_ids[in_range]]
+        known = rows >= 0
+        
+        shape = (len(user_ids), len(self.movies))
+        rated = sparse.csr_matrix((ratings[known], (user_pos[known], rows[known])), shape=shape)
+        seen = sparse.csr_matrix((np.ones(known.sum()), (user_pos[known], rows[known])), shape=shape)
+        genre_sums = np.asarray((rated @ genre_index.indicator).todense())
+        genre_counts = np.asarray((seen @ genre_index.indicator).todense())
+        if not with_first_seen:
+            return genre_sums, genre_counts
+        
+        user_pos, rows = user_pos[known], rows[known]
+        row_starts = genre_index.row_offsets[rows]
+        n_genres = genre_index.row_offsets[rows + 1] - row_starts
+        slots = np.arange(n_genres.sum()) - np.repeat(np.cumsum(n_genres) - n_genres, n_genres) + np.repeat(row_starts, n_genres)
+        order_keys = np.repeat(rows, n_genres) * MAX_GENRES + (slots - np.repeat(row_starts, n_genres))
+        first_seen = np.full(genre_sums.shape, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_seen, (np.repeat(user_pos, n_genres), genre_index.row_genres[slots]), order_keys)
+        return genre_sums, genre_counts, first_seen
+    
+    def get_user_genre_affinities(self, user_ids):
+        """
+        (users x genres) mean rating the users gave each genre, 0 where they
+        rated none of it, and the rated-movie counts behind it. Columns follow
+        genre_index().genres.
+        """
+        genre_sums, genre_counts = self._user_genre_totals(user_ids)
+        affinities = np.divide(genre_sums, genre_counts, out=np.zeros_like(genre_sums), where=genre_counts > 0)
+        return affinities, genre_counts
+    
+    def _top_genres(self, genre_sums, genre_counts, first_seen, top_n):
+        """
+        Highest-rated genres by mean rating; ties keep the order the genres
+        first appear in among the user's rated movies (see _user_genre_totals).
+        """
+        genres = self.genre_index().genres
+        rated = np.flatnonzero(genre_counts > 0)
+        averages = genre_sums[rated] / genre_counts[rated]
+        order = np.lexsort((first_seen[rated], -averages))
+        return [genres[g] for g in rated[order[:top_n]]]
+    
+    def _get_user_favorite_genres(self, user_id, top_n=5):
+        genre_sums, genre_counts, first_seen = self._user_genre_totals([user_id], with_first_seen=True)
+        return self._top_genres(genre_sums[0], genre_counts[0], first_seen[0], top_n)
+    
+    def get_users_favorite_genres(self, user_ids, top_n=5):
+        """_get_user_favorite_genres for many users from one matmul, keyed by userId"""
+        genre_sums, genre_counts, first_seen = self._user_genre_totals(user_ids, with_first_seen=True)
+        return {user_id: self._top_genres(genre_sums[i], genre_counts[i], first_seen[i], top_n) for i, user_id in enumerate(user_ids)}
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+DATA_SNAPSHOT_FORMAT = 2
+
+def _digest(parts):
+    digest = hashlib.sha1(f'format={DATA_SNAPSHOT_FORMAT}'.encode())
+    digest.update(json.dumps(parts, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+def csv_fingerprint(paths, settings=None):
+    """Hex digest of the source files' sizes and modification times"""
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return _digest({'source': 'csv', 'files': files, 'settings': settings})
+
+def mongo_fingerprint(db, settings=None):
+    """
+    Hex digest of the movies and ratings collections' document counts and
+    the newest rating, which change whenever ratings are imported. The
+    newest rating is found through the ratings.timestamp index, or through
+    the _id index where that is missing, so neither scans the collection.
+    """
+    ratings = db['ratings']
+    if 'timestamp_1' in ratings.index_information():
+        newest = ratings.find_one({}, {'_id': 0, 'timestamp': 1}, sort=[('timestamp', -1)]) or {}
+    else:
+        newest = ratings.find_one({}, {'_id': 1}, sort=[('_id', -1)]) or {}
+    return _digest({
+        'source': 'mongodb',
+        'movies': db['movies'].estimated_document_count(),
+        'ratings': ratings.estimated_document_count(),
+        'newest_rating': newest,
+        'settings': settings
+    })
+
+def frame_arrays(name, frame, skip=()):
+    """
+    (arrays, meta) storing frame column by column: numeric columns as they
+    are, categoricals as codes with the categories in meta, and string
+    columns as one UTF-8 buffer plus offsets, with a null mask when some
+    values are missing. Columns in skip (such as genres_list) are left out
+    for the loader to derive again; any other column that cannot be stored
+    raises ValueError, so an incomplete snapshot is never written.
+    """
+    arrays = {}
+    columns = []
+    for column in frame.columns:
+        if column in skip:
+            continue
+        series = frame[column]
+        key = f'{name}.{column}'
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[key] = series.cat.codes.to_numpy()
+            columns.append({'name': column, 'kind': 'category', 'categories': [str(c) for c in series.cat.categories]})
+        elif series.dtype.kind in 'biuf':
+            arrays[key] = series.to_numpy()
+            columns.append({'name': column, 'kind': 'numeric'})
+        else:
+            nulls = series.isna().to_numpy()
+            values = series.tolist()
+            if not all(isinstance(v, str) for v, null in zip(values, nulls) if not null):
+                raise ValueError(f"Cannot snapshot {key}: values are neither strings nor missing")
+            encoded = [b'' if null else value.encode('utf-8') for value, null in zip(values, nulls)]
+            arrays[f'{key}.offsets'] = np.concatenate([[0], np.cumsum([len(b) for b in encoded])]).astype(np.int64)
+            arrays[f'{key}.bytes'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            if nulls.any():
+                arrays[f'{key}.nulls'] = nulls
+            columns.append({'name': column, 'kind': 'string', 'nulls': bool(nulls.any())})
+    return arrays, {'columns': columns, 'rows': len(frame)}
+
+def frame_from_arrays(name, arrays, meta):
+    """The frame saved by frame_arrays; numeric columns stay memory-mapped views"""
+    data = {}
+    for column in meta['columns']:
+        key = f"{name}.{column['name']}"
+        if column['kind'] == 'numeric':
+            data[column['name']] = arrays[key]
+        elif column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(np.asarray(arrays[key]), column['categories'])
+        else:
+            buffer = arrays[f'{key}.bytes'].tobytes()
+            offsets = arrays[f'{key}.offsets'].tolist()
+            values = np.array(
+                [buffer[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])],
+                dtype=object
+            )
+            if column.get('nulls'):
+                values[np.asarray(arrays[f'{key}.nulls'])] = np.nan
+            data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,122 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized across processes
+    fcntl = None
+
+SNAPSHOT_FORMAT = 1
+
+def data_fingerprint(ratings, movies, settings=None):
+    """
+    Hex digest identifying the model inputs: the rating triples, the movie
+    catalog's ids and genres, and any build settings that change the output.
+    """
+    digest = hashlib.sha1(f'format={SNAPSHOT_FORMAT}'.encode())
+    for column in ['userId', 'movieId', 'rating']:
+        values = np.ascontiguousarray(ratings[column].to_numpy())
+        digest.update(f'{column}:{values.dtype}:{len(values)}'.encode())
+        digest.update(values.tobytes())
+
+    digest.update(np.ascontiguousarray(movies['movieId'].to_numpy()).tobytes())
+    digest.update(pd.util.hash_pandas_object(movies['genres'].astype(str), index=False).to_numpy().tobytes())
+
+    if settings:
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+class EngineSnapshot:
+    """
+    Built engine arrays stored as one .npy file each under root_dir/<fingerprint>/.
+
+    Loading memory-maps every array read-only, so processes that open the same
+    snapshot share its pages through the OS page cache instead of each
+    holding a private copy. A snapshot directory only appears once all of its
+    files are written.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def path(self, fingerprint):
+        return os.path.join(self.root_dir, fingerprint)
+
+    def exists(self, fingerprint):
+        return os.path.exists(os.path.join(self.path(fingerprint), 'meta.json'))
+
+    @contextlib.contextmanager
+    def build_lock(self, fingerprint):
+        """
+        Hold an exclusive lock while building a fingerprint, so concurrent
+        workers wait for the first build and then load its snapshot.
+        """
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(os.path.join(self.root_dir, f'{fingerprint}.lock'), 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, fingerprint, arrays, meta=None):
+        final_path = self.path(fingerprint)
+        tmp_path = f'{final_path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_path, exist_ok=True)
+
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), np.asarray(array))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'arrays': sorted(arrays), **(meta or {})}, f)
+
+        if os.path.exists(final_path):
+            shutil.rmtree(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        self.prune(keep=fingerprint)
+
+    def load(self, fingerprint):
+        """(arrays, meta) with arrays memory-mapped read-only, or None if absent"""
+        if not self.exists(fingerprint):
+            return None
+
+        snapshot_path = self.path(fingerprint)
+        with open(os.path.join(snapshot_path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(snapshot_path, f'{name}.npy'), mmap_mode='r')
+            for name in meta['arrays']
+        }
+        return arrays, meta
+
+    def prune(self, keep):
+        """Remove snapshots and build locks of other fingerprints"""
+        for name in os.listdir(self.root_dir):
+            entry = os.path.join(self.root_dir, name)
+            if name.endswith('.lock'):
+                if name != f'{keep}.lock':
+                    self._remove_lock(entry)
+            elif name != keep and os.path.isdir(entry) and '.tmp-' not in name:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _remove_lock(path):
+        """Delete a lock file unless some process is building under it right now"""
+        try:
+            with open(path, 'a') as lock_file:
+                if fcntl:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        return
+                # Unlinked while held, so nobody who locked it before can be mid-build
+                os.remove(path)
+        except OSError:
+            pass
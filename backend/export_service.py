@@ -26,8 +26,7 @@ class ExportService:
             'statistics': {}
         }
         
-        user_ratings = data_processor.ratings[data_processor.ratings['userId'] == user_id]
-        user_data['ratings'] = user_ratings.to_dict('records')
+        user_data['ratings'] = data_processor.user_ratings_frame(user_id).to_dict('records')
         
         if db is not None:
             watchlist = list(db['watchlists'].find({'userId': user_id}))
@@ -47,13 +46,8 @@ class ExportService:
             'recommendations': []
         }
         
-        for movie_id in recommendations:
-            movie = data_processor.movies[data_processor.movies['movieId'] == movie_id]
-            if not movie.empty:
-                movie_data = movie.iloc[0].to_dict()
-                ratings = data_processor.ratings[data_processor.ratings['movieId'] == movie_id]
-                movie_data['avg_rating'] = float(ratings['rating'].mean()) if len(ratings) > 0 else 0
-                movie_data['rating_count'] = len(ratings)
-                report['recommendations'].append(movie_data)
+        for movie_data in data_processor.get_movies(recommendations, with_stats=True).to_dict('records'):
+            movie_data['rating_count'] = int(movie_data['rating_count'])
+            report['recommendations'].append(movie_data)
         
         return report
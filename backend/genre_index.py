@@ -0,0 +1,100 @@
+import numpy as np
+from scipy import sparse
+
+MAX_GENRES = 32
+
+def check_match(match):
+    if match not in ('any', 'all'):
+        raise ValueError(f"match must be 'any' or 'all', got {match!r}")
+
+class GenreIndex:
+    """
+    Genre membership for a movies frame as a uint32 bitmask per row.
+
+    Each distinct genre in genres_list gets one bit (in sorted order), so
+    ANY/ALL filters over several genres are one bitwise AND and compare over
+    the masks array. Genre names match whole and case-insensitively:
+    'Sci' no longer matches 'Sci-Fi'. postings holds the sorted movieIds of
+    each genre for callers that want ids rather than row masks, indicator
+    the same membership as a sparse movie-row x genre matrix, and
+    row_genres[row_offsets[r]:row_offsets[r + 1]] row r's genre columns in
+    genres_list order.
+    """
+
+    def __init__(self, movies):
+        self.movies = movies
+        genre_lists = [g if isinstance(g, list) else [] for g in movies['genres_list']]
+
+        self.genres = sorted({genre for genres in genre_lists for genre in genres})
+        if len(self.genres) > MAX_GENRES:
+            raise ValueError(f"{len(self.genres)} genres do not fit a uint32 bitmask")
+        self.bits = {genre.lower(): np.uint32(1 << i) for i, genre in enumerate(self.genres)}
+
+        self.masks = np.zeros(len(movies), dtype=np.uint32)
+        row_genres = []
+        self.row_offsets = np.zeros(len(movies) + 1, dtype=np.int64)
+        for row, genres in enumerate(genre_lists):
+            for genre in genres:
+                bit = self.bits[genre.lower()]
+                if not self.masks[row] & bit:
+                    row_genres.append(int(bit).bit_length() - 1)
+                self.masks[row] |= bit
+            self.row_offsets[row + 1] = len(row_genres)
+        self.row_genres = np.array(row_genres, dtype=np.int64)
+
+        bits = (self.masks[:, None] >> np.arange(len(self.genres), dtype=np.uint32)) & 1
+        self.indicator = sparse.csr_matrix(bits.astype(np.float64))
+
+        movie_ids = movies['movieId'].to_numpy(dtype=np.int64)
+        self.postings = {
+            genre: np.unique(movie_ids[(self.masks & self.bits[genre.lower()]) != 0]).astype(np.int32)
+            for genre in self.genres
+        }
+
+    def mask_of(self, genres):
+        """
+        (bitmask, all_known) for genre names; unknown names add no bit and
+        clear all_known.
+        """
+        mask = np.uint32(0)
+        all_known = True
+        for genre in genres:
+            bit = self.bits.get(str(genre).strip().lower())
+            if bit is None:
+                all_known = False
+            else:
+                mask |= bit
+        return mask, all_known
+
+    def select(self, genres, match='any'):
+        """Boolean row mask of movies with any (or all) of genres"""
+        check_match(match)
+        mask, all_known = self.mask_of(genres)
+        if match == 'all':
+            if not all_known:
+                return np.zeros(len(self.masks), dtype=bool)
+            return (self.masks & mask) == mask
+        return (self.masks & mask) != 0
+
+    def movie_ids(self, genres, match='any'):
+        """Sorted movieIds with any (or all) of genres, merged from the postings"""
+        check_match(match)
+        postings = []
+        for genre in genres:
+            bit = self.bits.get(str(genre).strip().lower())
+            if bit is not None:
+                postings.append(self.postings[self.genres[int(bit).bit_length() - 1]])
+            elif match == 'all':
+                return np.empty(0, dtype=np.int32)
+
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+
+        ids = postings[0]
+        for posting in postings[1:]:
+            ids = np.intersect1d(ids, posting, assume_unique=True) if match == 'all' else np.union1d(ids, posting)
+        return ids
+
+    def counts(self):
+        """Movies per genre"""
+        return {genre: int(np.count_nonzero(self.masks & self.bits[genre.lower()])) for genre in self.genres}
@@ -22,9 +22,9 @@ class ExplainerService:
         
         genre_score = self.get_genre_match_score(user_id, movie_id)
         if genre_score > 0.5:
-            movie_data = self.data_processor.movies[self.data_processor.movies['movieId'] == movie_id]
-            if not movie_data.empty:
-                genres = movie_data.iloc[0]['genres_list']
+            movie_data = self.data_processor.get_movie(movie_id)
+            if movie_data is not None:
+                genres = movie_data['genres_list']
                 reasons.append({
                     'type': 'genre_match',
                     'description': 'Matches your favorite genres',
@@ -38,8 +38,8 @@ class ExplainerService:
         
         predicted_rating = self.model.predict(user_id, movie_id)
         
-        movie_data = self.data_processor.movies[self.data_processor.movies['movieId'] == movie_id]
-        movie_title = movie_data.iloc[0]['title'] if not movie_data.empty else f"Movie {movie_id}"
+        movie_data = self.data_processor.get_movie(movie_id)
+        movie_title = movie_data['title'] if movie_data is not None else f"Movie {movie_id}"
         
         explanation = {
             'movie_id': movie_id,
@@ -52,10 +52,10 @@ class ExplainerService:
         return explanation
     
     def find_similar_rated_movies(self, user_id, movie_id, n=3):
-        user_ratings = self.data_processor.ratings[self.data_processor.ratings['userId'] == user_id]
-        high_rated = user_ratings[user_ratings['rating'] >= 4.0]
+        user_ratings = self.data_processor.user_ratings(user_id)
+        high_rated = user_ratings.ratings >= 4.0
         
-        if high_rated.empty:
+        if not high_rated.any():
             return []
         
         movie_embedding = self.model.get_movie_embedding(movie_id)
@@ -63,25 +63,24 @@ class ExplainerService:
             return []
         
         similarities = []
-        for _, row in high_rated.iterrows():
-            rated_movie_id = row['movieId']
+        for rated_movie_id, rating in zip(user_ratings.movie_ids[high_rated].tolist(), user_ratings.ratings[high_rated].tolist()):
             if rated_movie_id == movie_id:
                 continue
             
             rated_embedding = self.model.get_movie_embedding(rated_movie_id)
             if rated_embedding is not None:
                 sim = cosine_similarity([movie_embedding], [rated_embedding])[0][0]
-                similarities.append((rated_movie_id, row['rating'], sim))
+                similarities.append((rated_movie_id, rating, sim))
         
         similarities.sort(key=lambda x: x[2], reverse=True)
         
         similar_movies = []
         for rated_movie_id, rating, sim in similarities[:n]:
-            movie_data = self.data_processor.movies[self.data_processor.movies['movieId'] == rated_movie_id]
-            if not movie_data.empty:
+            movie_data = self.data_processor.get_movie(rated_movie_id)
+            if movie_data is not None:
                 similar_movies.append({
                     'id': int(rated_movie_id),
-                    'title': movie_data.iloc[0]['title'],
+                    'title': movie_data['title'],
                     'your_rating': float(rating),
                     'similarity': float(sim)
                 })
@@ -95,11 +94,11 @@ class ExplainerService:
         
         favorite_genres = set(user_stats['favorite_genres'])
         
-        movie_data = self.data_processor.movies[self.data_processor.movies['movieId'] == movie_id]
-        if movie_data.empty:
+        movie_data = self.data_processor.get_movie(movie_id)
+        if movie_data is None:
             return 0.0
         
-        movie_genres = set(movie_data.iloc[0]['genres_list'])
+        movie_genres = set(movie_data['genres_list'])
         
         if not movie_genres:
             return 0.0
@@ -114,16 +113,15 @@ class ExplainerService:
         if user_embedding is None:
             return None
         
-        movie_ratings = self.data_processor.ratings[self.data_processor.ratings['movieId'] == movie_id]
+        movie_ratings = self.data_processor.movie_ratings(movie_id)
         
-        if movie_ratings.empty:
+        if len(movie_ratings.ratings) == 0:
             return None
         
         similar_count = 0
         total_rating = 0
         
-        for _, row in movie_ratings.iterrows():
-            other_user_id = row['userId']
+        for other_user_id, rating in zip(movie_ratings.user_ids.tolist(), movie_ratings.ratings.tolist()):
             if other_user_id == user_id:
                 continue
             
@@ -132,7 +130,7 @@ class ExplainerService:
                 sim = cosine_similarity([user_embedding], [other_embedding])[0][0]
                 if sim > 0.7:
                     similar_count += 1
-                    total_rating += row['rating']
+                    total_rating += rating
         
         if similar_count == 0:
             return None
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 from ml.ml_logger import get_ml_logger
+from ratings_index import RatingsIndex
 import json
 import os
 
@@ -16,6 +17,7 @@ class FeatureEngineer:
         self.user_feature_params = {}
         self.movie_feature_params = {}
         self.genre_list = []
+        self._user_index = None
         
     def extract_user_features(self, ratings_df: pd.DataFrame, user_id: int) -> np.ndarray:
         """
@@ -23,7 +25,10 @@ class FeatureEngineer:
         
         Requirements: 4.1
         """
-        user_ratings = ratings_df[ratings_df['userId'] == user_id]
+        # Index the frame by user once and reuse it while the same frame is passed in
+        if self._user_index is None or self._user_index.ratings is not ratings_df:
+            self._user_index = RatingsIndex(ratings_df, 'userId')
+        user_ratings = self._user_index.group(user_id).ratings
         
         if len(user_ratings) == 0:
             # Return default features for users with no ratings
@@ -32,11 +37,11 @@ class FeatureEngineer:
         features = []
         
         # Rating statistics
-        features.append(user_ratings['rating'].mean())  # avg_rating
-        features.append(user_ratings['rating'].std() if len(user_ratings) > 1 else 0)  # rating_std
+        features.append(user_ratings.mean())  # avg_rating
+        features.append(user_ratings.std(ddof=1) if len(user_ratings) > 1 else 0)  # rating_std
         features.append(len(user_ratings))  # rating_count
-        features.append(user_ratings['rating'].min())  # min_rating
-        features.append(user_ratings['rating'].max())  # max_rating
+        features.append(user_ratings.min())  # min_rating
+        features.append(user_ratings.max())  # max_rating
         
         return np.array(features)
     
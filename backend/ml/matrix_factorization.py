@@ -117,7 +117,48 @@ class MatrixFactorizationModel:
         
         predictions.sort(key=lambda x: x[1], reverse=True)
         return [movie_id for movie_id, _ in predictions[:n]]
-    
+
+    def recommend_batch(self, user_ids, n=10, rated_movies=None, block_size=512):
+        """
+        recommend() for many users, scoring blocks of users in one matrix
+        product. rated_movies maps user_id -> movie ids to exclude. Yields
+        (user_id, movie_ids) in input order; users unknown to the model get
+        an empty list.
+        """
+        rated_movies = rated_movies or {}
+        movie_ids = np.array([self.reverse_movie_map[idx] for idx in range(len(self.movie_factors))])
+        movie_id_to_idx = self.movie_id_map
+        base = self.global_mean + self.movie_bias
+        k = min(n, len(movie_ids))
+
+        for start in range(0, len(user_ids), block_size):
+            block_ids = list(user_ids[start:start + block_size])
+            results = [[] for _ in block_ids]
+            known = [(pos, uid) for pos, uid in enumerate(block_ids) if uid in self.user_id_map]
+            if not known or k <= 0:
+                yield from zip(block_ids, results)
+                continue
+
+            user_idx = np.array([self.user_id_map[uid] for _, uid in known])
+            scores = self.user_factors[user_idx] @ self.movie_factors.T
+            scores += base
+            scores += self.user_bias[user_idx][:, None]
+            np.clip(scores, 0.5, 5.0, out=scores)
+
+            for row, (_, uid) in enumerate(known):
+                rated = [movie_id_to_idx[mid] for mid in rated_movies.get(uid, ()) if mid in movie_id_to_idx]
+                scores[row, rated] = -np.inf
+
+            # Clipping leaves many ties, so take everything at or above the
+            # k-th score and order it like recommend(): score, then movie index
+            kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+            for row, (pos, _) in enumerate(known):
+                cols = np.flatnonzero((scores[row] >= kth[row]) & np.isfinite(scores[row]))
+                cols = cols[np.lexsort((cols, -scores[row, cols]))[:k]]
+                results[pos] = [int(mid) for mid in movie_ids[cols]]
+
+            yield from zip(block_ids, results)
+
     def get_user_embedding(self, user_id):
         if user_id not in self.user_id_map:
             return None
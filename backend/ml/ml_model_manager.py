@@ -35,6 +35,18 @@ class MLModelManager:
         logger.info(f"Model saved: {model_type} {version}")
         return version
     
+    def resolve_version(self, model_type, version='latest'):
+        """The concrete version 'latest' points to (other versions pass through), or None"""
+        if version != 'latest':
+            return version
+        model_dir = os.path.join(self.models_dir, model_type)
+        latest_link = os.path.join(model_dir, 'latest.txt')
+        if os.path.exists(latest_link):
+            with open(latest_link, 'r') as f:
+                return f.read().strip()
+        versions = self.list_versions(model_type)
+        return versions[-1]['version'] if versions else None
+    
     def load_model(self, model_type, version='latest'):
         model_dir = os.path.join(self.models_dir, model_type)
         
@@ -42,16 +54,9 @@ class MLModelManager:
             logger.warning(f"Model directory not found: {model_dir}")
             return None
         
-        if version == 'latest':
-            latest_link = os.path.join(model_dir, 'latest.txt')
-            if os.path.exists(latest_link):
-                with open(latest_link, 'r') as f:
-                    version = f.read().strip()
-            else:
-                versions = self.list_versions(model_type)
-                if not versions:
-                    return None
-                version = versions[-1]['version']
+        version = self.resolve_version(model_type, version)
+        if version is None:
+            return None
         
         model_path = os.path.join(model_dir, f'{version}.pkl')
         
@@ -1,89 +1,537 @@
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
 from config import Config
+from similarity_index import BlockwiseSimilarityBuilder, ItemNeighborIndex, print_progress
+from ann_index import RandomProjectionLSH
+from engine_snapshot import EngineSnapshot, data_fingerprint
+import os
+import threading
 
 class RecommendationEngine:
-    def __init__(self, data_processor):
+    def __init__(self, data_processor, sparse_matrix=None, n_neighbors=None, snapshot_dir=None):
         self.dp = data_processor
+        self.sparse_matrix = Config.CF_SPARSE_MATRIX if sparse_matrix is None else sparse_matrix
+        self.n_neighbors = Config.ITEM_NEIGHBORS_K if n_neighbors is None else n_neighbors
         self.user_item_matrix = None
+        self.user_ids = None
+        self.movie_ids = None
+        self.user_id_to_idx = {}
+        self.user_norms = None
         self.movie_similarity_matrix = None
+        self.item_neighbors = None
+        self.user_ann_index = None
         self.content_similarity_matrix = None
+        self.movie_signatures = None
+        self.signature_members = None
+        self.signature_offsets = None
+        self.similar_movies = None
+        self.movie_row_index = None
+        self._content_catalog = None
+        self._similar_lookup = None
+        self._content_lock = threading.Lock()
+        self.popularity_movie_ids = None
+        self.rating_sums = None
+        self.rating_counts = None
+        self._popularity_slot = {}
+        self._popular_ranking = None
+        self._popularity_lock = threading.Lock()
+        snapshot_dir = Config.ENGINE_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir
+        self.snapshot = EngineSnapshot(snapshot_dir) if snapshot_dir else None
+        self.fingerprint = None
         self.build_models()
     
     def build_models(self):
+        """
+        Build the models, or memory-map them from a snapshot of the same data.
+        
+        With a snapshot directory configured the first process to see a given
+        data fingerprint builds and saves the arrays; other processes wait for
+        it and map the saved files, so workers share one copy of the models.
+        """
+        if self.snapshot is not None:
+            self.fingerprint = data_fingerprint(self.dp.ratings, self.dp.movies, self._snapshot_settings())
+            if self._load_snapshot():
+                return
+            with self.snapshot.build_lock(self.fingerprint):
+                if self._load_snapshot():
+                    return
+                self._build_all()
+                self._save_snapshot()
+            return
+        
+        self._build_all()
+    
+    def _build_all(self):
         print("Building recommendation models...")
         self._build_collaborative_filtering()
         self._build_content_based()
+        self._build_popularity_stats()
         print("Models built successfully!")
     
+    def _snapshot_settings(self):
+        return {
+            'sparse_matrix': self.sparse_matrix,
+            'n_neighbors': self.n_neighbors if self.sparse_matrix else None,
+            'similar_movies_n': Config.SIMILAR_MOVIES_N,
+            'ann': [Config.SIMILAR_USERS_ANN, Config.ANN_TABLES, Config.ANN_BITS, Config.ANN_MAX_CANDIDATES] if self.sparse_matrix else None
+        }
+    
+    def _snapshot_arrays(self):
+        arrays = {
+            'user_ids': self.user_ids,
+            'movie_ids': self.movie_ids,
+            'content_similarity': self.content_similarity_matrix,
+            'movie_signatures': self.movie_signatures,
+            'signature_members': self.signature_members,
+            'signature_offsets': self.signature_offsets,
+            'similar_movies': self.similar_movies,
+            'movie_row_index': self.movie_row_index
+        }
+        
+        if not self.sparse_matrix:
+            arrays['user_item'] = self.user_item_matrix.values
+            arrays['movie_similarity'] = self.movie_similarity_matrix
+            return arrays
+        
+        reverse = self.item_neighbors.reverse_matrix()
+        arrays.update({
+            'user_item_data': self.user_item_matrix.data,
+            'user_item_indices': self.user_item_matrix.indices,
+            'user_item_indptr': self.user_item_matrix.indptr,
+            'user_norms': self.user_norms,
+            'neighbor_indptr': self.item_neighbors.indptr,
+            'neighbor_indices': self.item_neighbors.indices,
+            'neighbor_similarities': self.item_neighbors.similarities,
+            'reverse_data': reverse.data,
+            'reverse_indices': reverse.indices,
+            'reverse_indptr': reverse.indptr
+        })
+        if self.user_ann_index is not None:
+            state = self.user_ann_index.state()
+            arrays.update({f'ann_{name}': array for name, array in state.items()})
+            # Normalized rows keep the user-item sparsity pattern, so only the data is stored
+            arrays['ann_vector_data'] = self.user_ann_index._vectors.data
+        return arrays
+    
+    def _save_snapshot(self):
+        try:
+            self.snapshot.save(self.fingerprint, self._snapshot_arrays())
+            print(f"Saved engine snapshot {self.fingerprint}")
+        except OSError as e:
+            print(f"⚠️  Could not save engine snapshot: {e}")
+    
+    def _load_snapshot(self):
+        loaded = self.snapshot.load(self.fingerprint)
+        if loaded is None:
+            return False
+        arrays, _ = loaded
+        
+        self.user_ids = arrays['user_ids']
+        self.movie_ids = arrays['movie_ids']
+        self.user_id_to_idx = {uid: idx for idx, uid in enumerate(self.user_ids.tolist())}
+        
+        if self.sparse_matrix:
+            shape = (len(self.user_ids), len(self.movie_ids))
+            indices, indptr = arrays['user_item_indices'], arrays['user_item_indptr']
+            self.user_item_matrix = sparse.csr_matrix((arrays['user_item_data'], indices, indptr), shape=shape, copy=False)
+            self.user_norms = arrays['user_norms']
+            self.item_neighbors = ItemNeighborIndex(
+                arrays['neighbor_indptr'], arrays['neighbor_indices'], arrays['neighbor_similarities']
+            )
+            self.item_neighbors._reverse_matrix = sparse.csr_matrix(
+                (arrays['reverse_data'], arrays['reverse_indices'], arrays['reverse_indptr']),
+                shape=(len(self.movie_ids), len(self.movie_ids)),
+                copy=False
+            )
+            if 'ann_planes' in arrays:
+                vectors = sparse.csr_matrix((arrays['ann_vector_data'], indices, indptr), shape=shape, copy=False)
+                self.user_ann_index = RandomProjectionLSH.from_state(
+                    arrays['ann_planes'], arrays['ann_keys'], arrays['ann_codes'], arrays['ann_config'], vectors
+                )
+        else:
+            self.user_item_matrix = pd.DataFrame(
+                arrays['user_item'],
+                index=pd.Index(self.user_ids, name='userId'),
+                columns=pd.Index(self.movie_ids, name='movieId')
+            )
+            self.movie_similarity_matrix = arrays['movie_similarity']
+        
+        self.content_similarity_matrix = arrays['content_similarity']
+        self.movie_signatures = arrays['movie_signatures']
+        self.signature_members = arrays['signature_members']
+        self.signature_offsets = arrays['signature_offsets']
+        self.similar_movies = arrays['similar_movies']
+        self.movie_row_index = arrays['movie_row_index']
+        catalog = self.dp.movies
+        self._similar_lookup = (self.movie_row_index, self.similar_movies, catalog['movieId'].to_numpy())
+        self._content_catalog = catalog
+        
+        self._build_popularity_stats()
+        print(f"Loaded engine snapshot {self.fingerprint}")
+        return True
+    
     def _build_collaborative_filtering(self):
+        if self.sparse_matrix:
+            self._build_sparse_collaborative_filtering()
+            return
+        
         self.user_item_matrix = self.dp.ratings.pivot_table(
             index='userId',
             columns='movieId',
             values='rating'
         ).fillna(0)
+        self.user_ids = self.user_item_matrix.index.to_numpy()
+        self.movie_ids = self.user_item_matrix.columns.to_numpy()
+        self.user_id_to_idx = {uid: idx for idx, uid in enumerate(self.user_ids)}
         
         movie_ratings = self.user_item_matrix.T
-        self.movie_similarity_matrix = cosine_similarity(movie_ratings)
+        self.movie_similarity_matrix = self._similarity_builder('movie similarity').build_dense(
+            movie_ratings.values,
+            out_path=self._similarity_mmap_path('movie_similarity')
+        )
+    
+    def _build_sparse_collaborative_filtering(self):
+        """
+        CSR user x movie matrix over dense integer codes, float32 throughout.
+        
+        Duplicate (userId, movieId) pairs are averaged like pivot_table does.
+        Item similarity is kept as a top-K neighbor index built blockwise, so
+        nothing of size users x movies or movies x movies is ever dense.
+        """
+        ratings = self.dp.ratings[['userId', 'movieId', 'rating']]
+        if ratings.duplicated(['userId', 'movieId']).any():
+            ratings = ratings.groupby(['userId', 'movieId'], as_index=False)['rating'].mean()
+        
+        user_codes, user_ids = pd.factorize(ratings['userId'], sort=True)
+        movie_codes, movie_ids = pd.factorize(ratings['movieId'], sort=True)
+        self.user_ids = np.asarray(user_ids)
+        self.movie_ids = np.asarray(movie_ids)
+        self.user_id_to_idx = {uid: idx for idx, uid in enumerate(self.user_ids)}
+        
+        matrix = sparse.csr_matrix(
+            (ratings['rating'].to_numpy(dtype=np.float32), (user_codes, movie_codes)),
+            shape=(len(self.user_ids), len(self.movie_ids))
+        )
+        matrix.eliminate_zeros()
+        self.user_item_matrix = matrix
+        self.user_norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        
+        self.item_neighbors = ItemNeighborIndex.build(
+            matrix.T.tocsr(),
+            k=self.n_neighbors,
+            builder=self._similarity_builder('item neighbors')
+        )
+        self.item_neighbors.reverse_matrix()
+        
+        if Config.SIMILAR_USERS_ANN:
+            self.user_ann_index = RandomProjectionLSH.build(
+                self.user_ids.tolist(),
+                matrix,
+                n_bits=Config.ANN_BITS or None,
+                n_tables=Config.ANN_TABLES,
+                max_candidates=Config.ANN_MAX_CANDIDATES
+            )
     
     def _build_content_based(self):
+        """
+        Content similarity between genre signatures rather than movies.
+        
+        Movies with the same genre multiset share a signature and an identical
+        TF-IDF vector, so the similarity matrix is signatures x signatures.
+        signature_members lists movie rows grouped by signature (ascending row
+        within each group) and signature_offsets delimits the groups.
+        """
+        genres_lists = self.dp.movies['genres_list'].apply(lambda x: x if isinstance(x, list) else [])
+        signature_keys = genres_lists.apply(lambda x: '|'.join(sorted(x)))
+        signatures, unique_keys = pd.factorize(signature_keys, sort=True)
+        self.movie_signatures = signatures.astype(np.int32)
+        
+        self.signature_members = np.argsort(self.movie_signatures, kind='stable').astype(np.int32)
+        counts = np.bincount(self.movie_signatures, minlength=len(unique_keys))
+        self.signature_offsets = np.concatenate([[0], np.cumsum(counts)])
+        
         tfidf = TfidfVectorizer(tokenizer=lambda x: x, lowercase=False, token_pattern=None)
-        tfidf_matrix = tfidf.fit_transform(self.dp.movies['genres_list'])
+        tfidf_matrix = tfidf.fit_transform(genres_lists)
+        representatives = self.signature_members[self.signature_offsets[:-1]]
+        
+        self.content_similarity_matrix = self._similarity_builder('content similarity').build_dense(
+            tfidf_matrix[representatives],
+            out_path=self._similarity_mmap_path('content_similarity')
+        )
+        
+        catalog = self.dp.movies
+        self.similar_movies = self._build_similar_movies(Config.SIMILAR_MOVIES_N)
+        self.movie_row_index = self._build_movie_row_index(catalog['movieId'].to_numpy())
+        # Readers take this tuple in one step so a rebuild never mixes catalogs
+        self._similar_lookup = (self.movie_row_index, self.similar_movies, catalog['movieId'].to_numpy())
+        self._content_catalog = catalog
+    
+    def _build_similar_movies(self, n):
+        """
+        Precompute the n most similar movie rows for every movie as an int32
+        matrix, padded with -1.
+        
+        Every member of a signature shares one ranking, so it is computed once
+        per signature with one spare slot and each member drops itself from it.
+        """
+        similar_movies = np.full((len(self.movie_signatures), n), -1, dtype=np.int32)
         
-        self.content_similarity_matrix = cosine_similarity(tfidf_matrix)
+        for sig in range(len(self.signature_offsets) - 1):
+            members = self.signature_members[self.signature_offsets[sig]:self.signature_offsets[sig + 1]]
+            candidates = self._similar_movie_rows(members[0], n + 1, exclude_self=False)
+            
+            keep = candidates[None, :] != members[:, None]
+            positions = np.cumsum(keep, axis=1)
+            keep &= positions <= n
+            member_rows, _ = np.nonzero(keep)
+            similar_movies[members[member_rows], positions[keep] - 1] = np.broadcast_to(candidates, keep.shape)[keep]
+        
+        return similar_movies
+    
+    @staticmethod
+    def _build_movie_row_index(movie_ids):
+        """Dense movieId -> row array (-1 for unknown ids); first row wins on duplicates"""
+        row_index = np.full(int(movie_ids.max()) + 1 if len(movie_ids) else 0, -1, dtype=np.int32)
+        row_index[movie_ids[::-1]] = np.arange(len(movie_ids), dtype=np.int32)[::-1]
+        return row_index
+    
+    def refresh_content_model(self):
+        """Rebuild the content model and similar-movie lists for the current catalog"""
+        with self._content_lock:
+            if self._content_catalog is not self.dp.movies:
+                self._build_content_based()
+    
+    def _similarity_builder(self, label):
+        return BlockwiseSimilarityBuilder(
+            block_size=Config.SIMILARITY_BLOCK_SIZE,
+            n_workers=Config.SIMILARITY_WORKERS,
+            progress=print_progress(label)
+        )
+    
+    @staticmethod
+    def _similarity_mmap_path(name):
+        if not Config.SIMILARITY_MMAP_DIR:
+            return None
+        os.makedirs(Config.SIMILARITY_MMAP_DIR, exist_ok=True)
+        return os.path.join(Config.SIMILARITY_MMAP_DIR, f'{name}.npy')
     
     def get_collaborative_recommendations(self, user_id, n=10):
-        if user_id not in self.user_item_matrix.index:
+        user_idx = self.user_id_to_idx.get(user_id)
+        if user_idx is None:
             return []
         
-        user_ratings = self.user_item_matrix.loc[user_id]
-        rated_movies = user_ratings[user_ratings > 0].index.tolist()
+        rated_indices, rated_values = self._user_ratings(user_idx)
         
-        if len(rated_movies) == 0:
+        if len(rated_indices) == 0:
             return []
         
-        predictions = {}
-        movie_ids = self.user_item_matrix.columns.tolist()
-        movie_id_to_idx = {mid: idx for idx, mid in enumerate(movie_ids)}
-        
-        for movie_id in movie_ids:
-            if movie_id not in rated_movies:
-                movie_idx = movie_id_to_idx[movie_id]
-                similar_movies = []
-                
-                for rated_movie in rated_movies:
-                    if rated_movie in movie_id_to_idx:
-                        rated_idx = movie_id_to_idx[rated_movie]
-                        similarity = self.movie_similarity_matrix[movie_idx][rated_idx]
-                        rating = user_ratings[rated_movie]
-                        similar_movies.append((similarity, rating))
-                
-                if similar_movies:
-                    total_sim = sum(sim for sim, _ in similar_movies)
-                    if total_sim > 0:
-                        predicted_rating = sum(sim * rating for sim, rating in similar_movies) / total_sim
-                        predictions[movie_id] = predicted_rating
-        
-        top_movies = sorted(predictions.items(), key=lambda x: x[1], reverse=True)[:n]
-        return [int(movie_id) for movie_id, _ in top_movies]
+        scores = self._score_items(rated_indices, rated_values)
+        top_indices = self._top_n_indices(scores, n)
+        
+        return [int(movie_id) for movie_id in self.movie_ids[top_indices]]
+    
+    def _user_ratings(self, user_idx):
+        """Movie column indices and ratings of one user's rated movies"""
+        if sparse.issparse(self.user_item_matrix):
+            start, end = self.user_item_matrix.indptr[user_idx:user_idx + 2]
+            return self.user_item_matrix.indices[start:end], self.user_item_matrix.data[start:end]
+        
+        row = self.user_item_matrix.values[user_idx]
+        rated_indices = np.flatnonzero(row > 0)
+        return rated_indices, row[rated_indices]
+    
+    def _score_items(self, rated_indices, rated_values):
+        """
+        Item-based predicted ratings for one user in a single matrix product.
+        
+        Column 0 of the right-hand side holds the ratings, column 1 ones, so one
+        product yields the weighted sum and the similarity total for every
+        movie. Rated movies and movies with no positive similarity mass score
+        -inf. With a neighbor index each movie is predicted from the rated
+        movies among its K neighbors, read through the rated rows of the
+        reversed index.
+        """
+        if self.item_neighbors is not None:
+            similarity = self.item_neighbors.reverse_matrix()
+        else:
+            similarity = self.movie_similarity_matrix
+        rhs = np.column_stack([rated_values, np.ones(len(rated_values))]).astype(similarity.dtype)
+        
+        if sparse.issparse(similarity):
+            weighted = similarity[rated_indices].T @ rhs
+        else:
+            full_rhs = np.zeros((similarity.shape[0], 2), dtype=similarity.dtype)
+            full_rhs[rated_indices] = rhs
+            weighted = similarity @ full_rhs
+        numerator, denominator = weighted[:, 0], weighted[:, 1]
+        
+        rated_mask = np.zeros(len(numerator), dtype=bool)
+        rated_mask[rated_indices] = True
+        
+        scores = np.full(len(numerator), -np.inf)
+        valid = (denominator > 0) & ~rated_mask
+        scores[valid] = numerator[valid] / denominator[valid]
+        return scores
+    
+    @staticmethod
+    def _top_n_indices(scores, n):
+        """
+        Indices of the n highest finite scores, best first.
+        
+        Uses argpartition so only the candidates are sorted; ties keep the lower
+        index first, matching a stable descending sort.
+        """
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if n <= 0 or len(candidates) == 0:
+            return candidates[:0]
+        
+        if len(candidates) > n:
+            partitioned = np.argpartition(-scores[candidates], n - 1)[:n]
+            kth_score = scores[candidates[partitioned]].min()
+            # Pull in every candidate tied with the cut-off so tie-breaking is by index
+            candidates = candidates[scores[candidates] >= kth_score]
+        
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:n]
+    
+    def get_collaborative_recommendations_batch(self, user_ids, n=10, block_size=None):
+        """
+        Yield (user_id, movie_ids) for many users, in input order.
+        
+        Users are scored block_size at a time as one user-block x item product
+        for the numerators and one for the denominators, followed by a per-row
+        top-n. Unknown users and users without predictions yield [].
+        """
+        block_size = block_size or Config.BATCH_BLOCK_SIZE
+        
+        for start in range(0, len(user_ids), block_size):
+            block_ids = list(user_ids[start:start + block_size])
+            known = [(pos, self.user_id_to_idx[uid]) for pos, uid in enumerate(block_ids) if uid in self.user_id_to_idx]
+            results = [[] for _ in block_ids]
+            
+            if known:
+                positions, user_indices = zip(*known)
+                top_rows = self._top_n_rows(self._score_user_block(list(user_indices)), n)
+                for pos, top in zip(positions, top_rows):
+                    results[pos] = [int(movie_id) for movie_id in self.movie_ids[top]]
+            
+            yield from zip(block_ids, results)
+    
+    def _score_user_block(self, user_indices):
+        """Predicted ratings for a block of users, -inf where not predictable"""
+        if sparse.issparse(self.user_item_matrix):
+            ratings = self.user_item_matrix[user_indices]
+        else:
+            ratings = sparse.csr_matrix(self.user_item_matrix.values[user_indices])
+        rated = ratings.copy()
+        rated.data[:] = 1
+        
+        if self.item_neighbors is not None:
+            similarity = self.item_neighbors.reverse_matrix()
+        else:
+            similarity = self.movie_similarity_matrix
+        
+        # Ratings stacked over rated indicators: one product gives both halves.
+        # A dense similarity goes through BLAS with a dense left-hand side.
+        stacked = sparse.vstack([ratings, rated], format='csr')
+        if sparse.issparse(similarity):
+            weighted = (stacked @ similarity).toarray()
+        else:
+            weighted = stacked.toarray().astype(similarity.dtype) @ similarity
+        n_users = len(user_indices)
+        numerator, denominator = weighted[:n_users], weighted[n_users:]
+        
+        scores = np.full(numerator.shape, -np.inf)
+        valid = denominator > 0
+        scores[valid] = numerator[valid] / denominator[valid]
+        scores[ratings.nonzero()] = -np.inf
+        return scores
+    
+    @staticmethod
+    def _top_n_rows(scores, n):
+        """
+        Row-wise _top_n_indices for a 2-D score block.
+        
+        The per-row cut-off comes from one vectorized partition; everything at
+        or above it is ordered by (row, -score, column), so ties resolve to the
+        lower column exactly as in the single-user path.
+        """
+        n_rows, n_cols = scores.shape
+        k = min(n, n_cols)
+        if k <= 0:
+            return [np.empty(0, dtype=np.int64) for _ in range(n_rows)]
+        
+        kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+        rows, cols = np.nonzero((scores >= kth[:, None]) & np.isfinite(scores))
+        values = scores[rows, cols]
+        
+        order = np.lexsort((cols, -values, rows))
+        rows, cols = rows[order], cols[order]
+        row_starts = np.searchsorted(rows, np.arange(n_rows + 1))
+        
+        return [cols[row_starts[r]:min(row_starts[r] + k, row_starts[r + 1])] for r in range(n_rows)]
     
     def get_content_based_recommendations(self, movie_id, n=10):
-        movie_idx = self.dp.movies[self.dp.movies['movieId'] == movie_id].index
+        """
+        Up to n movie ids most similar in genre to movie_id, best first.
+        The movie itself is never among them.
+        """
+        if self._content_catalog is not self.dp.movies:
+            self.refresh_content_model()
         
-        if len(movie_idx) == 0:
-            return []
+        row_index, similar_movies, movie_ids = self._similar_lookup
         
-        movie_idx = movie_idx[0]
-        similarity_scores = list(enumerate(self.content_similarity_matrix[movie_idx]))
-        similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)
+        if not 0 <= movie_id < len(row_index) or row_index[movie_id] < 0:
+            return []
+        movie_row = row_index[movie_id]
         
-        similar_indices = [i for i, _ in similarity_scores[1:n+1]]
-        similar_movie_ids = self.dp.movies.iloc[similar_indices]['movieId'].tolist()
+        if n <= similar_movies.shape[1]:
+            similar_rows = similar_movies[movie_row, :n]
+            similar_rows = similar_rows[similar_rows >= 0]
+        else:
+            similar_rows = self._similar_movie_rows(movie_row, n)
+        similar_movie_ids = movie_ids[similar_rows].tolist()
         
         return similar_movie_ids
     
+    def _similar_movie_rows(self, movie_row, n, exclude_self=True):
+        """
+        Rows of the n movies most similar to movie_row, excluding itself
+        unless exclude_self is False.
+        
+        Signatures are walked in descending similarity; all members of
+        signatures tied on similarity are merged and ordered by row, so ties
+        resolve to the lower row exactly as a stable sort over movies would.
+        """
+        similarities = self.content_similarity_matrix[self.movie_signatures[movie_row]]
+        order = np.argsort(-similarities, kind='stable')
+        
+        selected = []
+        remaining = n
+        start = 0
+        while remaining > 0 and start < len(order):
+            end = start + 1
+            while end < len(order) and similarities[order[end]] == similarities[order[start]]:
+                end += 1
+            
+            tied = np.concatenate([
+                self.signature_members[self.signature_offsets[sig]:self.signature_offsets[sig + 1]]
+                for sig in order[start:end]
+            ])
+            if exclude_self:
+                tied = tied[tied != movie_row]
+            tied = np.sort(tied)[:remaining]
+            selected.append(tied)
+            remaining -= len(tied)
+            start = end
+        
+        if not selected:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate(selected)
+    
     def get_hybrid_recommendations(self, user_id, n=10):
         collab_recs = self.get_collaborative_recommendations(user_id, n * 2)
         
@@ -103,25 +551,148 @@ class RecommendationEngine:
         
         return hybrid_recs[:n]
     
-    def _get_popular_movies(self, n=10):
-        movie_stats = self.dp.ratings.groupby('movieId').agg({
-            'rating': ['mean', 'count']
-        }).reset_index()
-        movie_stats.columns = ['movieId', 'avg_rating', 'count']
+    def get_hybrid_recommendations_from_ratings(self, movie_ids, ratings, n=10):
+        """
+        get_hybrid_recommendations for a user given as their ratings rather
+        than a row of the built matrix, so ratings appended since the build
+        (and users who joined since) are scored too.
+        """
+        rated_indices, rated_values = self._rated_columns(movie_ids, ratings)
+        if len(rated_indices) == 0:
+            return self._get_popular_movies(n)
+        
+        top_indices = self._top_n_indices(self._score_items(rated_indices, rated_values), n)
+        if len(top_indices) == 0:
+            return self._get_popular_movies(n)
+        return [int(movie_id) for movie_id in self.movie_ids[top_indices]]
+    
+    def _rated_columns(self, movie_ids, ratings):
+        """
+        Matrix columns and ratings of a user's rated movies, dropping movies
+        the model does not know; repeated movies are averaged like the build does.
+        """
+        movie_ids = np.asarray(movie_ids)
+        if len(movie_ids) == 0 or len(self.movie_ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        positions = np.searchsorted(self.movie_ids, movie_ids)
+        positions = np.minimum(positions, len(self.movie_ids) - 1)
+        known = self.movie_ids[positions] == movie_ids
+        columns, codes = np.unique(positions[known], return_inverse=True)
+        sums = np.bincount(codes, weights=np.asarray(ratings, dtype=np.float64)[known], minlength=len(columns))
+        values = (sums / np.bincount(codes, minlength=len(columns))).astype(np.float32)
+        return columns, values
+    
+    def get_hybrid_recommendations_batch(self, user_ids, n=10):
+        """Batch form of get_hybrid_recommendations, yielding (user_id, movie_ids)"""
+        popular = None
+        for user_id, movie_ids in self.get_collaborative_recommendations_batch(user_ids, n):
+            if not movie_ids:
+                if popular is None:
+                    popular = self._get_popular_movies(n)
+                movie_ids = popular
+            yield user_id, movie_ids
+    
+    def _build_popularity_stats(self):
+        """Per-movie rating sums and counts, kept current by record_rating"""
+        movie_ids, codes = np.unique(self.dp.ratings['movieId'].to_numpy(), return_inverse=True)
+        
+        with self._popularity_lock:
+            self.popularity_movie_ids = movie_ids
+            self.rating_sums = np.bincount(codes, weights=self.dp.ratings['rating'].to_numpy(), minlength=len(movie_ids))
+            self.rating_counts = np.bincount(codes, minlength=len(movie_ids))
+            self._popularity_slot = {mid: slot for slot, mid in enumerate(movie_ids.tolist())}
+            self._popular_ranking = None
+    
+    def record_rating(self, movie_id, rating):
+        """Add one new rating to the popularity stats in O(1) (amortized)"""
+        with self._popularity_lock:
+            slot = self._popularity_slot.get(movie_id)
+            if slot is None:
+                slot = len(self._popularity_slot)
+                if slot == len(self.rating_counts):
+                    grow = max(16, slot // 2)
+                    self.popularity_movie_ids = np.concatenate([self.popularity_movie_ids, np.zeros(grow, dtype=self.popularity_movie_ids.dtype)])
+                    self.rating_sums = np.concatenate([self.rating_sums, np.zeros(grow)])
+                    self.rating_counts = np.concatenate([self.rating_counts, np.zeros(grow, dtype=self.rating_counts.dtype)])
+                self.popularity_movie_ids[slot] = movie_id
+                self._popularity_slot[movie_id] = slot
+            
+            self.rating_sums[slot] += rating
+            self.rating_counts[slot] += 1
+            self._popular_ranking = None
+    
+    def _popularity_ranking(self):
+        """
+        Movie ids with at least POPULAR_MIN_RATINGS ratings ordered by Bayesian
+        average: the mean shrunk towards the global mean by POPULAR_PRIOR_WEIGHT
+        pseudo-ratings. Rebuilt only when a rating arrived since the last call.
+        """
+        ranking = self._popular_ranking
+        if ranking is not None:
+            return ranking
         
-        popular = movie_stats[movie_stats['count'] >= 50]
-        popular = popular.nlargest(n, 'avg_rating')
+        with self._popularity_lock:
+            n_slots = len(self._popularity_slot)
+            movie_ids = self.popularity_movie_ids[:n_slots]
+            sums = self.rating_sums[:n_slots]
+            counts = self.rating_counts[:n_slots]
+            
+            prior = Config.POPULAR_PRIOR_WEIGHT
+            global_mean = sums.sum() / counts.sum() if counts.sum() else 0.0
+            scores = (sums + prior * global_mean) / np.maximum(counts + prior, 1)
+            
+            eligible = np.flatnonzero(counts >= Config.POPULAR_MIN_RATINGS)
+            order = np.lexsort((movie_ids[eligible], -scores[eligible]))
+            ranking = movie_ids[eligible[order]].tolist()
+            self._popular_ranking = ranking
         
-        return popular['movieId'].tolist()
+        return ranking
     
-    def get_similar_users(self, user_id, n=5):
-        if user_id not in self.user_item_matrix.index:
+    def _get_popular_movies(self, n=10):
+        return self._popularity_ranking()[:n]
+    
+    def get_similar_users(self, user_id, n=5, exact=False):
+        if not exact and self.user_ann_index is not None and user_id in self.user_ann_index:
+            return [int(uid) for uid in self.user_ann_index.query_key(user_id, n)]
+        
+        user_idx = self.user_id_to_idx.get(user_id)
+        if user_idx is None:
             return []
         
-        user_vector = self.user_item_matrix.loc[user_id].values.reshape(1, -1)
-        similarities = cosine_similarity(user_vector, self.user_item_matrix.values)[0]
+        similarities = self._user_similarities(user_idx)
+        similarities[user_idx] = -np.inf
         
-        similar_user_indices = np.argsort(similarities)[::-1][1:n+1]
-        similar_user_ids = self.user_item_matrix.index[similar_user_indices].tolist()
+        similar_user_indices = self._top_n_indices(similarities, n)
+        similar_user_ids = [int(uid) for uid in self.user_ids[similar_user_indices]]
         
         return similar_user_ids
+    
+    def index_user(self, user_id, movie_ids, ratings):
+        """
+        Insert a user who is not in the built matrix into the similar-users
+        index so they can be matched before the next rebuild. Movies unknown
+        to the model are ignored.
+        """
+        if self.user_ann_index is None or user_id in self.user_ann_index:
+            return False
+        
+        columns, values = self._rated_columns(movie_ids, ratings)
+        if len(columns) == 0:
+            return False
+        
+        vector = sparse.csr_matrix(
+            (values, (np.zeros(len(columns), dtype=np.int32), columns)),
+            shape=(1, len(self.movie_ids))
+        )
+        self.user_ann_index.add([user_id], vector)
+        return True
+    
+    def _user_similarities(self, user_idx):
+        if not sparse.issparse(self.user_item_matrix):
+            user_vector = self.user_item_matrix.values[user_idx].reshape(1, -1)
+            return cosine_similarity(user_vector, self.user_item_matrix.values)[0]
+        
+        dots = (self.user_item_matrix @ self.user_item_matrix[user_idx].T).toarray().ravel()
+        norms = self.user_norms * self.user_norms[user_idx]
+        return np.divide(dots, norms, out=np.zeros(len(dots)), where=norms > 0)
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+import pandas as pd
+
+FILL_VALUES = {'i': 0, 'u': 0, 'f': np.nan, 'b': False, 'O': None}
+
+class ColumnBuffer:
+    """
+    Preallocated numpy buffer for one column that doubles when full, so
+    appending n values costs O(n) amortized and at most one spare
+    capacity's worth of memory.
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        self.data = np.empty(max(int(capacity), 1), dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def values(self):
+        """The filled part, copied out of the buffer only if it is mostly spare"""
+        if self.size < len(self.data) // 2:
+            return self.data[:self.size].copy()
+        return self.data[:self.size]
+
+def read_collection_columns(collection, dtypes, query=None, batch_size=50_000):
+    """
+    Stream collection into a DataFrame with one compactly typed column per
+    field in dtypes ('category' columns are read as strings, then encoded).
+
+    The cursor projects only those fields and is consumed batch_size
+    documents at a time, each batch written straight into column buffers
+    sized from the collection's estimated count, so peak memory stays near
+    the final column size rather than one dict per document. Missing fields
+    read as 0, NaN or None by dtype.
+    """
+    start = time.perf_counter()
+    capacity = collection.estimated_document_count() if not query else batch_size
+    buffer_dtypes = {field: object if dtype == 'category' else np.dtype(dtype) for field, dtype in dtypes.items()}
+    buffers = {field: ColumnBuffer(dtype, capacity) for field, dtype in buffer_dtypes.items()}
+
+    projection = {field: 1 for field in dtypes}
+    projection['_id'] = 0
+    cursor = collection.find(query or {}, projection, batch_size=batch_size)
+
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            _append_batch(buffers, buffer_dtypes, batch)
+            batch = []
+    if batch:
+        _append_batch(buffers, buffer_dtypes, batch)
+
+    frame = pd.DataFrame({field: buffer.values() for field, buffer in buffers.items()}, copy=False)
+    for field, dtype in dtypes.items():
+        if dtype == 'category':
+            frame[field] = frame[field].astype('category')
+
+    seconds = time.perf_counter() - start
+    rate = len(frame) / seconds if seconds > 0 else float('inf')
+    print(f"  {collection.name}: {len(frame):,} documents in {seconds:.2f}s ({rate:,.0f} docs/s)")
+    return frame
+
+def _append_batch(buffers, dtypes, batch):
+    for field, buffer in buffers.items():
+        dtype = np.dtype(dtypes[field])
+        fill = FILL_VALUES[dtype.kind]
+        if dtype.kind == 'O':
+            column = np.empty(len(batch), dtype=object)
+            column[:] = [document.get(field, fill) for document in batch]
+        else:
+            column = np.fromiter((document.get(field, fill) for document in batch), dtype=dtype, count=len(batch))
+        buffer.extend(column)
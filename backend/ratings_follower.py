@@ -0,0 +1,147 @@
+import calendar
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from csv_loader import RATINGS_DTYPES
+from mongo_loader import ColumnBuffer
+
+class RatingsFollower:
+    """
+    Tails the user_ratings collection into a DataProcessor.
+
+    Each poll reads the documents at or after the timestamp high-water mark
+    (ids already seen at exactly that timestamp are skipped, so equal
+    timestamps are neither lost nor read twice) and appends them to
+    append-only column buffers. Compaction hands the buffered rows to
+    DataProcessor.append_ratings once compact_rows have piled up or
+    compact_interval seconds have passed, which bumps the stats version and
+    notifies its append listeners. The first poll reads the whole collection,
+    since ratings made before this process started are not in the ratings
+    collection either.
+    """
+
+    FIELDS = ['userId', 'movieId', 'rating', 'timestamp']
+
+    def __init__(self, collection, data_processor, poll_interval=5, compact_rows=10000, compact_interval=60, batch_size=1000):
+        self.collection = collection
+        self.dp = data_processor
+        self.poll_interval = poll_interval
+        self.compact_rows = compact_rows
+        self.compact_interval = compact_interval
+        self.batch_size = batch_size
+
+        self.high_water = None
+        self._seen_at_high_water = set()
+        self.buffers = self._new_buffers()
+        self.last_compaction = time.time()
+        self.followed = 0
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _new_buffers(self):
+        return {field: ColumnBuffer(RATINGS_DTYPES[field], self.compact_rows) for field in self.FIELDS}
+
+    @property
+    def pending(self):
+        return self.buffers['userId'].size
+
+    @staticmethod
+    def _epoch_seconds(timestamp):
+        # pymongo returns naive datetimes in UTC
+        if isinstance(timestamp, datetime):
+            return calendar.timegm(timestamp.utctimetuple())
+        return int(timestamp)
+
+    def poll(self):
+        """Buffer documents newer than the high-water mark; returns how many were added"""
+        query = {} if self.high_water is None else {'timestamp': {'$gte': self.high_water}}
+        projection = {field: 1 for field in self.FIELDS}
+        cursor = self.collection.find(query, projection, batch_size=self.batch_size).sort('timestamp', 1)
+
+        rows = []
+        with self._lock:
+            for document in cursor:
+                timestamp = document.get('timestamp')
+                if timestamp is None:
+                    # Cannot be placed against the high-water mark
+                    self.skipped += 1
+                    continue
+                if self.high_water is not None and timestamp == self.high_water:
+                    if document['_id'] in self._seen_at_high_water:
+                        continue
+                    self._seen_at_high_water.add(document['_id'])
+                elif self.high_water is None or timestamp > self.high_water:
+                    self.high_water = timestamp
+                    self._seen_at_high_water = {document['_id']}
+
+                try:
+                    rows.append((int(document['userId']), int(document['movieId']), float(document['rating']),
+                                 self._epoch_seconds(timestamp)))
+                except (KeyError, TypeError, ValueError):
+                    # e.g. string account ids, which the ratings frame cannot hold
+                    self.skipped += 1
+
+            if rows:
+                columns = list(zip(*rows))
+                for field, values in zip(self.FIELDS, columns):
+                    self.buffers[field].extend(np.array(values, dtype=RATINGS_DTYPES[field]))
+                self.followed += len(rows)
+        return len(rows)
+
+    def compact(self):
+        """Merge the buffered rows into the DataProcessor's ratings; returns how many"""
+        with self._lock:
+            if self.pending == 0:
+                self.last_compaction = time.time()
+                return 0
+            new_ratings = pd.DataFrame({field: buffer.values().copy() for field, buffer in self.buffers.items()})
+            self.buffers = self._new_buffers()
+            self.last_compaction = time.time()
+
+        self.dp.append_ratings(new_ratings)
+        return len(new_ratings)
+
+    def run_once(self):
+        self.poll()
+        if self.pending >= self.compact_rows or (self.pending and time.time() - self.last_compaction >= self.compact_interval):
+            self.compact()
+
+    def start(self):
+        """Poll on a daemon thread every poll_interval seconds"""
+        try:
+            self.collection.create_index('timestamp')
+        except Exception as e:
+            print(f"⚠️  Could not index user_ratings.timestamp: {e}")
+
+        def follow():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"⚠️  Ratings follower error: {e}")
+                self._stop.wait(self.poll_interval)
+
+        self._thread = threading.Thread(target=follow, name='ratings-follower', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, compact=True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if compact:
+            self.compact()
+
+    def status(self):
+        return {
+            'high_water': self.high_water.isoformat() if isinstance(self.high_water, datetime) else self.high_water,
+            'pending': self.pending,
+            'followed': self.followed,
+            'skipped': self.skipped,
+            'stats_version': self.dp.stats_version
+        }
@@ -0,0 +1,78 @@
+from collections import namedtuple
+from numbers import Integral
+import numpy as np
+
+UserRatings = namedtuple('UserRatings', ['movie_ids', 'ratings', 'timestamps', 'rows'])
+MovieRatings = namedtuple('MovieRatings', ['user_ids', 'ratings', 'timestamps', 'rows'])
+
+class RatingsIndex:
+    """
+    Ratings grouped by a key column (userId or movieId) through CSR-style offsets.
+
+    The columns are sorted by key once, stably, so rows keep their frame order
+    within a key. offsets is indexed by the key value itself:
+    offsets[k]:offsets[k + 1] delimits key k's rows, so a lookup is two array
+    reads and returns views into the sorted columns. rows holds the matching
+    positions in the original frame for callers that need the full records.
+    """
+
+    def __init__(self, ratings, key='userId'):
+        self.ratings = ratings
+        self.key = key
+        self.other = 'movieId' if key == 'userId' else 'userId'
+
+        keys = ratings[key].to_numpy(dtype=np.int64)
+        self.rows = np.argsort(keys, kind='stable')
+        counts = np.bincount(keys) if len(keys) else np.zeros(0, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        self.other_ids = ratings[self.other].to_numpy()[self.rows]
+        self.values = ratings['rating'].to_numpy()[self.rows]
+        self.timestamps = ratings['timestamp'].to_numpy()[self.rows] if 'timestamp' in ratings else None
+
+    def extended(self, ratings, new_ratings):
+        """
+        RatingsIndex over ratings, which is this index's frame with
+        new_ratings appended (ignore_index), built without re-sorting the
+        existing rows: only the tail is sorted, then inserted at the end of
+        each key's run, so the cost is a linear copy of the index arrays.
+        """
+        if len(ratings) != len(self.ratings) + len(new_ratings) or (
+                (self.timestamps is not None) != ('timestamp' in new_ratings)):
+            return RatingsIndex(ratings, self.key)
+
+        keys = new_ratings[self.key].to_numpy(dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        n_keys = max(len(self.offsets) - 1, int(keys.max()) + 1 if len(keys) else 0)
+        offsets = np.concatenate([self.offsets, np.full(n_keys + 1 - len(self.offsets), self.offsets[-1])])
+        # np.insert keeps equal positions in the given order, so rows stay in frame order within a key
+        positions = offsets[keys + 1]
+
+        index = RatingsIndex.__new__(RatingsIndex)
+        index.ratings = ratings
+        index.key = self.key
+        index.other = self.other
+        index.rows = np.insert(self.rows, positions, len(self.ratings) + order)
+        index.offsets = offsets + np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=n_keys))])
+        index.other_ids = np.insert(self.other_ids, positions, new_ratings[self.other].to_numpy()[order])
+        index.values = np.insert(self.values, positions, new_ratings['rating'].to_numpy()[order])
+        index.timestamps = (np.insert(self.timestamps, positions, new_ratings['timestamp'].to_numpy()[order])
+                            if self.timestamps is not None else None)
+        return index
+
+    def bounds(self, key_value):
+        # Ids that are not integers (e.g. strings from JSON) match no rows, as a frame filter would
+        if isinstance(key_value, bool) or not isinstance(key_value, Integral) or not 0 <= key_value < len(self.offsets) - 1:
+            return 0, 0
+        return self.offsets[key_value], self.offsets[key_value + 1]
+
+    def count(self, key_value):
+        start, end = self.bounds(key_value)
+        return end - start
+
+    def group(self, key_value):
+        start, end = self.bounds(key_value)
+        timestamps = self.timestamps[start:end] if self.timestamps is not None else None
+        group_type = UserRatings if self.key == 'userId' else MovieRatings
+        return group_type(self.other_ids[start:end], self.values[start:end], timestamps, self.rows[start:end])
@@ -0,0 +1,230 @@
+import contextlib
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: full refreshes are not serialized across processes
+    fcntl = None
+
+class RecommendationStore:
+    """
+    Materialized top-N movie ids per user.
+
+    Recommendations live in an int32 matrix (one row per user, padded with -1)
+    with a userId -> row dict, so a lookup is a dict hit and a row slice.
+    compute is a callable taking a list of user ids and yielding
+    (user_id, movie_ids) pairs; refreshes call it in the background and swap
+    the new state in whole, so readers never see a half-written row.
+
+    A user becomes stale when mark_stale is called (new ratings) and fresh
+    again once a refresh covering them completes; get() keeps serving the
+    previous list in between.
+
+    The saved file records the source (the engine or model fingerprint) it
+    was computed from. attach() names the current source, so a file from
+    another model or dataset is discarded rather than served. Full
+    refreshes take a file lock, so one process computes and saves while the
+    others wait and then load its file.
+    """
+
+    def __init__(self, name, compute, top_n=50, storage_dir=None, batch_size=1024):
+        self.name = name
+        self.compute = compute
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.path = os.path.join(storage_dir, f'{name}.npz') if storage_dir else None
+        self.source = None
+        self._state = self._empty_state()
+        self._stale_since = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self.last_full_refresh = None
+
+    def _empty_state(self):
+        return ({}, np.empty((0, self.top_n), dtype=np.int32), np.empty(0))
+
+    def attach(self, source, refresh=True):
+        """
+        Serve recommendations computed from source (an engine or model
+        fingerprint). Lists from any other source are dropped; the saved file
+        is loaded if it was computed from source, otherwise a full refresh is
+        queued when refresh is set.
+        """
+        with self._lock:
+            self.source = source
+            self._state = self._empty_state()
+        if not self.load() and refresh:
+            self.refresh_async()
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def get(self, user_id, n=10):
+        """
+        Up to n stored movie ids for the user, or None on a miss. A stale
+        user's last list is still returned until their refresh completes;
+        staleness() tells the two apart.
+        """
+        rows, recommendations, _ = self._state
+        row = rows.get(user_id)
+        if row is None or n > self.top_n:
+            return None
+        movie_ids = recommendations[row, :n]
+        return movie_ids[movie_ids >= 0].tolist()
+
+    def staleness(self, user_id):
+        rows, _, refreshed_at = self._state
+        row = rows.get(user_id)
+        stale_since = self._stale_since.get(user_id)
+        return {
+            'store': self.name,
+            'materialized': row is not None,
+            'refreshed_at': float(refreshed_at[row]) if row is not None else None,
+            'age_seconds': time.time() - refreshed_at[row] if row is not None else None,
+            'stale': row is None or stale_since is not None,
+            'stale_seconds': time.time() - stale_since if stale_since is not None else None
+        }
+
+    def mark_stale(self, user_id, refresh=True):
+        self._stale_since.setdefault(user_id, time.time())
+        if refresh:
+            self.refresh_async([user_id])
+
+    @contextlib.contextmanager
+    def _writer_lock(self):
+        """Exclusive across processes sharing the storage directory"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self, user_ids=None):
+        """
+        Recompute the given users (all users known to compute when None is
+        passed through) and swap the results in.
+
+        A persisted full refresh first waits for the writer lock; if another
+        process saved a file for the same source meanwhile, that is loaded
+        instead of computing again.
+        """
+        if user_ids is None and self.path and self.source is not None:
+            started = time.time()
+            with self._writer_lock():
+                if os.path.exists(self.path) and os.path.getmtime(self.path) >= started and self.load():
+                    self.last_full_refresh = started
+                    return len(self)
+                return self._refresh(user_ids)
+        return self._refresh(user_ids)
+
+    def _refresh(self, user_ids):
+        started = time.time()
+        source = self.source
+        computed_ids = []
+        computed_rows = []
+        for user_id, movie_ids in self.compute(user_ids):
+            row = np.full(self.top_n, -1, dtype=np.int32)
+            movie_ids = movie_ids[:self.top_n]
+            row[:len(movie_ids)] = movie_ids
+            computed_ids.append(user_id)
+            computed_rows.append(row)
+
+        new_rows = np.array(computed_rows, dtype=np.int32).reshape(-1, self.top_n)
+
+        with self._lock:
+            if source != self.source:
+                # attach() switched sources mid-refresh; these lists are outdated
+                return 0
+            if user_ids is None:
+                rows = {user_id: i for i, user_id in enumerate(computed_ids)}
+                recommendations = new_rows
+                refreshed_at = np.full(len(computed_ids), started)
+            else:
+                rows, recommendations, refreshed_at = self._state
+                rows = dict(rows)
+                recommendations = recommendations.copy()
+                refreshed_at = refreshed_at.copy()
+                appended = [uid for uid in computed_ids if uid not in rows]
+                for user_id in appended:
+                    rows[user_id] = len(rows)
+                recommendations = np.vstack([recommendations, np.full((len(appended), self.top_n), -1, dtype=np.int32)])
+                refreshed_at = np.concatenate([refreshed_at, np.zeros(len(appended))])
+                targets = [rows[uid] for uid in computed_ids]
+                recommendations[targets] = new_rows
+                refreshed_at[targets] = started
+
+            self._state = (rows, recommendations, refreshed_at)
+            for user_id in computed_ids if user_ids is not None else list(self._stale_since):
+                # Ratings that arrived after this refresh started keep the user stale
+                if self._stale_since.get(user_id, started) < started:
+                    del self._stale_since[user_id]
+
+        if user_ids is None:
+            self.last_full_refresh = started
+            if self.path and source is not None:
+                self.save()
+
+        return len(computed_ids)
+
+    def refresh_async(self, user_ids=None):
+        """Queue a refresh on the store's background worker"""
+        self._queue.put(user_ids)
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            try:
+                request = self._queue.get(timeout=5)
+            except queue.Empty:
+                return
+
+            # Coalesce everything queued so far into one full or one partial refresh
+            pending = [request]
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+
+            try:
+                if any(user_ids is None for user_ids in pending):
+                    self.refresh()
+                else:
+                    user_ids = list(dict.fromkeys(uid for ids in pending for uid in ids))
+                    for start in range(0, len(user_ids), self.batch_size):
+                        self.refresh(user_ids[start:start + self.batch_size])
+            except Exception as e:
+                print(f"Error refreshing {self.name} recommendation store: {e}")
+
+    def save(self):
+        rows, recommendations, refreshed_at = self._state
+        user_ids = np.array(list(rows), dtype=np.int64)
+        tmp_path = f'{self.path}.tmp-{os.getpid()}.npz'
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        np.savez(tmp_path, user_ids=user_ids, recommendations=recommendations, refreshed_at=refreshed_at,
+                 source=np.array(self.source))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load the saved lists if they were computed from the current source"""
+        if not self.path or self.source is None or not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            if 'source' not in data or str(data['source']) != self.source:
+                return False
+            recommendations = data['recommendations']
+            if recommendations.shape[1] != self.top_n:
+                return False
+            rows = {int(uid): i for i, uid in enumerate(data['user_ids'])}
+            with self._lock:
+                self._state = (rows, recommendations, data['refreshed_at'])
+        return True
@@ -50,12 +50,15 @@ class TrainingScheduler:
     Scheduler for automated ML model training.
     Supports weekly full retraining and manual triggers.
     """
-    def __init__(self, training_service, data_processor, model_manager, evaluation_service, logger=None):
+    def __init__(self, training_service, data_processor, model_manager, evaluation_service, logger=None,
+                 on_training_complete=None):
         self.training_service = training_service
         self.data_processor = data_processor
         self.model_manager = model_manager
         self.evaluation_service = evaluation_service
         self.logger = logger
+        # Called with the training results after a successful run
+        self.on_training_complete = on_training_complete
         self.scheduler = TaskScheduler()
         self.training_in_progress = False
         self.last_training_result = None
@@ -242,6 +245,9 @@ class TrainingScheduler:
                 self.logger.info(f"Training completed successfully in {duration:.2f}s")
                 self.logger.info(f"Results: {results}")
             
+            if self.on_training_complete:
+                self.on_training_complete(results)
+            
         except Exception as e:
             error_msg = str(e)
             if self.logger:
@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+def print_progress(label, step=0.25):
+    """Progress callback that prints roughly every `step` of the total"""
+    state = {'next': step}
+
+    def report(done, total):
+        if done == total or done / total >= state['next']:
+            print(f"  {label}: {done}/{total} blocks ({100 * done // total}%)")
+            state['next'] = done / total + step
+
+    return report
+
+class BlockwiseSimilarityBuilder:
+    """
+    Row-blocked cosine similarity for matrices too large to compare in one shot.
+
+    Rows are L2-normalized once, then each block of block_size rows is
+    multiplied against the whole matrix on a thread pool. At most n_workers
+    dense blocks of block_size x n_rows exist at a time; results are either
+    reduced per block (map_blocks) or written into an in-memory array or a
+    memory-mapped .npy file (build_dense).
+    """
+
+    def __init__(self, block_size=256, n_workers=1, progress=None):
+        self.block_size = max(1, block_size)
+        self.n_workers = max(1, n_workers)
+        self.progress = progress
+
+    @staticmethod
+    def _normalize(vectors):
+        if sparse.issparse(vectors):
+            return normalize(sparse.csr_matrix(vectors, dtype=np.float32), norm='l2', axis=1)
+        return normalize(np.asarray(vectors, dtype=np.float32), norm='l2', axis=1)
+
+    def map_blocks(self, vectors, func):
+        """
+        Call func(start, end, block) for every row block and return the results
+        in block order. block holds the dense similarities of rows
+        start:end against all rows.
+        """
+        normalized = self._normalize(vectors)
+        normalized_t = normalized.T.tocsc() if sparse.issparse(normalized) else normalized.T
+        n_rows = normalized.shape[0]
+        bounds = [(start, min(start + self.block_size, n_rows)) for start in range(0, n_rows, self.block_size)]
+
+        def run(start, end):
+            block = normalized[start:end] @ normalized_t
+            if sparse.issparse(block):
+                block = block.toarray()
+            return func(start, end, block)
+
+        results = [None] * len(bounds)
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            futures = {pool.submit(run, start, end): i for i, (start, end) in enumerate(bounds)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if self.progress:
+                    self.progress(done, len(bounds))
+
+        return results
+
+    def build_dense(self, vectors, out_path=None, dtype=np.float32):
+        """
+        Full n_rows x n_rows similarity matrix.
+
+        With out_path the matrix is written to a .npy file through a memory map
+        and returned as that (read/write) map, so it lives in the page cache
+        instead of the heap. The file is built under a temporary name and moved
+        into place when complete, so readers never see a partial matrix.
+        """
+        n_rows = vectors.shape[0]
+
+        if out_path is None:
+            output = np.empty((n_rows, n_rows), dtype=dtype)
+        else:
+            tmp_path = f'{out_path}.tmp-{os.getpid()}'
+            output = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(n_rows, n_rows))
+
+        def write(start, end, block):
+            output[start:end] = block
+
+        self.map_blocks(vectors, write)
+
+        if out_path is not None:
+            output.flush()
+            os.replace(tmp_path, out_path)
+
+        return output
+
+class ItemNeighborIndex:
+    """
+    Top-K cosine neighbors per item stored as CSR arrays.
+
+    Row i of the index lists the (at most) K items most similar to item i,
+    best first, with their similarities. Only positive similarities are kept
+    and an item is never its own neighbor, so memory is O(n_items * K).
+    """
+
+    def __init__(self, indptr, indices, similarities):
+        self.indptr = indptr
+        self.indices = indices
+        self.similarities = similarities
+        self._reverse_matrix = None
+
+    @property
+    def n_items(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.similarities.nbytes
+
+    @classmethod
+    def build(cls, item_vectors, k=None, builder=None):
+        """
+        Build the index from an items x features matrix, one row block at a time.
+
+        Only the builder's in-flight block_size x n_items slabs exist at any
+        moment. k of None or <= 0 keeps every positive similarity.
+        """
+        builder = builder or BlockwiseSimilarityBuilder()
+
+        def select(start, end, block):
+            block[np.arange(end - start), np.arange(start, end)] = 0
+            neighbors, similarities = cls._top_k_rows(block, k)
+            keep = similarities > 0
+            return keep.sum(axis=1), neighbors[keep].astype(np.int32), similarities[keep].astype(np.float32)
+
+        blocks = builder.map_blocks(item_vectors, select)
+        n_items = item_vectors.shape[0]
+
+        indptr = np.zeros(n_items + 1, dtype=np.int64)
+        if not blocks:
+            return cls(indptr, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+        row_counts, block_indices, block_similarities = zip(*blocks)
+        np.cumsum(np.concatenate(row_counts), out=indptr[1:])
+
+        return cls(indptr, np.concatenate(block_indices), np.concatenate(block_similarities))
+
+    @staticmethod
+    def _top_k_rows(block, k):
+        """Per-row top-k columns of a dense block, sorted by similarity then index"""
+        n_cols = block.shape[1]
+        if k is not None and 0 < k < n_cols:
+            columns = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            columns = np.broadcast_to(np.arange(n_cols), block.shape)
+
+        similarities = np.take_along_axis(block, columns, axis=1)
+        order = np.lexsort((columns, -similarities))
+        return np.take_along_axis(columns, order, axis=1), np.take_along_axis(similarities, order, axis=1)
+
+    def neighbors(self, item_idx):
+        start, end = self.indptr[item_idx], self.indptr[item_idx + 1]
+        return self.indices[start:end], self.similarities[start:end]
+
+    def matrix(self):
+        """The index as an n_items x n_items CSR matrix sharing the index arrays"""
+        return sparse.csr_matrix(
+            (self.similarities, self.indices, self.indptr),
+            shape=(self.n_items, self.n_items)
+        )
+
+    def reverse_matrix(self):
+        """
+        Transpose of matrix(): row j holds every item that lists j as a neighbor.
+
+        Scoring a user reads the rows of the movies they rated, so this is the
+        orientation the collaborative scorer slices.
+        """
+        if self._reverse_matrix is None:
+            self._reverse_matrix = self.matrix().T.tocsr()
+        return self._reverse_matrix
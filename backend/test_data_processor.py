@@ -0,0 +1,520 @@
+"""
+Tests for DataProcessor loading, cached stats and lookup indexes
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import mongomock
+import numpy as np
+import pandas as pd
+from benchmark_recommendations import make_synthetic_data
+from benchmark_data import make_processor, make_titles
+from config import Config
+from csv_loader import RATINGS_DTYPES, frame_memory, read_csv_typed
+from data_processor import DataProcessor
+from data_snapshot import frame_arrays, mongo_fingerprint
+from mongo_loader import ColumnBuffer, read_collection_columns
+from ratings_follower import RatingsFollower
+from ratings_index import RatingsIndex
+from export_service import ExportService
+from ml.feature_engineer import FeatureEngineer
+from title_index import normalize_title
+
+def reference_movie_stats(movies, ratings):
+    """The original groupby + merge implementation"""
+    stats = ratings.groupby('movieId').agg({'rating': ['mean', 'count']}).reset_index()
+    stats.columns = ['movieId', 'avg_rating', 'rating_count']
+    movies_with_stats = movies.merge(stats, on='movieId', how='left')
+    movies_with_stats['avg_rating'] = movies_with_stats['avg_rating'].fillna(0)
+    movies_with_stats['rating_count'] = movies_with_stats['rating_count'].fillna(0)
+    return movies_with_stats
+
+def assert_stats_equal(actual, expected):
+    assert actual['movieId'].tolist() == expected['movieId'].tolist()
+    assert np.allclose(actual['avg_rating'], expected['avg_rating'])
+    assert np.array_equal(actual['rating_count'], expected['rating_count'])
+
+def test_movie_stats_incremental():
+    """Stats match a full recompute, are memoized, and follow appended ratings"""
+    print("Test: Incremental Movie Stats")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=50, n_movies=300, n_ratings=2000)
+    dp = make_processor(movies, ratings)
+
+    stats = dp.get_movie_stats()
+    assert_stats_equal(stats, reference_movie_stats(movies, ratings))
+    assert dp.get_movie_stats() is stats
+
+    version = dp.stats_version
+    new_ratings = pd.DataFrame({
+        'userId': [1, 2, 3],
+        'movieId': [int(movies['movieId'].iloc[-1]), int(movies['movieId'].iloc[0]), 5000],
+        'rating': [4.5, 1.0, 3.0],
+        'timestamp': [1700000001, 1700000002, 1700000003]
+    })
+    dp.append_ratings(new_ratings)
+    assert dp.stats_version > version
+    assert len(dp.ratings) == len(ratings) + 3
+
+    updated = dp.get_movie_stats()
+    assert updated is not stats
+    assert_stats_equal(updated, reference_movie_stats(movies, dp.ratings))
+
+    # Replacing the frames wholesale rebuilds the stats
+    dp.ratings = ratings.iloc[:100]
+    assert_stats_equal(dp.get_movie_stats(), reference_movie_stats(movies, ratings.iloc[:100]))
+
+    print("✓ Stats stay consistent with a full recompute\n")
+
+def test_movie_lookup():
+    """get_movie(s) gather by movieId in the requested order"""
+    print("Test: Movie Primary-Key Lookup")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=200, n_ratings=800)
+    movies = movies.sample(frac=1, random_state=0).reset_index(drop=True)
+    dp = make_processor(movies, ratings)
+
+    requested = [int(movies['movieId'].iloc[i]) for i in [17, 3, 150]]
+    found = dp.get_movies(requested + [999999, -5])
+    assert found['movieId'].tolist() == requested
+
+    stats = reference_movie_stats(movies, ratings).set_index('movieId')
+    with_stats = dp.get_movies(requested, with_stats=True)
+    assert np.allclose(with_stats['avg_rating'], stats.loc[requested, 'avg_rating'])
+
+    movie = dp.get_movie(requested[0])
+    assert movie == movies[movies['movieId'] == requested[0]].to_dict('records')[0]
+    assert dp.get_movie(999999) is None
+
+    report = ExportService.export_recommendations_report(7, requested, dp)
+    assert [m['movieId'] for m in report['recommendations']] == requested
+    assert report['recommendations'][0]['rating_count'] == stats.loc[requested[0], 'rating_count']
+
+    dp.movies = movies.iloc[:10]
+    assert dp.get_movie(requested[2]) is None
+
+    print("✓ Lookups return the requested movies in order\n")
+
+def reference_favorite_genres(movies, ratings, user_id):
+    """Per-genre mean ratings as the original per-row favorite genre computation built them"""
+    user_ratings = ratings[ratings['userId'] == user_id]
+    rated_movies = movies[movies['movieId'].isin(user_ratings['movieId'])]
+    genre_ratings = {}
+    for _, row in rated_movies.iterrows():
+        rating = user_ratings[user_ratings['movieId'] == row['movieId']]['rating'].values[0]
+        for genre in row['genres_list']:
+            genre_ratings.setdefault(genre, []).append(rating)
+    return {genre: np.mean(r) for genre, r in genre_ratings.items()}
+
+def assert_favorite_genres(favorites, movies, ratings, user_id, top_n=5):
+    """favorites are the original top_n genres, ties kept in first-seen order"""
+    averages = reference_favorite_genres(movies, ratings, user_id)
+    expected = sorted(averages.items(), key=lambda x: x[1], reverse=True)[:top_n]
+    assert favorites == [genre for genre, _ in expected], (favorites, expected)
+
+def test_ratings_index():
+    """Per-user and per-movie lookups return views matching a frame filter"""
+    print("Test: Ratings CSR Index")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=40, n_movies=150, n_ratings=1500)
+    ratings = ratings.sample(frac=1, random_state=0).reset_index(drop=True)
+    dp = make_processor(movies, ratings)
+    engineer = FeatureEngineer()
+
+    for user_id in ratings['userId'].unique()[:15]:
+        expected = ratings[ratings['userId'] == user_id]
+        user_ratings = dp.user_ratings(user_id)
+        assert user_ratings.movie_ids.tolist() == expected['movieId'].tolist()
+        assert user_ratings.ratings.tolist() == expected['rating'].tolist()
+        assert user_ratings.timestamps.tolist() == expected['timestamp'].tolist()
+        assert user_ratings.ratings.base is not None
+        assert dp.user_ratings_frame(user_id).equals(expected)
+
+        stats = dp.get_user_rating_stats(user_id)
+        assert stats['total_ratings'] == len(expected)
+        assert stats['avg_rating'] == expected['rating'].astype(np.float64).mean()
+        assert_favorite_genres(stats['favorite_genres'], movies, ratings, user_id)
+
+        features = engineer.extract_user_features(ratings, user_id)
+        r = expected['rating']
+        assert np.allclose(features, [r.mean(), r.std() if len(r) > 1 else 0, len(r), r.min(), r.max()])
+
+    movie_id = int(ratings['movieId'].iloc[0])
+    expected = ratings[ratings['movieId'] == movie_id]
+    assert dp.movie_ratings(movie_id).user_ids.tolist() == expected['userId'].tolist()
+
+    assert len(dp.user_ratings(10 ** 6).ratings) == 0
+    assert len(dp.user_ratings(str(ratings['userId'].iloc[0])).ratings) == 0
+    assert dp.user_ratings(np.int32(ratings['userId'].iloc[0])).movie_ids.tolist() == \
+        ratings[ratings['userId'] == ratings['userId'].iloc[0]]['movieId'].tolist()
+    assert dp.get_user_rating_stats(10 ** 6) is None
+
+    dp.append_ratings(pd.DataFrame({'userId': [10 ** 6], 'movieId': [movie_id], 'rating': [4.0], 'timestamp': [0]}))
+    assert dp.user_ratings(10 ** 6).movie_ids.tolist() == [movie_id]
+    assert dp.movie_ratings(movie_id).user_ids.tolist() == expected['userId'].tolist() + [10 ** 6]
+
+    # Appends extend the built indexes in place of re-sorting every rating
+    tail = ratings.sample(n=200, random_state=1).assign(timestamp=1)
+    with patch.object(RatingsIndex, '__init__', side_effect=AssertionError('rebuilt')):
+        dp.append_ratings(tail)
+        extended = {key: dp._ratings_index(key) for key in ['userId', 'movieId']}
+    for key, index in extended.items():
+        fresh = RatingsIndex(dp.ratings, key)
+        for name in ['rows', 'offsets', 'other_ids', 'values', 'timestamps']:
+            assert np.array_equal(getattr(index, name), getattr(fresh, name)), (key, name)
+
+    print("✓ Index lookups match frame filters\n")
+
+def test_title_search():
+    """Search finds every substring match and ranks by match quality, then popularity"""
+    print("Test: Title Search Index")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=50, n_movies=400, n_ratings=3000)
+    movies['title'] = make_titles(len(movies))
+    movies.loc[5, 'title'] = 'Star (1999)'
+    movies.loc[6, 'title'] = 'Lost Star, The (1980)'
+    movies.loc[7, 'title'] = 'Starlight (2001)'
+    movies.loc[8, 'title'] = 'Mustard (1994)'
+    dp = make_processor(movies, ratings)
+    normalized = movies['title'].map(normalize_title)
+
+    for query in ['star', 'STAR', 'the la', 'ght', 'ar', 'e', 'lost star', 'zz', '(199']:
+        expected = movies[normalized.str.contains(query.lower(), regex=False)]
+        found = dp.search_movies(query, limit=len(movies))
+        assert sorted(m['movieId'] for m in found) == sorted(expected['movieId'].tolist())
+        assert len(dp.search_movies(query, limit=10)) == min(10, len(expected))
+
+    titles = [m['title'] for m in dp.search_movies('star', limit=len(movies))]
+    assert titles[0] == 'Star (1999)'
+    assert titles.index('Starlight (2001)') < titles.index('Lost Star, The (1980)') < titles.index('Mustard (1994)')
+
+    # Within a tier, more-rated movies come first
+    counts = dp._movie_rating_counts()
+    rows = dp._title_search_index().search('star', limit=len(movies), popularity=counts)
+    prefix_counts = [counts[r] for r in rows if normalized[r].startswith('star') and not normalized[r].startswith('star (')]
+    assert prefix_counts == sorted(prefix_counts, reverse=True)
+
+    assert [m['title'] for m in dp.search_movies('amelie')] == [m['title'] for m in dp.search_movies('Amélie')]
+    assert dp.search_movies('') == []
+
+    print("✓ Search matches the substring scan\n")
+
+def test_genre_index():
+    """Bitmask ANY/ALL filters match per-row set logic with whole-name matching"""
+    print("Test: Genre Bitmask Index")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=300, n_ratings=1000)
+    movies.loc[0, 'genres_list'] = ['Sci-Fi']
+    movies.loc[1, 'genres_list'] = None
+    dp = make_processor(movies, ratings)
+    genre_sets = [set(g) if isinstance(g, list) else set() for g in movies['genres_list']]
+
+    for genres in [['Action'], ['comedy', 'Horror'], ['Drama', 'Romance', 'Thriller'], ['Action', 'Unknown']]:
+        wanted = {g.lower() for g in genres}
+        lowered = [{g.lower() for g in s} for s in genre_sets]
+        expected_any = np.array([bool(s & wanted) for s in lowered])
+        expected_all = np.array([wanted <= s for s in lowered])
+        assert np.array_equal(dp.genre_mask(genres), expected_any)
+        assert np.array_equal(dp.genre_mask(genres, match='all'), expected_all)
+
+        ids = dp.genre_index().movie_ids(genres, match='all')
+        assert ids.tolist() == sorted(movies['movieId'][expected_all].tolist())
+        found = dp.get_movies_by_genre(genres, limit=5)
+        assert [m['movieId'] for m in found] == sorted(movies['movieId'][expected_any].tolist())[:5]
+
+    # Whole names only: 'Sci' used to match 'Sci-Fi' as a substring
+    assert not dp.genre_mask(['Sci']).any()
+    assert dp.genre_mask(['sci-fi'])[0]
+
+    expected = pd.Series([g for s in genre_sets for g in s]).value_counts().to_dict()
+    assert dp.get_genre_distribution() == expected
+    assert dp.genre_index().masks.dtype == np.uint32
+
+    print("✓ Genre filters match set logic\n")
+
+def test_genre_affinities():
+    """Batch genre affinities match the per-user computation and the original averages"""
+    print("Test: Vectorized Genre Affinities")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=60, n_movies=200, n_ratings=2500)
+    extra = pd.DataFrame({
+        'userId': [ratings['userId'].iloc[0], 7],
+        'movieId': [ratings['movieId'].iloc[0], 99999],
+        'rating': [0.5, 5.0],
+        'timestamp': [0, 0]
+    })
+    ratings = pd.concat([ratings, extra], ignore_index=True)
+    dp = make_processor(movies, ratings)
+
+    user_ids = ratings['userId'].drop_duplicates().tolist()[:25] + [10 ** 6]
+    affinities, counts = dp.get_user_genre_affinities(user_ids)
+    genres = dp.genre_index().genres
+    assert affinities.shape == (len(user_ids), len(genres))
+
+    favorites = dp.get_users_favorite_genres(user_ids)
+    stats = dp.get_users_rating_stats(user_ids)
+    assert 10 ** 6 not in stats and favorites[10 ** 6] == []
+
+    for i, user_id in enumerate(user_ids[:-1]):
+        averages = reference_favorite_genres(movies, ratings, user_id)
+        assert {genres[g]: affinities[i, g] for g in np.flatnonzero(counts[i])}.keys() == averages.keys()
+        assert np.allclose([affinities[i, genres.index(g)] for g in averages], list(averages.values()))
+        assert favorites[user_id] == dp._get_user_favorite_genres(user_id)
+        assert stats[user_id] == dp.get_user_rating_stats(user_id)
+        assert_favorite_genres(favorites[user_id], movies, ratings, user_id)
+
+    print("✓ Batch affinities match per-user results\n")
+
+def test_typed_csv_load():
+    """Chunked CSV reads keep compact dtypes, categories and the row limit"""
+    print("Test: Typed Chunked CSV Load")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=40, n_movies=120, n_ratings=1500)
+    with tempfile.TemporaryDirectory() as data_dir:
+        movies.drop(columns=['genres_list']).to_csv(os.path.join(data_dir, 'movies.csv'), index=False)
+        ratings.to_csv(os.path.join(data_dir, 'ratings.csv'), index=False)
+
+        with patch.multiple(Config, DATA_DIR=data_dir, MOVIES_FILE='movies.csv', RATINGS_FILE='ratings.csv',
+                            CSV_CHUNK_ROWS=50, CSV_ROW_LIMIT=None):
+            dp = DataProcessor(use_mongodb=False, snapshot_dir='')
+
+        assert dp.ratings.dtypes.to_dict() == {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int32}
+        assert isinstance(dp.movies['genres'].dtype, pd.CategoricalDtype)
+        assert dp.movies['genres'].astype(str).tolist() == movies['genres'].tolist()
+        assert np.array_equal(dp.ratings['rating'], ratings['rating'])
+        assert dp.movies['genres_list'].tolist() == movies['genres_list'].tolist()
+        assert frame_memory(dp.ratings) < frame_memory(ratings)
+
+        record = dp.ratings.to_dict('records')[0]
+        assert type(record['userId']) is int and type(record['rating']) is float
+
+        limited = read_csv_typed(os.path.join(data_dir, 'ratings.csv'), RATINGS_DTYPES, chunk_rows=64, limit=100)
+        assert len(limited) == 100 and limited['userId'].dtype == np.int32
+
+    print("✓ Frames load with compact dtypes\n")
+
+def test_data_snapshot():
+    """Later boots map the saved columns until the source files change"""
+    print("Test: Columnar Data Snapshot")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=40, n_movies=120, n_ratings=1500)
+    movies.loc[3, 'title'] = 'Amélie (2001)'
+    movies.loc[4, 'title'] = None
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as snapshot_dir:
+        movies.drop(columns=['genres_list']).to_csv(os.path.join(data_dir, 'movies.csv'), index=False)
+        ratings.to_csv(os.path.join(data_dir, 'ratings.csv'), index=False)
+
+        with patch.multiple(Config, DATA_DIR=data_dir, MOVIES_FILE='movies.csv', RATINGS_FILE='ratings.csv'):
+            built = DataProcessor(use_mongodb=False, snapshot_dir=snapshot_dir)
+            assert built.snapshot.exists(built.fingerprint)
+
+            with patch.object(DataProcessor, '_load_from_csv') as load_csv:
+                mapped = DataProcessor(use_mongodb=False, snapshot_dir=snapshot_dir)
+            load_csv.assert_not_called()
+            assert mapped.fingerprint == built.fingerprint
+            # Numeric columns are read-only views of the mapped files
+            assert not mapped.ratings['userId'].to_numpy().flags.writeable
+            pd.testing.assert_frame_equal(mapped.ratings.copy(), built.ratings)
+            pd.testing.assert_frame_equal(mapped.movies.copy(), built.movies)
+            assert mapped.search_movies('amelie')[0]['title'] == 'Amélie (2001)'
+            assert pd.isna(mapped.movies['title'].iloc[4]) and mapped.movies['title'].iloc[5] == movies['title'].iloc[5]
+
+            # New ratings in the source change the fingerprint and reload it
+            ratings.iloc[:10].to_csv(os.path.join(data_dir, 'ratings.csv'), index=False, mode='a', header=False)
+            reloaded = DataProcessor(use_mongodb=False, snapshot_dir=snapshot_dir)
+            assert reloaded.fingerprint != built.fingerprint
+            assert len(reloaded.ratings) == len(ratings) + 10
+            assert not built.snapshot.exists(built.fingerprint)
+
+    # Columns that cannot be stored fail the save instead of vanishing from it
+    try:
+        frame_arrays('movies', movies)
+        assert False, "expected genres_list to be rejected"
+    except ValueError:
+        pass
+    arrays, meta = frame_arrays('movies', movies, skip=('genres_list',))
+    assert [c['name'] for c in meta['columns']] == ['movieId', 'title', 'genres']
+
+    # The Mongo fingerprint reads the newest rating through an index
+    db = mongomock.MongoClient()['movielens_db']
+    db['ratings'].insert_many(ratings.iloc[:50].to_dict('records'))
+    by_id = mongo_fingerprint(db)
+    db['ratings'].create_index('timestamp')
+    by_timestamp = mongo_fingerprint(db)
+    db['ratings'].insert_one({'userId': 1, 'movieId': 1, 'rating': 4.0, 'timestamp': 1800000000})
+    assert len({by_id, by_timestamp, mongo_fingerprint(db)}) == 3
+
+    print("✓ Snapshot round-trips and follows the source\n")
+
+def test_mongo_column_loader():
+    """Cursor batches stream into typed columns matching the documents"""
+    print("Test: Streaming MongoDB Column Loader")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=40, n_movies=120, n_ratings=1500)
+    db = mongomock.MongoClient()['movielens_db']
+    db['movies'].insert_many(movies.to_dict('records'))
+    db['ratings'].insert_many(ratings.to_dict('records'))
+    db['ratings'].insert_one({'userId': 1, 'movieId': 2, 'timestamp': 3})
+
+    # An undersized estimate forces the buffers to grow while streaming
+    with patch.object(mongomock.collection.Collection, 'estimated_document_count', return_value=10):
+        loaded = read_collection_columns(db['ratings'], RATINGS_DTYPES, batch_size=64)
+    assert loaded.dtypes.to_dict() == {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int32}
+    assert np.array_equal(loaded['rating'][:-1], ratings['rating'])
+    assert loaded['userId'][:-1].tolist() == ratings['userId'].tolist()
+    assert np.isnan(loaded['rating'].iloc[-1])
+
+    dp = make_processor(None, None)
+    dp.db = db
+    dp._load_from_mongodb()
+    assert dp.movies['title'].tolist() == movies['title'].tolist()
+    assert isinstance(dp.movies['genres'].dtype, pd.CategoricalDtype)
+    assert len(dp.ratings) == len(ratings) + 1
+
+    buffer = ColumnBuffer(np.int32, capacity=4)
+    for start in range(0, 100, 7):
+        buffer.extend(np.arange(start, min(start + 7, 100)))
+    assert buffer.values().tolist() == list(range(100)) and len(buffer.data) == 128
+
+    print("✓ Columns match the collection\n")
+
+def test_ratings_follower():
+    """New user_ratings documents are read once each and merged by compaction"""
+    print("Test: Ratings Tail-Follow")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=100, n_ratings=800)
+    dp = make_processor(movies, ratings)
+    appended = []
+    dp.add_append_listener(lambda new_ratings, version: appended.append((len(new_ratings), version)))
+
+    collection = mongomock.MongoClient()['movielens_db']['user_ratings']
+    t0 = datetime(2024, 1, 1, 12, 0, 0)
+    collection.insert_many([
+        {'userId': 1, 'movieId': 5, 'rating': 4.5, 'timestamp': t0},
+        {'userId': 2, 'movieId': 5, 'rating': 3.0, 'timestamp': t0 + timedelta(seconds=1)},
+        {'userId': 'abc', 'movieId': 5, 'rating': 3.0, 'timestamp': t0 + timedelta(seconds=1)}
+    ])
+
+    follower = RatingsFollower(collection, dp, compact_rows=4, compact_interval=3600)
+    follower.run_once()
+    assert follower.pending == 2 and follower.skipped == 1
+    assert len(dp.ratings) == len(ratings)
+
+    # A document sharing the high-water timestamp is still picked up, once
+    collection.insert_many([
+        {'userId': 3, 'movieId': 7, 'rating': 2.0, 'timestamp': t0 + timedelta(seconds=1)},
+        {'userId': 4, 'movieId': 7, 'rating': 5.0, 'timestamp': t0 + timedelta(seconds=2)}
+    ])
+    version = dp.stats_version
+    follower.run_once()
+    follower.run_once()
+    assert follower.pending == 0 and follower.followed == 4
+    assert appended == [(4, dp.stats_version)] and dp.stats_version > version
+
+    tail = dp.ratings.iloc[len(ratings):]
+    assert tail['userId'].tolist() == [1, 2, 3, 4]
+    assert tail['timestamp'].tolist()[0] == int(t0.replace(tzinfo=timezone.utc).timestamp())
+    assert_stats_equal(dp.get_movie_stats(), reference_movie_stats(movies, dp.ratings))
+    assert dp.user_ratings(4).movie_ids.tolist() == ratings[ratings['userId'] == 4]['movieId'].tolist() + [7]
+
+    collection.insert_one({'userId': 5, 'movieId': 9, 'rating': 1.0, 'timestamp': t0 + timedelta(seconds=3)})
+    follower.run_once()
+    assert follower.pending == 1
+    follower.stop()
+    assert follower.pending == 0 and dp.ratings['userId'].iloc[-1] == 5
+
+    print("✓ Live ratings reach the loaded frame\n")
+
+def test_analytics_rollups():
+    """Rollups folded forward by appends match a full recompute"""
+    print("Test: Analytics Rollups")
+    print("-" * 50)
+
+    movies, ratings = make_synthetic_data(n_users=200, n_movies=300, n_ratings=5000)
+    dp = make_processor(movies, ratings)
+    rollups = dp.analytics_rollups()
+    assert rollups.consistency_report(dp.ratings) == []
+
+    # Same response as the previous pandas implementation of /api/analytics/trends
+    frame = dp.ratings.copy()
+    frame['year'] = pd.to_datetime(frame['timestamp'], unit='s').dt.year
+    yearly = frame.groupby('year')['rating'].agg(['mean', 'count']).reset_index()
+    trends = dp.get_yearly_trends()
+    assert [t['year'] for t in trends] == yearly['year'].tolist()
+    assert [t['count'] for t in trends] == yearly['count'].tolist()
+    assert np.allclose([t['avg_rating'] for t in trends], yearly['mean'])
+
+    rng = np.random.default_rng(7)
+    for batch_size in [1, 3, 500]:
+        # Pushes a low-ranked user into the top ten and brings in a new user and year
+        new_ratings = pd.DataFrame({
+            'userId': rng.choice([dp.get_user_activity()['most_active_users'][-1]['userId'] + 1, 201, 5], batch_size),
+            'movieId': rng.integers(1, 301, batch_size),
+            'rating': rng.integers(1, 11, batch_size) / 2.0,
+            'timestamp': rng.integers(1700000000, 1800000000, batch_size)
+        })
+        dp.append_ratings(new_ratings)
+        assert dp.analytics_rollups() is rollups
+        assert rollups.consistency_report(dp.ratings) == []
+
+    activity = dp.get_user_activity()
+    assert activity['total_users'] == dp.ratings['userId'].nunique()
+    assert activity['total_ratings'] == len(dp.ratings)
+    counts = [user['rating_count'] for user in activity['most_active_users']]
+    assert len(counts) == 10 and counts == sorted(counts, reverse=True)
+    assert sum(dp.get_rating_distribution().values()) == len(dp.ratings)
+
+    # A member's growth in the same batch as a newcomer must not leave a stale heap minimum
+    ids = np.concatenate([np.repeat(np.arange(1, 11), np.arange(10, 20)), np.full(9, 11)])
+    small = make_processor(movies, pd.DataFrame({
+        'userId': ids, 'movieId': 1, 'rating': 4.0, 'timestamp': 1500000000
+    }))
+    small.analytics_rollups()
+    small.append_ratings(pd.DataFrame({
+        'userId': [1] * 20 + [11] * 2, 'movieId': 2, 'rating': 3.0, 'timestamp': 1500000000
+    }))
+    top = small.get_user_activity()['most_active_users']
+    assert top[0] == {'userId': 1, 'rating_count': 30}
+    # User 11 ties user 2 at 11 ratings and loses on id
+    assert [user['userId'] for user in top] == [1, 10, 9, 8, 7, 6, 5, 4, 3, 2]
+    assert small.analytics_rollups().consistency_report(small.ratings) == []
+
+    # Replacing ratings wholesale rebuilds rather than folding forward
+    dp.ratings = ratings.iloc[:1000].copy()
+    assert dp.analytics_rollups() is not rollups
+    assert dp.analytics_rollups().consistency_report(dp.ratings) == []
+
+    print("✓ Rollups stay consistent with a full recompute\n")
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Data Processor Test Suite")
+    print("=" * 50)
+    print()
+
+    test_movie_stats_incremental()
+    test_movie_lookup()
+    test_ratings_index()
+    test_title_search()
+    test_genre_index()
+    test_genre_affinities()
+    test_typed_csv_load()
+    test_data_snapshot()
+    test_mongo_column_loader()
+    test_ratings_follower()
+    test_analytics_rollups()
+
+    print("=" * 50)
+    print("All tests passed! ✓")
+    print("=" * 50)
@@ -0,0 +1,478 @@
+"""
+Tests for the recommendation engine scoring paths
+"""
+from benchmark_recommendations import (
+    make_synthetic_data, build_engine, legacy_collaborative_predictions, legacy_collaborative_recommendations
+)
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import TfidfVectorizer
+from similarity_index import BlockwiseSimilarityBuilder
+from recommendation_store import RecommendationStore
+from config import Config
+from ml.matrix_factorization import MatrixFactorizationModel
+
+def test_vectorized_matches_legacy_ranking():
+    """Vectorized collaborative scoring ranks like the original loop, up to float ties"""
+    print("Test: Vectorized vs Legacy Collaborative Ranking")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=60, n_movies=150, n_ratings=1500)
+    engine = build_engine(movies, ratings, sparse_matrix=False)
+    
+    for user_id in ratings['userId'].unique()[:20]:
+        predictions = legacy_collaborative_predictions(engine, user_id)
+        expected = legacy_collaborative_recommendations(engine, user_id, n=10)
+        actual = engine.get_collaborative_recommendations(user_id, n=10)
+        assert len(actual) == len(expected)
+        assert np.allclose([predictions[m] for m in actual], [predictions[m] for m in expected], rtol=1e-6), \
+            f"user {user_id}: {actual} != {expected}"
+    
+    print("✓ Rankings match for 20 users\n")
+
+def test_collaborative_edge_cases():
+    """Unknown users get nothing, n larger than the catalog is capped"""
+    print("Test: Collaborative Edge Cases")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=20, n_movies=40, n_ratings=200)
+    engine = build_engine(movies, ratings)
+    
+    assert engine.get_collaborative_recommendations(10 ** 9) == []
+    
+    user_id = ratings['userId'].iloc[0]
+    recs = engine.get_collaborative_recommendations(user_id, n=1000)
+    rated = set(ratings[ratings['userId'] == user_id]['movieId'])
+    assert len(recs) == len(set(recs))
+    assert not rated & set(recs)
+    
+    print("✓ Edge cases handled\n")
+
+def test_sparse_matches_dense():
+    """The CSR build scores and ranks users like the dense pivot table"""
+    print("Test: Sparse vs Dense Collaborative Model")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=80, n_movies=200, n_ratings=2500)
+    dense = build_engine(movies, ratings, sparse_matrix=False)
+    csr = build_engine(movies, ratings, sparse_matrix=True, n_neighbors=0)
+    
+    assert list(dense.movie_ids) == list(csr.movie_ids)
+    assert csr.user_item_matrix.dtype == np.float32
+    
+    for user_id in ratings['userId'].unique()[:20]:
+        user_idx = dense.user_id_to_idx[user_id]
+        dense_scores = dense._score_items(*dense._user_ratings(user_idx))
+        sparse_scores = csr._score_items(*csr._user_ratings(user_idx))
+        assert np.array_equal(np.isfinite(dense_scores), np.isfinite(sparse_scores))
+        finite = np.isfinite(dense_scores)
+        assert np.allclose(dense_scores[finite], sparse_scores[finite], rtol=1e-4)
+        
+        dense_sims = dense._user_similarities(user_idx)
+        sparse_sims = csr._user_similarities(user_idx)
+        assert np.allclose(dense_sims, sparse_sims, atol=1e-5)
+        assert user_id not in csr.get_similar_users(user_id, n=5)
+    
+    print("✓ Sparse model agrees with dense model\n")
+
+def test_item_neighbor_index():
+    """Top-K index keeps the K most similar movies per row, best first"""
+    print("Test: Top-K Item Neighbor Index")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=80, n_movies=200, n_ratings=2500)
+    dense = build_engine(movies, ratings, sparse_matrix=False)
+    pruned = build_engine(movies, ratings, sparse_matrix=True, n_neighbors=10)
+    index = pruned.item_neighbors
+    
+    assert index.n_items == len(pruned.movie_ids)
+    assert np.diff(index.indptr).max() <= 10
+    
+    for movie_idx in range(0, index.n_items, 17):
+        neighbors, sims = index.neighbors(movie_idx)
+        assert movie_idx not in neighbors
+        assert np.all(np.diff(sims) <= 0)
+        
+        row = dense.movie_similarity_matrix[movie_idx].copy()
+        row[movie_idx] = 0
+        expected = np.sort(row[row > 0])[::-1][:10]
+        assert np.allclose(sims, expected, atol=1e-5)
+    
+    user_id = ratings['userId'].iloc[0]
+    recs = pruned.get_collaborative_recommendations(user_id, n=10)
+    assert 0 < len(recs) <= 10
+    
+    print(f"✓ Index holds {len(index.indices)} neighbors in {index.nbytes} bytes\n")
+
+def test_blockwise_similarity_builder():
+    """Blockwise, threaded, memory-mapped build matches sklearn in one shot"""
+    print("Test: Blockwise Similarity Builder")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=50, n_movies=120, n_ratings=1200)
+    engine = build_engine(movies, ratings, sparse_matrix=True)
+    vectors = engine.user_item_matrix.T.tocsr()
+    expected = cosine_similarity(vectors)
+    
+    progress = []
+    builder = BlockwiseSimilarityBuilder(block_size=32, n_workers=3, progress=lambda done, total: progress.append((done, total)))
+    
+    in_memory = builder.build_dense(vectors)
+    assert np.allclose(in_memory, expected, atol=1e-5)
+    assert progress[-1] == (4, 4)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'similarity.npy')
+        mapped = builder.build_dense(vectors, out_path=path)
+        assert isinstance(mapped, np.memmap)
+        assert np.allclose(np.load(path, mmap_mode='r'), expected, atol=1e-5)
+        assert os.listdir(tmp_dir) == ['similarity.npy']
+        del mapped
+    
+    print("✓ Blockwise build matches one-shot cosine similarity\n")
+
+def test_genre_signature_content_similarity():
+    """Signature-level content model recommends like the movie x movie matrix"""
+    print("Test: Genre Signature Content Similarity")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=400, n_ratings=600)
+    engine = build_engine(movies, ratings)
+    
+    n_signatures = movies['genres_list'].apply(lambda x: '|'.join(sorted(x))).nunique()
+    assert engine.content_similarity_matrix.shape == (n_signatures, n_signatures)
+    
+    tfidf = TfidfVectorizer(tokenizer=lambda x: x, lowercase=False, token_pattern=None)
+    full_similarity = cosine_similarity(tfidf.fit_transform(movies['genres_list']))
+    
+    for row in range(0, len(movies), 37):
+        movie_id = movies['movieId'].iloc[row]
+        recs = engine.get_content_based_recommendations(movie_id, n=8)
+        rec_rows = [movies.index[movies['movieId'] == mid][0] for mid in recs]
+        
+        expected = np.delete(full_similarity[row], row)
+        assert row not in rec_rows
+        assert np.allclose(full_similarity[row][rec_rows], np.sort(expected)[::-1][:8], atol=1e-6)
+        assert recs == engine.get_content_based_recommendations(movie_id, n=8)
+    
+    print(f"✓ {len(movies)} movies collapse to {n_signatures} signatures\n")
+
+def test_precomputed_similar_movies():
+    """Precomputed lists equal the live ranking and follow catalog changes"""
+    print("Test: Precomputed Similar Movies")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=300, n_ratings=600)
+    engine = build_engine(movies, ratings)
+    
+    assert engine.similar_movies.dtype == np.int32
+    for row in range(len(movies)):
+        live = engine._similar_movie_rows(row, engine.similar_movies.shape[1])
+        assert list(engine.similar_movies[row][:len(live)]) == list(live)
+    
+    assert engine.get_content_based_recommendations(10 ** 7) == []
+    assert len(engine.get_content_based_recommendations(1, n=50)) == 50
+    
+    new_movie = {'movieId': 5000, 'title': 'New Movie (2024)', 'genres': 'Horror', 'genres_list': ['Horror']}
+    engine.dp.movies = pd.concat([movies, pd.DataFrame([new_movie])], ignore_index=True)
+    recs = engine.get_content_based_recommendations(5000, n=5)
+    assert len(recs) == 5
+    assert 5000 in engine.get_content_based_recommendations(recs[0], n=len(movies))
+    
+    print("✓ Similar-movie lists precomputed and refreshed\n")
+
+def test_content_recommendations_exclude_movie():
+    """A movie is never recommended as similar to itself, from the precomputed or the live path"""
+    print("Test: Content Recommendations Exclude The Movie")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=30, n_movies=300, n_ratings=600)
+    engine = build_engine(movies, ratings)
+    width = engine.similar_movies.shape[1]
+    
+    for movie_id in movies['movieId'].iloc[::13]:
+        for n in (8, width + 5):
+            recs = engine.get_content_based_recommendations(movie_id, n=n)
+            assert movie_id not in recs
+            assert len(recs) == n
+    
+    # The original [1:n+1] slice dropped the first of the movies tied at
+    # similarity 1 and kept the movie itself whenever it was not that first one
+    signatures = movies['genres_list'].apply(lambda x: '|'.join(sorted(x)))
+    group = movies.index[signatures == signatures.value_counts().index[0]]
+    first_id, later_id = movies['movieId'][group[0]], movies['movieId'][group[1]]
+    recs = engine.get_content_based_recommendations(later_id, n=3)
+    assert later_id not in recs and recs[0] == first_id
+    
+    print("✓ Movies never recommend themselves\n")
+
+def test_similar_users_ann_index():
+    """LSH similar users mostly agree with exact search and accept new users"""
+    print("Test: Similar Users ANN Index")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=400, n_movies=300, n_ratings=12000)
+    engine = build_engine(movies, ratings)
+    assert engine.user_ann_index is not None
+    
+    users = ratings['userId'].unique()[:50]
+    hits = 0
+    for user_id in users:
+        approximate = engine.get_similar_users(user_id, n=5)
+        assert user_id not in approximate
+        assert len(approximate) == 5
+        hits += len(set(approximate) & set(engine.get_similar_users(user_id, n=5, exact=True)))
+    recall = hits / (5 * len(users))
+    assert recall >= 0.8, recall
+    
+    source_user = users[0]
+    source = ratings[ratings['userId'] == source_user]
+    assert engine.index_user(10 ** 6, source['movieId'].values, source['rating'].values)
+    assert not engine.index_user(10 ** 6, source['movieId'].values, source['rating'].values)
+    assert engine.get_similar_users(10 ** 6, n=1) == [source_user]
+    
+    # Reloading reuses the saved planes rather than drawing new ones
+    index = engine.user_ann_index
+    state = index.state()
+    reloaded = type(index).from_state(state['planes'], state['keys'], state['codes'], state['config'], index._vectors)
+    assert reloaded.planes is state['planes']
+    assert reloaded.query_key(source_user, 5) == index.query_key(source_user, 5)
+    
+    print(f"✓ recall@5 = {recall:.2f}\n")
+
+def test_batch_recommendations():
+    """Batch scoring returns the same lists as single-user scoring, up to float ties"""
+    print("Test: Batch Recommendations")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=120, n_movies=250, n_ratings=4000)
+    unknown_user = 10 ** 6
+    user_ids = list(ratings['userId'].unique()[:70]) + [unknown_user]
+    
+    for sparse_matrix in (True, False):
+        engine = build_engine(movies, ratings, sparse_matrix=sparse_matrix)
+        batch = dict(engine.get_collaborative_recommendations_batch(user_ids, n=10, block_size=16))
+        assert list(batch) == user_ids
+        assert batch[unknown_user] == []
+        for user_id in user_ids[:-1]:
+            scores = engine._score_items(*engine._user_ratings(engine.user_id_to_idx[user_id]))
+            expected = engine.get_collaborative_recommendations(user_id, n=10)
+            position = {mid: i for i, mid in enumerate(engine.movie_ids)}
+            assert len(batch[user_id]) == len(expected)
+            assert np.allclose(
+                [scores[position[m]] for m in batch[user_id]],
+                [scores[position[m]] for m in expected],
+                rtol=1e-5
+            )
+    
+    hybrid = dict(engine.get_hybrid_recommendations_batch(user_ids, n=5))
+    assert hybrid[unknown_user] == engine.get_hybrid_recommendations(unknown_user, n=5)
+    
+    print("✓ Batch results match single-user results\n")
+
+def test_recommendations_from_ratings():
+    """Scoring from a user's ratings matches the matrix row and picks up ratings added since the build"""
+    print("Test: Recommendations From Current Ratings")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=60, n_movies=150, n_ratings=1500)
+    for sparse_matrix in (True, False):
+        engine = build_engine(movies, ratings, sparse_matrix=sparse_matrix)
+        for user_id in ratings['userId'].unique()[:10]:
+            rows = ratings[ratings['userId'] == user_id]
+            from_ratings = engine.get_hybrid_recommendations_from_ratings(rows['movieId'].values, rows['rating'].values, 10)
+            assert from_ratings == engine.get_hybrid_recommendations(user_id, 10), user_id
+        
+        # Newly rated movies drop out of the list even though the matrix is unchanged
+        before = engine.get_hybrid_recommendations(user_id, 10)
+        movie_ids = np.concatenate([rows['movieId'].values, before[:3], [10 ** 9]])
+        values = np.concatenate([rows['rating'].values, [5.0, 5.0, 5.0, 1.0]])
+        after = engine.get_hybrid_recommendations_from_ratings(movie_ids, values, 10)
+        assert not set(before[:3]) & set(after)
+        assert engine.get_hybrid_recommendations(user_id, 10) == before
+        
+        assert engine.get_hybrid_recommendations_from_ratings([], [], 5) == engine.get_hybrid_recommendations(-1, 5)
+    
+    print("✓ Appended ratings reach refreshed lists\n")
+
+def test_recommendation_store():
+    """Materialized top-N serves stored lists, tracks staleness and round-trips to disk"""
+    print("Test: Recommendation Store")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=40, n_movies=120, n_ratings=1000)
+    engine = build_engine(movies, ratings)
+    user_ids = [int(uid) for uid in engine.user_ids]
+    
+    def compute(ids):
+        return engine.get_hybrid_recommendations_batch(user_ids if ids is None else ids, 20)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RecommendationStore('hybrid', compute, top_n=20, storage_dir=tmp_dir)
+        store.attach('data-1', refresh=False)
+        assert store.get(user_ids[0]) is None
+        assert store.refresh() == len(user_ids)
+        
+        for user_id in user_ids[:10]:
+            assert store.get(user_id, 5) == engine.get_hybrid_recommendations(user_id, 5)
+        assert store.get(user_ids[0], 21) is None
+        assert store.get(-1) is None
+        assert not store.staleness(user_ids[0])['stale']
+        
+        store.mark_stale(user_ids[0], refresh=False)
+        assert store.staleness(user_ids[0])['stale']
+        store.refresh([user_ids[0], -1])
+        assert not store.staleness(user_ids[0])['stale']
+        assert store.get(-1, 5) == engine.get_hybrid_recommendations(-1, 5)
+        
+        # Nothing is served before the store knows its source
+        reloaded = RecommendationStore('hybrid', compute, top_n=20, storage_dir=tmp_dir)
+        assert len(reloaded) == 0
+        reloaded.attach('data-1', refresh=False)
+        assert len(reloaded) == len(user_ids)
+        assert reloaded.get(user_ids[3], 10) == store.get(user_ids[3], 10)
+        
+        # Lists saved from another model or dataset are discarded
+        reloaded.attach('data-2', refresh=False)
+        assert len(reloaded) == 0 and reloaded.get(user_ids[3]) is None
+        
+        # A worker whose full refresh waited on another's save loads it instead of recomputing
+        calls = []
+        def counting_compute(ids):
+            calls.append(ids)
+            return compute(ids)
+        writer = RecommendationStore('hybrid', counting_compute, top_n=20, storage_dir=tmp_dir)
+        waiter = RecommendationStore('hybrid', counting_compute, top_n=20, storage_dir=tmp_dir)
+        writer.attach('data-2', refresh=False)
+        waiter.attach('data-2', refresh=False)
+        with writer._writer_lock():
+            thread = threading.Thread(target=waiter.refresh)
+            thread.start()
+            time.sleep(0.1)
+            writer._refresh(None)
+        thread.join()
+        assert calls == [None]
+        assert len(waiter) == len(user_ids)
+        assert waiter.get(user_ids[5], 10) == writer.get(user_ids[5], 10)
+    
+    print("✓ Store serves and refreshes top-N lists\n")
+
+def test_matrix_factorization_recommend_batch():
+    """Batch matrix factorization recommendations match recommend()"""
+    print("Test: Matrix Factorization Batch Recommend")
+    print("-" * 50)
+    
+    rng = np.random.default_rng(0)
+    model = MatrixFactorizationModel(n_factors=8)
+    user_ids, movie_ids = list(range(100, 130)), list(range(1, 61))
+    model.user_id_map = {uid: i for i, uid in enumerate(user_ids)}
+    model.movie_id_map = {mid: i for i, mid in enumerate(movie_ids)}
+    model.reverse_movie_map = {i: mid for mid, i in model.movie_id_map.items()}
+    model.user_factors = rng.normal(0, 0.5, (30, 8))
+    model.movie_factors = rng.normal(0, 0.5, (60, 8))
+    model.user_bias = rng.normal(0, 0.5, 30)
+    model.movie_bias = rng.normal(0, 0.5, 60)
+    model.global_mean = 3.5
+    
+    rated = {uid: rng.choice(movie_ids, 10, replace=False).tolist() for uid in user_ids}
+    requested = user_ids[:10] + [999] + user_ids[10:]
+    results = list(model.recommend_batch(requested, n=15, rated_movies=rated, block_size=7))
+    assert [user_id for user_id, _ in results] == requested
+    batch = dict(results)
+    
+    for user_id in user_ids:
+        assert batch[user_id] == model.recommend(user_id, n=15, rated_movies=rated[user_id])
+    assert batch[999] == []
+    
+    print("✓ Batch results match recommend()\n")
+
+def test_popularity_stats():
+    """Popular movies follow the Bayesian-average ranking and update per rating"""
+    print("Test: Incremental Popularity Stats")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=400, n_movies=100, n_ratings=20000)
+    engine = build_engine(movies, ratings)
+    
+    def reference(ratings_df):
+        stats = ratings_df.groupby('movieId')['rating'].agg(['sum', 'count'])
+        prior = Config.POPULAR_PRIOR_WEIGHT
+        global_mean = ratings_df['rating'].mean()
+        stats['score'] = (stats['sum'] + prior * global_mean) / (stats['count'] + prior)
+        stats = stats[stats['count'] >= Config.POPULAR_MIN_RATINGS].reset_index()
+        return stats.sort_values(['score', 'movieId'], ascending=[False, True])['movieId'].tolist()
+    
+    expected = reference(ratings)
+    assert len(expected) > 10
+    assert engine._get_popular_movies(10) == expected[:10]
+    
+    new_ratings = [(int(expected[-1]), 5.0)] * 40 + [(999999, 5.0)] * Config.POPULAR_MIN_RATINGS
+    for movie_id, rating in new_ratings:
+        engine.record_rating(movie_id, rating)
+    
+    updated = pd.concat([ratings, pd.DataFrame({'movieId': [m for m, _ in new_ratings], 'rating': [r for _, r in new_ratings]})])
+    assert engine._get_popular_movies(len(expected) + 1) == reference(updated)
+    
+    print("✓ Ranking matches a full recompute after new ratings\n")
+
+def test_engine_snapshot():
+    """A second engine over the same data maps the first one's snapshot and answers identically"""
+    print("Test: Engine Snapshot")
+    print("-" * 50)
+    
+    movies, ratings = make_synthetic_data(n_users=80, n_movies=200, n_ratings=3000)
+    user_ids = ratings['userId'].unique()[:10].tolist()
+    
+    for sparse_matrix in [True, False]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            built = build_engine(movies, ratings, sparse_matrix=sparse_matrix, snapshot_dir=tmp_dir)
+            loaded = build_engine(movies, ratings, sparse_matrix=sparse_matrix, snapshot_dir=tmp_dir)
+            assert loaded.fingerprint == built.fingerprint
+            assert isinstance(loaded.similar_movies, np.memmap)
+            
+            assert list(loaded.get_collaborative_recommendations_batch(user_ids, 10)) == \
+                list(built.get_collaborative_recommendations_batch(user_ids, 10))
+            for user_id in user_ids:
+                assert loaded.get_collaborative_recommendations(user_id, 10) == built.get_collaborative_recommendations(user_id, 10)
+                assert loaded.get_similar_users(user_id, 5) == built.get_similar_users(user_id, 5)
+            for movie_id in movies['movieId'].head(10):
+                assert loaded.get_content_based_recommendations(movie_id, 5) == built.get_content_based_recommendations(movie_id, 5)
+            
+            # Stale snapshots and their locks are pruned; a lock held by a running build stays
+            with built.snapshot.build_lock('building'):
+                changed = build_engine(movies, ratings.iloc[1:], sparse_matrix=sparse_matrix, snapshot_dir=tmp_dir)
+            assert changed.fingerprint != built.fingerprint
+            assert sorted(os.listdir(tmp_dir)) == sorted([changed.fingerprint, f'{changed.fingerprint}.lock', 'building.lock'])
+    
+    print("✓ Snapshot round-trips for sparse and dense engines\n")
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Recommendation Engine Test Suite")
+    print("=" * 50)
+    print()
+    
+    test_vectorized_matches_legacy_ranking()
+    test_collaborative_edge_cases()
+    test_sparse_matches_dense()
+    test_item_neighbor_index()
+    test_blockwise_similarity_builder()
+    test_genre_signature_content_similarity()
+    test_precomputed_similar_movies()
+    test_content_recommendations_exclude_movie()
+    test_similar_users_ann_index()
+    test_batch_recommendations()
+    test_recommendations_from_ratings()
+    test_recommendation_store()
+    test_matrix_factorization_recommend_batch()
+    test_popularity_stats()
+    test_engine_snapshot()
+    
+    print("=" * 50)
+    print("All tests passed! ✓")
+    print("=" * 50)
@@ -0,0 +1,110 @@
+"""
+Tests for startup warm-up tracking and readiness gating
+"""
+import threading
+from flask import Flask
+from warmup import WarmupTracker
+
+def test_requires_gates_until_ready():
+    """Gated routes answer 503 with a retry hint until their components resolve"""
+    print("Test: Warm-up Gating")
+    print("-" * 50)
+
+    app = Flask(__name__)
+    startup = WarmupTracker(['data', 'engine', 'mongodb'], retry_after=3, optional=['mongodb'])
+
+    @app.route('/movies')
+    @startup.requires('data')
+    def movies():
+        return 'ok'
+
+    @app.route('/recommendations')
+    @startup.requires('data', 'engine')
+    def recommendations():
+        return 'ok'
+
+    @app.route('/rate')
+    @startup.requires('mongodb', 'data')
+    def rate():
+        return 'ok'
+
+    client = app.test_client()
+    response = client.get('/recommendations')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert response.json['waiting_for'] == ['data', 'engine']
+
+    startup.mark_ready('data')
+    assert client.get('/movies').status_code == 200
+    assert client.get('/recommendations').json['waiting_for'] == ['engine']
+    assert startup.time_to_ready() is None
+
+    # An optional component that failed lets its routes through
+    startup.mark_failed('mongodb', ConnectionError('unreachable'))
+    assert client.get('/rate').status_code == 200
+
+    # A required one keeps them closed, with no hint to retry
+    startup.mark_failed('engine', RuntimeError('boom'))
+    response = client.get('/recommendations')
+    assert response.status_code == 503
+    assert response.json['failed'] == ['engine']
+    assert 'Retry-After' not in response.headers
+    assert client.get('/movies').status_code == 200
+    status = startup.status()
+    assert not status['ready'] and status['failed'] == ['engine']
+    assert status['components']['engine']['error'] == 'boom'
+    assert status['time_to_ready_seconds'] is None
+
+    startup.mark_ready('engine')
+    assert client.get('/recommendations').status_code == 200
+    status = startup.status()
+    assert status['ready'] and status['failed'] == []
+    assert status['time_to_ready_seconds'] == status['components']['engine']['seconds']
+
+    print("✓ Routes open as their components resolve\n")
+
+def test_background_run():
+    """Steps run in order on a background thread and failures do not stop later steps"""
+    print("Test: Background Warm-up")
+    print("-" * 50)
+
+    startup = WarmupTracker(['first', 'second', 'third'], optional=['second'])
+    release = threading.Event()
+    order = []
+
+    def fail():
+        order.append('second')
+        raise ValueError('unavailable')
+
+    thread = startup.run([
+        ('first', lambda: (release.wait(5), order.append('first'))),
+        ('second', fail),
+        ('third', lambda: order.append('third'))
+    ])
+    assert not startup.ready
+
+    release.set()
+    thread.join(5)
+    assert order == ['first', 'second', 'third']
+    assert startup.ready
+    assert [startup.components[name]['state'] for name in order] == ['ready', 'failed', 'ready']
+
+    # A required step failing leaves the app unready once every step has run
+    startup = WarmupTracker(['first', 'second'])
+    startup.run([('first', fail), ('second', lambda: None)], background=False)
+    assert not startup.ready and startup.failed() == ['first']
+
+    print("✓ Steps resolved in order\n")
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("Warm-up Test Suite")
+    print("=" * 50)
+    print()
+
+    test_requires_gates_until_ready()
+    test_background_run()
+
+    print("=" * 50)
+    print("All tests passed! ✓")
+    print("=" * 50)
@@ -0,0 +1,168 @@
+import bisect
+import re
+import unicodedata
+import numpy as np
+
+# Trigrams are packed into one int64: three 21-bit code points
+CHAR_BITS = 21
+
+def normalize_title(text):
+    """Lowercase and strip accents so 'Amélie' and 'amelie' match"""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def _code_points(texts):
+    """texts as an n x width uint32 code point matrix, zero-padded on the right"""
+    width = max((len(t) for t in texts), default=0) + 2
+    return np.array(texts, dtype=f'U{width}').view(np.uint32).reshape(len(texts), width).astype(np.int64)
+
+def _trigram_codes(points):
+    return (points[:, :-2] << (2 * CHAR_BITS)) | (points[:, 1:-1] << CHAR_BITS) | points[:, 2:]
+
+class TitleSearchIndex:
+    """
+    Title search over normalized titles with two inverted indexes.
+
+    Word prefixes: the suffix of a title at every word start, sorted, with
+    the owning rows alongside, so the titles with a word (or the title
+    itself) starting with the query are one bisected range.
+
+    Trigrams: every position of a title starts one trigram (the last two run
+    into zero padding), and each distinct trigram maps to the sorted rows
+    containing it, stored CSR-style in numpy arrays. A query of three or more
+    characters intersects the postings of its trigrams and confirms the
+    substring on the survivors; shorter queries take the union of trigrams
+    starting with them.
+
+    Matches rank by quality (whole title, title prefix, word prefix,
+    anywhere) and then by popularity. The substring tier is only searched
+    when the better tiers leave the limit unfilled.
+    """
+
+    def __init__(self, titles):
+        self.titles = [normalize_title(t) for t in titles]
+
+        # Whole-title matches ignore the trailing "(year)"
+        self.exact = {}
+        for row, title in enumerate(self.titles):
+            for name in {title, re.sub(r'\s*\(\d{4}\)\s*$', '', title)}:
+                self.exact.setdefault(name, []).append(row)
+
+        prefixes = sorted(
+            (title[match.start():], row)
+            for row, title in enumerate(self.titles)
+            for match in re.finditer(r'\w+', title)
+        )
+        self.word_prefixes = [prefix for prefix, _ in prefixes]
+        self.word_prefix_rows = np.array([row for _, row in prefixes], dtype=np.int32)
+        self.word_prefix_at_start = np.array([len(prefix) == len(self.titles[row]) for prefix, row in prefixes], dtype=bool)
+
+        if not self.titles:
+            self.trigrams = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.postings = np.empty(0, dtype=np.int32)
+            return
+
+        points = _code_points(self.titles)
+        lengths = np.array([len(t) for t in self.titles])
+        codes = _trigram_codes(points)
+        rows = np.broadcast_to(np.arange(len(self.titles))[:, None], codes.shape)
+        valid = np.arange(codes.shape[1])[None, :] < lengths[:, None]
+
+        # Distinct (trigram, row) pairs sorted by trigram, then row: rows are
+        # already ascending, so a stable sort by trigram keeps them that way
+        codes, rows = codes[valid], rows[valid]
+        order = np.argsort(codes, kind='stable')
+        codes, rows = codes[order], rows[order]
+        distinct = np.ones(len(codes), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows = codes[distinct], rows[distinct]
+        self.trigrams, starts = np.unique(codes, return_index=True)
+        self.offsets = np.append(starts, len(codes)).astype(np.int64)
+        self.postings = rows.astype(np.int32)
+
+    def __len__(self):
+        return len(self.titles)
+
+    @property
+    def nbytes(self):
+        arrays = [self.trigrams, self.offsets, self.postings, self.word_prefix_rows, self.word_prefix_at_start]
+        return sum(a.nbytes for a in arrays)
+
+    def _posting(self, position):
+        return self.postings[self.offsets[position]:self.offsets[position + 1]]
+
+    def _trigram_candidates(self, query):
+        """Rows holding every trigram of query, a superset of the substring matches"""
+        if len(query) < 3:
+            # Every trigram starting with the query, as a code range
+            points = np.array([ord(ch) for ch in query] + [0] * (3 - len(query)), dtype=np.int64)
+            low = (points[0] << (2 * CHAR_BITS)) | (points[1] << CHAR_BITS) | points[2]
+            high = low + (1 << (CHAR_BITS * (3 - len(query))))
+            start, end = np.searchsorted(self.trigrams, [low, high])
+            return np.unique(self.postings[self.offsets[start]:self.offsets[end]])
+
+        codes = np.unique(_trigram_codes(_code_points([query]))[0, :len(query) - 2])
+        positions = np.searchsorted(self.trigrams, codes)
+        if np.any(positions >= len(self.trigrams)) or np.any(self.trigrams[np.minimum(positions, len(self.trigrams) - 1)] != codes):
+            return np.empty(0, dtype=np.int32)
+
+        # Intersect from the rarest trigram up so the working set only shrinks
+        postings = sorted((self._posting(p) for p in positions), key=len)
+        rows = postings[0]
+        for posting in postings[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, posting, assume_unique=True)
+        return rows
+
+    def candidates(self, query, exclude=None):
+        """Rows whose normalized title contains the (normalized) query, ascending"""
+        if not query:
+            return np.empty(0, dtype=np.int32)
+        rows = self._trigram_candidates(query)
+        if exclude is not None and len(exclude):
+            rows = np.setdiff1d(rows, exclude, assume_unique=True)
+        if len(query) < 3:
+            return rows.astype(np.int32)
+        # Trigrams can co-occur without being adjacent, so confirm the substring
+        return np.array([row for row in rows.tolist() if query in self.titles[row]], dtype=np.int32)
+
+    def search(self, query, limit=50, popularity=None):
+        """
+        Up to limit matching rows, best first: match quality, then popularity
+        (a per-row array, higher first), then row order.
+        """
+        query = normalize_title(query).strip()
+        if not query or limit <= 0:
+            return np.empty(0, dtype=np.int32)
+
+        start = bisect.bisect_left(self.word_prefixes, query)
+        end = bisect.bisect_left(self.word_prefixes, query + '\U0010ffff', lo=start)
+        exact = self.exact.get(query, [])
+        rows = np.concatenate([np.array(exact, dtype=np.int32), self.word_prefix_rows[start:end]])
+        quality = np.concatenate([np.zeros(len(exact), dtype=np.int8), np.where(self.word_prefix_at_start[start:end], 1, 2).astype(np.int8)])
+
+        # Keep each row's best quality
+        order = np.lexsort((quality, rows))
+        rows, first = np.unique(rows[order], return_index=True)
+        quality = quality[order][first]
+
+        if len(rows) < limit:
+            substring = self.candidates(query, exclude=rows)
+            rows = np.concatenate([rows, substring])
+            quality = np.concatenate([quality, np.full(len(substring), 3, dtype=np.int8)])
+
+        popularity = np.zeros(len(rows)) if popularity is None else np.asarray(popularity, dtype=np.float64)[rows]
+        if len(rows) > limit:
+            # Only the rows ranking at or above the limit-th key need a full sort
+            key = quality * (popularity.max() + 1) - popularity
+            threshold = np.partition(key, limit - 1)[limit - 1]
+            keep = key <= threshold
+            rows, quality, popularity = rows[keep], quality[keep], popularity[keep]
+
+        order = np.lexsort((rows, -popularity, quality))
+        return rows[order[:limit]]
@@ -0,0 +1,126 @@
+import threading
+import time
+from functools import wraps
+from flask import jsonify
+
+class WarmupTracker:
+    """
+    Tracks startup components that are built after the server starts listening.
+
+    Each component is pending until mark_ready or mark_failed is called, and
+    the tracker records how long after boot that happened. A failed optional
+    component counts as resolved (the app runs without it, as it does when
+    MongoDB is unreachable) but is reported with its error. A failed required
+    component never becomes ready, so routes needing it keep answering 503
+    and the readiness check reports the failure.
+    """
+
+    def __init__(self, components, boot_time=None, retry_after=5, optional=()):
+        self.boot_time = boot_time or time.time()
+        self.retry_after = retry_after
+        self.optional = set(optional)
+        self.components = {name: {'state': 'pending', 'seconds': None, 'error': None} for name in components}
+        self.boot_seconds = None
+        self._lock = threading.Lock()
+
+    def _resolve(self, name, state, error=None):
+        with self._lock:
+            self.components[name] = {
+                'state': state,
+                'seconds': round(time.time() - self.boot_time, 3),
+                'error': error
+            }
+
+    def mark_booted(self):
+        """Record that the app finished importing and can accept requests"""
+        self.boot_seconds = round(time.time() - self.boot_time, 3)
+
+    def mark_ready(self, name):
+        self._resolve(name, 'ready')
+
+    def mark_failed(self, name, error):
+        self._resolve(name, 'failed', str(error))
+
+    def _usable(self, name):
+        state = self.components[name]['state']
+        return state == 'ready' or (state == 'failed' and name in self.optional)
+
+    def is_ready(self, *names):
+        return all(self._usable(name) for name in names)
+
+    def failed(self, *names):
+        """Required components among names (all by default) whose step failed"""
+        return [
+            name for name in names or self.components
+            if self.components[name]['state'] == 'failed' and name not in self.optional
+        ]
+
+    @property
+    def ready(self):
+        return self.is_ready(*self.components)
+
+    def time_to_ready(self):
+        if not self.ready:
+            return None
+        return max(component['seconds'] for component in self.components.values())
+
+    def status(self):
+        with self._lock:
+            components = {name: dict(component) for name, component in self.components.items()}
+        return {
+            'ready': self.ready,
+            'uptime_seconds': round(time.time() - self.boot_time, 3),
+            'boot_seconds': self.boot_seconds,
+            'time_to_ready_seconds': self.time_to_ready(),
+            'failed': self.failed(),
+            'components': components
+        }
+
+    def run(self, steps, background=True):
+        """
+        Run (name, func) steps in order, marking each ready or failed. In
+        background mode this happens on a daemon thread and returns at once.
+        """
+        def run_steps():
+            for name, func in steps:
+                try:
+                    func()
+                    self.mark_ready(name)
+                except Exception as e:
+                    print(f"⚠️  Startup step '{name}' failed: {e}")
+                    self.mark_failed(name, e)
+            if self.ready:
+                print(f"✅ Application ready in {self.time_to_ready():.2f}s")
+            else:
+                print(f"❌ Startup failed: {', '.join(self.failed())} unavailable")
+
+        if not background:
+            run_steps()
+            return None
+
+        thread = threading.Thread(target=run_steps, name='warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def requires(self, *names):
+        """
+        Route decorator answering 503 with a Retry-After hint until names are
+        ready, and 503 without one if a required component among them failed.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                failed = self.failed(*names)
+                if failed:
+                    return jsonify({'error': 'Service unavailable', 'failed': failed}), 503
+                if not self.is_ready(*names):
+                    waiting = [name for name in names if self.components[name]['state'] == 'pending']
+                    response = jsonify({
+                        'error': 'Service is warming up',
+                        'waiting_for': waiting,
+                        'retry_after': self.retry_after
+                    })
+                    return response, 503, {'Retry-After': str(self.retry_after)}
+                return f(*args, **kwargs)
+            return decorated
+        return decorator